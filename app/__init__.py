@@ -22,11 +22,54 @@ def create_app() -> Flask:
     from app.routes.certificate import certificate_bp
     from app.routes.payment    import payment_bp
     from app.routes.chatbot    import chatbot_bp # Added chatbot blueprint import
+    from app.routes.metrics    import metrics_bp
+    from app.routes.admin      import admin_bp
+    from app.routes.health     import health_bp
 
     app.register_blueprint(home_bp)        # "/"
     app.register_blueprint(reception_bp)   # "/reception"
     app.register_blueprint(certificate_bp) # "/certificate"
     app.register_blueprint(payment_bp)     # "/payment"
     app.register_blueprint(chatbot_bp)     # "/api/chatbot" (as per url_prefix in chatbot.py)
+    app.register_blueprint(metrics_bp)     # "/metrics"
+    app.register_blueprint(admin_bp)       # "/admin"
+    app.register_blueprint(health_bp)      # "/healthz"
+
+    # ── 레플리카 모드(REPLICA_CENTRAL_URL) : 로컬 사본 사용 + 중앙 서버와 동기화 ──
+    #   * 중앙 서버로 동작할 때만 /sync 엔드포인트와 변경 기록을 켬
+    from app.utils import replica, sync
+    if replica.init_app(app) is None:
+        from app.routes.sync import sync_bp
+        app.register_blueprint(sync_bp)    # "/sync"
+        sync.init_app(app)
+        # 지난 날짜 예약을 날짜별 압축 파일로 보관 (RESERVATION_ARCHIVE=1)
+        from app.utils import reservation_archive
+        reservation_archive.init_app(app)
+
+    # ── 요청 단위 지연시간·상태코드 계측 ───────────────────────
+    from app.utils import metrics
+    metrics.init_app(app)
+
+    # ── 비싼 경로(챗봇·PDF) 입장 제어 : 키오스크별 토큰 버킷 + 동시 실행 상한 ──
+    #   * metrics 뒤에 등록해야 거절된 요청(429/503)도 요청 지표에 남음
+    from app.utils import admission
+    admission.init_app(app)
+
+    # ── 요청 샘플링 프로파일러 (관리자 API 또는 X-Profile 헤더로 켤 때만 동작) ──
+    from app.utils import profiling
+    profiling.init_app(app)
+
+    # ── 운영 집계 스냅샷 복구 + 주기 저장 ────────────────────────
+    from app.utils import aggregates
+    aggregates.init_app(app)
+
+    # ── 중단된 결제 정리 (교체·재시작된 worker 가 끝내지 못한 승인·매입) ──
+    from app.utils import payment_gateway
+    payment_gateway.init_app(app)
+
+    # ── 시작 warm-up (CSV·인덱스·템플릿·PDF 글꼴·LLM 클라이언트) ──
+    #   * 끝나기 전까지 /healthz/ready 는 503
+    from app.utils import warmup
+    warmup.init_app(app)
 
     return app
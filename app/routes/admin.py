@@ -0,0 +1,145 @@
+"""
+운영자용 조회 API (Blueprint)
+  • GET /admin/aggregates   → 오늘의 진료과별 접수·수납 현황, 매출, 증명서 발급 수 (JSON)
+  • GET /admin/replica      → 레플리카 모드 동기화 상태 (마지막 동기화, 업로드 대기 건수)
+  • GET /admin/reservations/search → 예약 검색 (이름·생년월일 접두어, 진료과, 의사, 상태, 시각 범위)
+  • GET /admin/reservations/archive → 보관된 날짜 목록, 날짜별 예약, 주민번호별 전체 이력
+  • GET|POST|DELETE /admin/profiling → 요청 샘플링 프로파일러 설정 조회·켜기·끄기 + 결과 파일 목록
+  • GET /admin/profiling/<이름>      → 프로파일 파일(collapsed stack) 다운로드
+
+X-Admin-Token 헤더가 ADMIN_TOKEN 환경 변수와 일치해야 한다 (ADMIN_TOKEN 이 없으면 모든 요청 403).
+"""
+import hmac
+import os
+
+from flask import Blueprint, abort, current_app, jsonify, request, send_from_directory
+
+from app.routes import reception
+from app.utils import profiling, reservation_archive, reservation_search, reservation_store
+from app.utils.aggregates import aggregates
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+
+@admin_bp.before_request
+def _require_token():
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        return jsonify({"error": "admin API is disabled: ADMIN_TOKEN is not configured"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode("utf-8"), token.encode("utf-8")):
+        return jsonify({"error": "forbidden"}), 403
+    return None
+
+
+@admin_bp.route("/aggregates", methods=["GET"])
+def get_aggregates():
+    """
+    미리 집계된 카운터를 반환 (요청 경로에서 데이터 스캔 없음).
+    이 worker 의 몫을 스냅샷에 더하면서 다른 worker 가 더해 둔 값도 읽어 온다.
+    """
+    aggregates.flush()
+    return jsonify(aggregates.as_dict())
+
+
+@admin_bp.route("/replica", methods=["GET"])
+def get_replica():
+    """
+    레플리카 모드가 아니면 404
+    """
+    replica = current_app.extensions.get("replica")
+    if replica is None:
+        return jsonify({"error": "not a replica"}), 404
+    return jsonify(replica.status())
+
+
+@admin_bp.route("/reservations/search", methods=["GET"])
+def search_reservations():
+    """
+    쿼리 파라미터 (모두 선택, 여러 개면 AND)
+      name=홍길     이름 접두어          birth=9001    주민번호 앞 6자리(생년월일) 접두어
+      department=  진료과              doctor=       담당의
+      status=      Pending | Registered | Paid
+      from= / to=  예약 시각 범위 [from, to) — "2025-06-19" 또는 "2025-06-19 09:00"
+      offset=0, limit=50 (최대 200)
+    """
+    args = request.args
+    birth = args.get("birth", "").strip()
+    status = args.get("status", "").strip()
+    if birth and (not birth.isdigit() or len(birth) > reservation_search.BIRTH_DIGITS):
+        return jsonify({"error": "birth must be up to 6 digits"}), 400
+    if status and status not in reservation_store.STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(reservation_store.STATUSES)}"}), 400
+    try:
+        offset = int(args.get("offset", 0))
+        limit = int(args.get("limit", reservation_search.DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    index = reservation_search.get_index(reception.RESV_CSV)
+    return jsonify(index.search(
+        name=args.get("name", "").strip() or None,
+        birth=birth or None,
+        department=args.get("department", "").strip() or None,
+        doctor=args.get("doctor", "").strip() or None,
+        status=status or None,
+        time_from=args.get("from", "").strip() or None,
+        time_to=args.get("to", "").strip() or None,
+        offset=offset,
+        limit=limit,
+    ))
+
+
+@admin_bp.route("/reservations/archive", methods=["GET"])
+def archived_reservations():
+    """
+      ?day=2025-06-19   그 날짜의 예약 (보관분 + 예약 파일에 남은 행) 과 진료과·상태별 수
+      ?rrn=…            주민번호의 전체 예약 이력 (예약 파일 + 모든 보관 날짜)
+      (없으면)          보관된 날짜 목록
+    """
+    day = request.args.get("day", "").strip()
+    rrn = request.args.get("rrn", "").strip()
+    if day:
+        rows = reservation_archive.day_rows(day, reception.RESV_CSV)
+        counts: dict[str, dict] = {}
+        for row in rows:
+            by_status = counts.setdefault(row.get("department", "").strip() or "-", {})
+            status = (row.get("payment_status") or "Pending").strip()
+            by_status[status] = by_status.get(status, 0) + 1
+        return jsonify({"day": day, "total": len(rows), "by_department": counts, "items": rows})
+    if rrn:
+        return jsonify({"rrn": rrn, "items": reservation_archive.history(rrn, reception.RESV_CSV)})
+    return jsonify({"days": reservation_archive.archived_days()})
+
+
+@admin_bp.route("/profiling", methods=["GET", "POST", "DELETE"])
+def profiling_settings():
+    """
+    POST {"endpoints": ["certificate.generate_prescription_pdf"], "sample_rate": 0.1, "seconds": 300}
+      endpoints 는 Flask endpoint 이름 (blueprint.함수), sample_rate 는 0~1, seconds 는 최대 3600
+    DELETE 로 즉시 끔. 응답에는 현재 설정과 최근 프로파일 목록.
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        endpoints = data.get("endpoints")
+        if not isinstance(endpoints, list) or not endpoints:
+            return jsonify({"error": "endpoints must be a non-empty list"}), 400
+        known = {rule.endpoint for rule in current_app.url_map.iter_rules()}
+        unknown = sorted(set(endpoints) - known)
+        if unknown:
+            return jsonify({"error": "unknown endpoints", "endpoints": unknown}), 400
+        try:
+            sample_rate = float(data.get("sample_rate", 0.1))
+            seconds = float(data.get("seconds", 300))
+        except (TypeError, ValueError):
+            return jsonify({"error": "sample_rate and seconds must be numbers"}), 400
+        profiling.settings.save(endpoints, sample_rate, seconds)
+    elif request.method == "DELETE":
+        profiling.settings.clear()
+    return jsonify({"settings": profiling.settings.as_dict(), "profiles": profiling.list_profiles()})
+
+
+@admin_bp.route("/profiling/<name>", methods=["GET"])
+def download_profile(name):
+    if not profiling.is_profile_name(name):
+        abort(404)
+    return send_from_directory(profiling.PROFILE_DIR, name, mimetype="text/plain", as_attachment=True)
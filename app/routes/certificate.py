@@ -1,6 +1,4 @@
 import os
-import csv
-import random
 import io # Will be used for BytesIO for PDF generation
 from datetime import datetime # For filename timestamp
 from flask import (
@@ -11,6 +9,9 @@ from app.utils.pdf_generator import (
     generate_medical_confirmation_pdf as create_confirmation_pdf_bytes,
     MissingKoreanFontError,
 )
+from app.utils import metrics, prerender, prescription_plans, reservation_store
+from app.utils.aggregates import aggregates
+from app.utils.page_cache import render_cached
 
 certificate_bp = Blueprint(
     "certificate", __name__, url_prefix="/certificate", template_folder="../../templates"
@@ -22,44 +23,67 @@ BASE_DIR = os.path.abspath(
 )
 TREATMENT_FEES_CSV = os.path.join(BASE_DIR, "data", "treatment_fees.csv")
 RESERVATIONS_CSV = os.path.join(BASE_DIR, "data", "reservations.csv")
+PRESCRIPTION_ITEMS_CSV = os.path.join(BASE_DIR, "data", "prescription_items.csv")
 
 # Helper function to load prescription data
-def _load_prescription_data(department: str) -> dict | None:
+def _load_prescription_data(department: str, patient_rrn: str | None = None) -> dict | None:
     """
-    Loads prescription data for a given department from TREATMENT_FEES_CSV.
-    Selects 2-3 random prescriptions and calculates the total fee.
+    Returns the visit's prescription plan (shared with payment and the chatbot,
+    so the certificate lists exactly the billed items).
     Returns a dict with 'prescriptions' and 'total_fee', or None if error.
     """
     if not os.path.exists(TREATMENT_FEES_CSV):
         print(f"Error: {TREATMENT_FEES_CSV} not found.")
+        metrics.inc(metrics.ERRORS_TOTAL, source="certificate", reason="treatment_fees_missing")
         return None
 
-    department_prescriptions = []
     try:
-        with open(TREATMENT_FEES_CSV, newline="", encoding="utf-8-sig") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row["Department"].strip() == department:
-                    department_prescriptions.append(
-                        {"name": row["Prescription"], "fee": int(row["Fee"])}
-                    )
+        plan = prescription_plans.plan_for(
+            patient_rrn, department, TREATMENT_FEES_CSV, PRESCRIPTION_ITEMS_CSV)
     except Exception as e:
         print(f"Error reading or parsing {TREATMENT_FEES_CSV}: {e}")
+        metrics.inc(metrics.ERRORS_TOTAL, source="certificate", reason="treatment_fees_csv")
         return None
 
-    if not department_prescriptions:
+    if not plan["prescriptions"]:
         print(f"No prescriptions found for department: {department}")
-        return {"prescriptions": [], "total_fee": 0} # Return empty if no specific items
+    return {"prescriptions": plan["prescriptions"], "total_fee": plan["total_fee"]}
 
-    num_to_select = random.randint(2, 3)
-    if len(department_prescriptions) < num_to_select:
-        selected_prescriptions = department_prescriptions
-    else:
-        selected_prescriptions = random.sample(department_prescriptions, num_to_select)
 
-    total_fee = sum(item["fee"] for item in selected_prescriptions)
+def _prescription_inputs(patient_name: str, patient_rrn: str, department: str) -> dict | None:
+    """Keyword arguments for the prescription PDF, or None if there is nothing to list."""
+    prescription_info = _load_prescription_data(department, patient_rrn)
+    if prescription_info is None or not prescription_info["prescriptions"]:
+        return None
+    return {
+        "patient_name": patient_name,
+        "patient_rrn": patient_rrn,
+        "department": department,
+        "prescriptions": prescription_info["prescriptions"],
+        "total_fee": prescription_info["total_fee"],
+    }
+
 
-    return {"prescriptions": selected_prescriptions, "total_fee": total_fee}
+def _confirmation_inputs(patient_name: str, patient_rrn: str, department: str) -> dict:
+    """Keyword arguments for the medical confirmation PDF (department is used as disease_name)."""
+    return {"patient_name": patient_name, "patient_rrn": patient_rrn, "disease_name": department}
+
+
+def prerender_certificates(patient_name: str | None, patient_rrn: str | None, department: str | None) -> None:
+    """
+    Called right after a payment completes. Renders both certificates in the
+    background so the download is instant when the visitor taps the button.
+    Repeated calls for the same visit are ignored.
+    """
+    if not (prerender.ENABLED and patient_name and patient_rrn and department):
+        return
+    confirmation = _confirmation_inputs(patient_name, patient_rrn, department)
+    prerender.submit(prerender.make_key("confirmation", **confirmation),
+                     lambda: create_confirmation_pdf_bytes(**confirmation))
+    prescription = _prescription_inputs(patient_name, patient_rrn, department)
+    if prescription is not None:
+        prerender.submit(prerender.make_key("prescription", **prescription),
+                         lambda: create_prescription_pdf_bytes(**prescription))
 
 
 @certificate_bp.route("/", methods=["GET"])
@@ -67,7 +91,7 @@ def certificate():
     """
     Renders the main certificate choice page.
     """
-    return render_template("certificate.html")
+    return render_cached("certificate.html")
 
 
 @certificate_bp.route("/prescription/", methods=["GET"])
@@ -92,40 +116,26 @@ def generate_prescription_pdf():
     payment_status_verified = False
     if patient_rrn: # Ensure RRN is available
         try:
-            with open(RESERVATIONS_CSV, 'r', newline='', encoding='utf-8-sig') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row.get("rrn") == patient_rrn:
-                        if row.get("payment_status") == "Paid":
-                            payment_status_verified = True
-                        break # Found patient's record
+            with metrics.timed("csv_read", op="payment_check"):
+                status = reservation_store.get_store(RESERVATIONS_CSV).payment_status(patient_rrn)
+            payment_status_verified = status == "Paid"
         except FileNotFoundError:
             # app.logger.error(f"Reservations CSV file not found: {RESERVATIONS_CSV}")
+            metrics.inc(metrics.ERRORS_TOTAL, source="certificate", reason="reservations_missing")
             return redirect(url_for("payment.payment", error="system_error_reservations_missing"))
         except Exception as e:
             # app.logger.error(f"Error reading reservations CSV: {e}")
+            metrics.inc(metrics.ERRORS_TOTAL, source="certificate", reason="csv_access")
             return redirect(url_for("payment.payment", error="system_error_csv_access"))
 
     if not payment_status_verified:
         session['payment_complete'] = False # Sync session state
         return redirect(url_for("payment.payment", error="payment_not_completed"))
 
-    # Try to use prescription data stored during the payment step
-    last_prescriptions = session.get("last_prescriptions")
-    last_total_fee = session.get("last_total_fee")
-
-    if last_prescriptions is not None and last_total_fee is not None:
-        prescription_info = {
-            "prescriptions": last_prescriptions,
-            "total_fee": last_total_fee,
-        }
-        # Optionally clear the stored values after use
-        session.pop("last_prescriptions", None)
-        session.pop("last_total_fee", None)
-    else:
-        prescription_info = _load_prescription_data(department)
+    # Same plan that was billed at the payment step
+    inputs = _prescription_inputs(patient_name, patient_rrn, department)
 
-    if prescription_info is None or not prescription_info["prescriptions"]:
+    if inputs is None:
         # This could happen if CSV is missing, dept not found, or no items for dept.
         # Redirecting to payment, as per instruction, though this might be confusing.
         # A better UX might be to show an error on the certificate page itself
@@ -137,18 +147,16 @@ def generate_prescription_pdf():
         return redirect(url_for("payment.payment", error="no_prescription_items"))
 
 
-    # Generate PDF
-    try:
-        pdf_bytes = create_prescription_pdf_bytes(
-            patient_name=patient_name,
-            patient_rrn=patient_rrn,
-            department=department,
-            prescriptions=prescription_info["prescriptions"],
-            total_fee=prescription_info["total_fee"],
-        )
-    except MissingKoreanFontError as e:
-        return render_template("error.html", message=str(e)), 500
+    # Rendered in the background after payment if possible, otherwise generate now
+    pdf_bytes = prerender.take(prerender.make_key("prescription", **inputs))
+    if pdf_bytes is None:
+        try:
+            pdf_bytes = create_prescription_pdf_bytes(**inputs)
+        except MissingKoreanFontError as e:
+            metrics.inc(metrics.ERRORS_TOTAL, source="certificate", reason="missing_font")
+            return render_template("error.html", message=str(e)), 500
 
+    aggregates.record_certificate(department, "prescription")
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"prescription_{patient_rrn.split('-')[0]}_{timestamp}.pdf"
 
@@ -178,34 +186,33 @@ def generate_confirmation_pdf():
     payment_status_verified = False
     if patient_rrn: # Ensure RRN is available
         try:
-            with open(RESERVATIONS_CSV, 'r', newline='', encoding='utf-8-sig') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row.get("rrn") == patient_rrn:
-                        if row.get("payment_status") == "Paid":
-                            payment_status_verified = True
-                        break # Found patient's record
+            with metrics.timed("csv_read", op="payment_check"):
+                status = reservation_store.get_store(RESERVATIONS_CSV).payment_status(patient_rrn)
+            payment_status_verified = status == "Paid"
         except FileNotFoundError:
             # app.logger.error(f"Reservations CSV file not found: {RESERVATIONS_CSV}")
+            metrics.inc(metrics.ERRORS_TOTAL, source="certificate", reason="reservations_missing")
             return redirect(url_for("payment.payment", error="system_error_reservations_missing"))
         except Exception as e:
             # app.logger.error(f"Error reading reservations CSV: {e}")
+            metrics.inc(metrics.ERRORS_TOTAL, source="certificate", reason="csv_access")
             return redirect(url_for("payment.payment", error="system_error_csv_access"))
 
     if not payment_status_verified:
         session['payment_complete'] = False # Sync session state
         return redirect(url_for("payment.payment", error="payment_not_completed"))
 
-    # Generate PDF
-    try:
-        pdf_bytes = create_confirmation_pdf_bytes(
-            patient_name=patient_name,
-            patient_rrn=patient_rrn,
-            disease_name=department,  # department is used as disease_name
-        )
-    except MissingKoreanFontError as e:
-        return render_template("error.html", message=str(e)), 500
+    # Rendered in the background after payment if possible, otherwise generate now
+    inputs = _confirmation_inputs(patient_name, patient_rrn, department)
+    pdf_bytes = prerender.take(prerender.make_key("confirmation", **inputs))
+    if pdf_bytes is None:
+        try:
+            pdf_bytes = create_confirmation_pdf_bytes(**inputs)
+        except MissingKoreanFontError as e:
+            metrics.inc(metrics.ERRORS_TOTAL, source="certificate", reason="missing_font")
+            return render_template("error.html", message=str(e)), 500
 
+    aggregates.record_certificate(department, "confirmation")
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"medical_confirmation_{patient_rrn.split('-')[0]}_{timestamp}.pdf"
 
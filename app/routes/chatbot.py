@@ -1,14 +1,16 @@
 import os
 import csv # Added for potential direct use if lookup_reservation is adapted
 import re # Added for regex parsing
-import random # Added for get_prescription_details_for_payment
 import google.generativeai as genai
-from flask import Blueprint, request, jsonify, render_template, session, url_for
+from flask import Blueprint, request, jsonify, render_template, session, url_for, g
 import base64
 from io import BytesIO
 # PIL might be needed for image validation or manipulation, but not directly for API call if blobs are correct
 # from PIL import Image
 from app.routes.reception import lookup_reservation # Added import
+from app.utils import metrics, payment_gateway, prescription_plans, prompt_builder
+from app.utils import asgi_bridge, conversation_memory, reservation_store, resilience
+from app.utils.singleflight import SingleFlight
 
 chatbot_bp = Blueprint('chatbot', __name__, url_prefix='/api') # Added url_prefix for /api
 
@@ -16,6 +18,7 @@ chatbot_bp = Blueprint('chatbot', __name__, url_prefix='/api') # Added url_prefi
 CHATBOT_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
 TREATMENT_FEES_CSV_PATH = os.path.join(CHATBOT_BASE_DIR, "data", "treatment_fees.csv")
 RESERVATIONS_CSV_PATH = os.path.join(CHATBOT_BASE_DIR, "data", "reservations.csv")
+PRESCRIPTION_ITEMS_CSV_PATH = os.path.join(CHATBOT_BASE_DIR, "data", "prescription_items.csv")
 
 
 # System Prompt / Instructions for the Gemini Model (Synthesized from Kiosk2 context)
@@ -60,6 +63,45 @@ SYSTEM_INSTRUCTION_PROMPT = """당신은 대한민국 공공 보건소의 친절
 
 이제 방문객의 질문에 답변해주세요."""
 
+MODEL_NAME = "gemini-1.5-flash-latest"  # Or whichever model Kiosk2 used / is preferred
+
+# Gemini 가 응답하지 않거나 회로 차단기가 열려 있을 때의 로컬 대체 응답
+LLM_FALLBACK_REPLY = (
+    "죄송합니다. 현재 AI 안내 서비스 연결이 원활하지 않습니다. "
+    "접수·수납·증명서 발급은 화면의 버튼으로 계속 이용하실 수 있습니다. "
+    "도움이 필요하시면 가까운 직원에게 말씀해주세요."
+)
+
+# 동시에 들어온 동일한 일반 질문은 Gemini 호출 1건을 공유
+_llm_flight = SingleFlight("gemini")
+_RRN_LIKE_RE = re.compile(r"\d{6}\s*-?\s*\d{7}")
+_PHONE_LIKE_RE = re.compile(r"01\d[\s-]?\d{3,4}[\s-]?\d{4}")
+# 응답 후처리에서 이름·주민번호 추출 (모듈 로드 시 한 번만 컴파일)
+_AI_NAME_RE = re.compile(r"(?:이름|성함)[\s:]*([가-힣]{2,10})")
+_AI_RRN_RE = re.compile(r"주민번호[\s:]*(\d{6}-\d{7})")
+_NAME_RE = re.compile(r"([가-힣]{2,10})")
+_RRN_RE = re.compile(r"(\d{6}-\d{7})")
+
+def _coalesce_key(user_question, state_block, image_blob, history, name, rrn):
+    """
+    요청 병합 키. 개인정보(세션의 이름·주민번호, 메시지 속 주민번호·전화번호),
+    이미지, 이전 대화가 있는 요청은 병합하지 않으므로 None 을 반환한다.
+    """
+    if image_blob or history or name or rrn:
+        return None
+    if _RRN_LIKE_RE.search(user_question) or _PHONE_LIKE_RE.search(user_question):
+        return None
+    normalized = " ".join(user_question.split()).casefold().rstrip("?.!？ ")
+    return f"{state_block}\x1f{normalized}"
+
+def prepare_model(api_key):
+    """
+    Gemini 클라이언트 설정 + 모델 준비 (시작 시 warm-up 에서도 호출).
+    시스템 지시문은 모델에 한 번만 등록 (요청마다 본문에 재전송하지 않음)
+    """
+    prompt_builder.configure(api_key)
+    return prompt_builder.get_model(MODEL_NAME, SYSTEM_INSTRUCTION_PROMPT)
+
 def process_rrn_reception(user_message, ai_response_text):
     """
     Processes the AI response to check for RRN reception intent and handles reservation lookup.
@@ -69,19 +111,19 @@ def process_rrn_reception(user_message, ai_response_text):
         rrn = None
 
         # Attempt to parse Name and RRN from AI response
-        name_match_ai = re.search(r"(?:이름|성함)[\s:]*([가-힣]{2,10})", ai_response_text)  # Allow '성함' and optional colon
-        rrn_match_ai = re.search(r"주민번호[\s:]*(\d{6}-\d{7})", ai_response_text)
+        name_match_ai = _AI_NAME_RE.search(ai_response_text)  # Allow '성함' and optional colon
+        rrn_match_ai = _AI_RRN_RE.search(ai_response_text)
 
         if name_match_ai and rrn_match_ai:
             name = name_match_ai.group(1)
             rrn = rrn_match_ai.group(1)
         else:
             # Fallback: Attempt to parse Name and RRN from user message
-            name_match_user = re.search(r"([가-힣]{2,10})", user_message) # Adjusted length for name
-            rrn_match_user = re.search(r"(\d{6}-\d{7})", user_message)
+            name_match_user = _NAME_RE.search(user_message) # Adjusted length for name
+            rrn_match_user = _RRN_RE.search(user_message)
 
             if name_match_user:
-                name_candidates = re.findall(r"([가-힣]{2,10})", user_message)
+                name_candidates = _NAME_RE.findall(user_message)
                 if name_match_ai: name = name_match_ai.group(1)
                 elif name_candidates: name = name_candidates[0] # Fallback to first found in user message
 
@@ -120,6 +162,7 @@ def process_rrn_reception(user_message, ai_response_text):
                     return f"성함 {name}, 주민등록번호 {rrn} 님, 확인된 예약 내역이 없습니다. 증상으로 접수하시겠습니까?"
             except Exception as e:
                 # Log the error for server-side review: print(f"Error in lookup_reservation: {e}")
+                metrics.inc(metrics.ERRORS_TOTAL, source="chatbot", reason="reservation_lookup")
                 # Potentially, the CSV file might not be found or there's a format issue.
                 # Provide a generic message to the user or indicate a system issue.
                 return "예약 정보를 조회하는 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요."
@@ -130,36 +173,27 @@ def process_rrn_reception(user_message, ai_response_text):
             return None # AI might be asking for clarification
     return None
 
-def get_prescription_details_for_payment(department):
+def get_prescription_details_for_payment(department, rrn=None):
     if not os.path.exists(TREATMENT_FEES_CSV_PATH):
         print(f"Error: {TREATMENT_FEES_CSV_PATH} not found.") # Or log
+        metrics.inc(metrics.ERRORS_TOTAL, source="chatbot", reason="treatment_fees_missing")
         return None
 
-    prescriptions_for_dept = []
+    # 방문별 처방 계획 — 수납 화면·처방전과 같은 항목 (진료과는 대소문자 무시)
     try:
-        with open(TREATMENT_FEES_CSV_PATH, newline='', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row["Department"].strip().lower() == department.strip().lower(): # Case-insensitive department match
-                    prescriptions_for_dept.append({"Prescription": row["Prescription"], "Fee": float(row["Fee"])})
+        plan = prescription_plans.plan_for(rrn, department, TREATMENT_FEES_CSV_PATH,
+                                           PRESCRIPTION_ITEMS_CSV_PATH)
     except Exception as e:
         print(f"Error reading/processing {TREATMENT_FEES_CSV_PATH}: {e}") # Or log
+        metrics.inc(metrics.ERRORS_TOTAL, source="chatbot", reason="treatment_fees_csv")
         return None
 
-    if not prescriptions_for_dept:
+    if not plan["prescriptions"]:
         return {"prescriptions": [], "total_fee": 0.0, "error": f"진료과 '{department}'에 대한 처방 정보가 없습니다."}
 
-    num_to_select = random.randint(2, 3)
-    if len(prescriptions_for_dept) < num_to_select:
-        selected_prescriptions = prescriptions_for_dept
-    else:
-        selected_prescriptions = random.sample(prescriptions_for_dept, num_to_select)
-
-    total_fee = sum(p["Fee"] for p in selected_prescriptions)
+    formatted_prescriptions = [{"name": p["name"], "fee": float(p["fee"])} for p in plan["prescriptions"]]
 
-    formatted_prescriptions = [{"name": p["Prescription"], "fee": p["Fee"]} for p in selected_prescriptions]
-
-    return {"prescriptions": formatted_prescriptions, "total_fee": total_fee}
+    return {"prescriptions": formatted_prescriptions, "total_fee": float(plan["total_fee"])}
 
 def process_rrn_payment(user_message, ai_response_text):
     if "[RRN_PAYMENT_INTENT]" not in ai_response_text:
@@ -169,15 +203,15 @@ def process_rrn_payment(user_message, ai_response_text):
     if not session.get('reception_complete'):
         return "접수를 먼저 완료해주세요. 접수 완료 후 수납을 진행할 수 있습니다."
 
-    name_match_ai = re.search(r"(?:이름|성함)[\s:]*([가-힣]{2,10})", ai_response_text)
-    rrn_match_ai = re.search(r"주민번호[\s:]*(\d{6}-\d{7})", ai_response_text)
+    name_match_ai = _AI_NAME_RE.search(ai_response_text)
+    rrn_match_ai = _AI_RRN_RE.search(ai_response_text)
 
     name = name_match_ai.group(1) if name_match_ai else None
     rrn = rrn_match_ai.group(1) if rrn_match_ai else None
 
     if not name or not rrn:  # Fallback to user message
-        name_match_user = re.search(r"([가-힣]{2,10})", user_message)
-        rrn_match_user = re.search(r"(\d{6}-\d{7})", user_message)
+        name_match_user = _NAME_RE.search(user_message)
+        rrn_match_user = _RRN_RE.search(user_message)
         if not name and name_match_user:
             name = name_match_user.group(1)
         if not rrn and rrn_match_user:
@@ -198,7 +232,7 @@ def process_rrn_payment(user_message, ai_response_text):
         return f"성함 {name}(주민번호 {rrn}) 님, 예약 정보를 찾을 수 없어 수납 처리를 진행할 수 없습니다. 먼저 접수를 완료해주세요."
 
     department = reservation_details["department"]
-    payment_info = get_prescription_details_for_payment(department)
+    payment_info = get_prescription_details_for_payment(department, rrn)
 
     if not payment_info:
         return f"성함 {name} 님 ({department}), 현재 해당 진료과에 대한 수납 정보를 불러올 수 없습니다. 직원에게 문의해주세요."
@@ -272,55 +306,79 @@ def process_kiosk_status_check(user_message, ai_response_text):
             return "접수와 수납이 모두 완료되었습니다. 이제 증명서를 발급받으실 수 있습니다. 원하시는 증명서 종류를 말씀해주세요 (예: '처방전 발급' 또는 '진료확인서 발급')."
     return None
 
+@metrics.timed("status_write", op="reservation_status")
 def update_reservation_status(rrn, status):
     """Update the payment_status column for a reservation identified by rrn."""
     if not rrn:
         return False
 
-    expected_fieldnames = [
-        'name', 'rrn', 'time', 'department', 'location', 'doctor', 'payment_status'
-    ]
-
     try:
-        rows = []
-        current_fieldnames = []
-
         if not os.path.exists(RESERVATIONS_CSV_PATH):
             with open(RESERVATIONS_CSV_PATH, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=expected_fieldnames)
+                writer = csv.DictWriter(file, fieldnames=reservation_store.FIELDNAMES)
                 writer.writeheader()
             return False
 
-        with open(RESERVATIONS_CSV_PATH, 'r', newline='', encoding='utf-8-sig') as file:
-            reader = csv.DictReader(file)
-            current_fieldnames = reader.fieldnames or list(expected_fieldnames)
-            rows = list(reader)
-
-        if 'payment_status' not in current_fieldnames:
-            current_fieldnames.append('payment_status')
-
-        updated = False
-        for row in rows:
-            if 'payment_status' not in row:
-                row['payment_status'] = 'Pending'
-            if row.get('rrn') == rrn:
-                if row.get('payment_status') != status:
-                    row['payment_status'] = status
-                updated = True
-
-        if updated:
-            with open(RESERVATIONS_CSV_PATH, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=current_fieldnames)
-                writer.writeheader()
-                writer.writerows(rows)
-
-        return updated
+        return reservation_store.get_store(RESERVATIONS_CSV_PATH).update_status(rrn, status)
     except Exception:
+        metrics.inc(metrics.ERRORS_TOTAL, source="reservations", reason="status_write")
         return False
 
-def update_payment_status_in_csv(patient_rrn):
-    """Mark the given patient's reservation as Paid."""
-    return update_reservation_status(patient_rrn, "Paid")
+def _sync_chat_payment():
+    """챗봇으로 시작한 결제가 끝났으면 세션에 반영하고 결제 기록 반환 (진행 중인 결제가 없으면 None)"""
+    pay_id = session.get('chat_payment_id')
+    if not pay_id:
+        return None
+    record = payment_gateway.gateway.get(pay_id)
+    if record is None or payment_gateway.settled(record):
+        session.pop('chat_payment_id', None)
+        session.pop('chat_payment_key', None)   # 다음 결제는 새 키로
+    if record is not None and payment_gateway.settled(record) and record["state"] == payment_gateway.CAPTURED:
+        session['payment_complete'] = True
+    return record
+
+
+def _chat_payment_reply(record):
+    """결제를 맡긴 직후의 챗봇 응답 — 결과는 화면이 payment_status_url 을 조회하거나 다음 대화에서 확인"""
+    if session.get('payment_complete'):
+        return {"reply": "수납이 완료되었습니다.", "audio_confirmation_url": "/static/audio/payment_completed.mp3"}
+    if payment_gateway.settled(record):
+        return "결제가 승인되지 않았습니다. 다시 시도하시거나 직원에게 문의해주세요."
+    return {
+        "reply": "결제 승인을 기다리고 있습니다. 승인이 끝나면 수납 완료를 알려드립니다.",
+        "payment_id": record["id"],
+        "payment_status_url": f"/payment/status/{record['id']}",
+    }
+
+
+def start_chat_payment():
+    """
+    챗봇 수납 확인 — 결제 화면과 같은 결제 경로(payment_gateway → 매입 뒤 Paid 기록·증명서 미리 만들기).
+    금액은 처방 계획 합계. 같은 견적에 두 번 확인해도 idempotency key 가 같아 결제는 한 번.
+    승인·매입을 기다리지 않고 바로 응답(dict)을 반환하며, 시작하지 못하면 안내 문구(str).
+    """
+    patient_rrn = session.get('patient_rrn')
+    department = session.get('department')
+    if not patient_rrn or not department:
+        return "환자 정보(주민등록번호)가 없어 수납 처리를 완료할 수 없습니다. 접수를 다시 진행해주세요."
+    try:
+        plan = prescription_plans.plan_for(patient_rrn, department, TREATMENT_FEES_CSV_PATH, PRESCRIPTION_ITEMS_CSV_PATH)
+    except Exception:
+        metrics.inc(metrics.ERRORS_TOTAL, source="chatbot", reason="treatment_fees_csv")
+        return "수납 정보를 불러오지 못했습니다. 직원에게 문의해주세요."
+    amount = float(plan["total_fee"])
+    if amount <= 0:
+        return "수납할 금액이 없습니다. 직원에게 문의해주세요."
+
+    key = session.get('chat_payment_key') or payment_gateway.new_idempotency_key()
+    session['chat_payment_key'] = key
+    record = payment_gateway.gateway.start(amount, "card", key, department=department, context={
+        "patient_rrn": patient_rrn,
+        "patient_name": session.get('patient_name'),
+    })
+    session['chat_payment_id'] = record["id"]
+    # 같은 키로 이미 끝난 결제면 여기서 바로 반영됨
+    return _chat_payment_reply(_sync_chat_payment() or record)
 
 def process_user_confirmed_payment(user_message, ai_response_text):
     if "[USER_CONFIRMED_PAYMENT_INTENT]" in ai_response_text:
@@ -330,21 +388,7 @@ def process_user_confirmed_payment(user_message, ai_response_text):
         if session.get('payment_complete'):
             return "이미 수납이 완료되었습니다. 증명서 발급 등 다음 서비스를 이용해주세요."
 
-        patient_rrn = session.get('patient_rrn')
-        if not patient_rrn:
-            return "환자 정보(주민등록번호)가 없어 수납 처리를 완료할 수 없습니다. 접수를 다시 진행해주세요."
-
-        if update_payment_status_in_csv(patient_rrn):
-            session['payment_complete'] = True
-            return None # Success, use AI's response ("수납이 완료되었습니다.")
-        else:
-            # Check if it failed because already paid vs actual error
-            # For now, a general error if update_payment_status_in_csv didn't result in a positive update confirmation
-            # or if the patient was not found.
-            # If update_payment_status_in_csv returns True only when it actively changed status to "Paid"
-            # or confirmed it is "Paid", this logic is okay.
-            # The refined update_payment_status_in_csv returns True if target patient is now "Paid".
-            return "수납 처리 중 오류가 발생했거나, 사용자 정보를 찾을 수 없어 완료하지 못했습니다. 직원에게 문의해주세요."
+        return start_chat_payment()
     return None # No intent match
 
 @chatbot_bp.route('/chatbot', methods=['POST'])
@@ -359,30 +403,39 @@ def handle_chatbot_request():
     if not user_question:
         return jsonify({"error": "No message (user_question) provided"}), 400
 
+    # 응답이 나가면 _remember_turn() 에서 대화 기억에 기록
+    g.chat_question = user_question
+
+    confirmation_terms = ["네", "예", "수납해줘", "결제해줘"]
+    confirmed = any(term in user_question.strip() for term in confirmation_terms)
+
+    # 앞서 챗봇으로 시작한 결제가 그 사이 끝났으면 반영 — 승인되지 않았으면 알리고 다시 확인받음
+    payment = _sync_chat_payment()
+    if payment is not None and payment_gateway.settled(payment) and payment["state"] != payment_gateway.CAPTURED:
+        session['awaiting_payment_confirmation'] = True
+        if not confirmed:
+            return jsonify({"reply": "결제가 승인되지 않았습니다. 다시 결제하시려면 '네'라고 말씀해주세요."})
+
     # Handle simple payment confirmations without calling Gemini
     if session.get('awaiting_payment_confirmation'):
-        confirmation_terms = ["네", "예", "수납해줘", "결제해줘"]
-        clean_msg = user_question.strip()
-        if any(term in clean_msg for term in confirmation_terms):
-            patient_rrn = session.get('patient_rrn')
-            if update_payment_status_in_csv(patient_rrn):
-                session['payment_complete'] = True
+        if confirmed:
             session.pop('awaiting_payment_confirmation', None)
-            return jsonify({"reply": "수납이 완료되었습니다.", "audio_confirmation_url": "/static/audio/payment_completed.mp3"})
+            payment_reply = start_chat_payment()
+            if isinstance(payment_reply, dict):
+                return jsonify(payment_reply)
+            return jsonify({"reply": payment_reply})
 
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         return jsonify({"error": "API key not configured"}), 500
 
     try:
-        genai.configure(api_key=api_key)
+        model = prepare_model(api_key)
     except Exception as e:
         # This could catch issues with the API key format or other genai config errors
+        metrics.inc(metrics.ERRORS_TOTAL, source="chatbot", reason="genai_configure")
         return jsonify({"error": f"Failed to configure Generative AI: {str(e)}"}), 500
 
-    model_name = "gemini-1.5-flash-latest"  # Or whichever model Kiosk2 used / is preferred
-    model = genai.GenerativeModel(model_name)
-
     current_status = None
     name = session.get('patient_name')
     rrn = session.get('patient_rrn')
@@ -391,8 +444,7 @@ def handle_chatbot_request():
         if details:
             current_status = details.get('status')
 
-    prompt_parts = [SYSTEM_INSTRUCTION_PROMPT]
-
+    image_blob = None
     if base64_image_data:
         try:
             # Remove potential data URI prefix (e.g., "data:image/jpeg;base64,")
@@ -415,28 +467,47 @@ def handle_chatbot_request():
             #     return jsonify({"error": f"Invalid image data: {str(img_e)}"}), 400
 
             image_blob = {"mime_type": mime_type, "data": image_bytes}
-            prompt_parts.append(image_blob) # Append image if present
         except Exception as e:
             return jsonify({"error": f"Error processing image data: {str(e)}"}), 400
 
-    state_tuple = (
-        f"접수완료:{session.get('reception_complete')}, ",
-        f"수납완료:{session.get('payment_complete')}, ",
-        f"이름:{name}, ",
-        f"주민번호:{rrn}, ",
-        f"진료과:{session.get('department')}, ",
-        f"상태:{current_status}"
+    state_block = prompt_builder.encode_state(
+        reception_complete=session.get('reception_complete'),
+        payment_complete=session.get('payment_complete'),
+        name=name,
+        rrn=rrn,
+        department=session.get('department'),
+        status=current_status,
+    )
+    conversation = conversation_memory.store.get(conversation_memory.session_id_for(session))
+    prompt_parts = prompt_builder.build_prompt(
+        user_question, state_block, image_blob,
+        history=conversation.history(),
+        summary=conversation.summary(),
     )
-    for state_item in state_tuple:
-        prompt_parts.append(state_item)
-
-    prompt_parts.append("\n\n사용자 질문:\n")
-    prompt_parts.append(user_question)
 
     try:
         # Generation config can be added here if needed (temperature, top_k, etc.)
         # generation_config = genai.types.GenerationConfig(temperature=0.7)
-        response = model.generate_content(prompt_parts) #, generation_config=generation_config)
+        # 마감시간·재시도·회로 차단기로 보호된 호출 (resilience.generate_content)
+        # 개인정보가 없는 동일 질문이 동시에 들어오면 진행 중인 호출 결과를 공유
+        coalesce_key = _coalesce_key(user_question, state_block, image_blob,
+                                     conversation.history(), name, rrn)
+        outcome = request.environ.get(asgi_bridge.LLM_RESULT)
+        if outcome is not None:
+            # ASGI 모드 2단계: 이벤트 루프에서 받아 온 결과로 후처리만 수행
+            response = outcome.get()
+        elif request.environ.get(asgi_bridge.LLM_DEFER):
+            # ASGI 모드 1단계: 호출 정보만 넘기고 스레드를 반납
+            request.environ[asgi_bridge.LLM_CALL] = asgi_bridge.LLMCall(model, prompt_parts, coalesce_key)
+            return asgi_bridge.deferred_response()
+        else:
+            with metrics.timed("llm_call", op="generate_content"):
+                if coalesce_key is None:
+                    response = resilience.generate_content(model, prompt_parts) #, generation_config=generation_config)
+                else:
+                    response = _llm_flight.do(
+                        coalesce_key, lambda: resilience.generate_content(model, prompt_parts))
+        prompt_builder.record_usage(response)
 
         # Check for safety ratings and blockages as in Kiosk2
         if not response.candidates:
@@ -445,8 +516,10 @@ def handle_chatbot_request():
             # Check response.prompt_feedback if available and has block reason
             if response.prompt_feedback and response.prompt_feedback.block_reason:
                 block_reason = response.prompt_feedback.block_reason.name
+                metrics.inc(metrics.CHATBOT_BLOCKED_TOTAL, reason=block_reason)
                 error_message = f"요청이 안전 설정에 의해 차단되었습니다. 이유: {block_reason}. 다른 질문을 시도해주세요."
                 return jsonify({"error": "Blocked by safety settings", "details": error_message, "reply": error_message}), 400
+            metrics.inc(metrics.CHATBOT_BLOCKED_TOTAL, reason="no_candidates")
             return jsonify({"error": "No response generated", "reply": "죄송합니다. 현재 답변을 생성할 수 없습니다. 잠시 후 다시 시도해주세요."}), 500
 
 
@@ -454,11 +527,13 @@ def handle_chatbot_request():
         if not response.candidates or not response.candidates[0].content or not response.candidates[0].content.parts:
             if response.prompt_feedback and response.prompt_feedback.block_reason:
                 # ... (handle prompt blocked) ...
+                metrics.inc(metrics.CHATBOT_BLOCKED_TOTAL, reason=response.prompt_feedback.block_reason.name)
                 error_message = f"요청이 안전 설정에 의해 차단되었습니다. 이유: {response.prompt_feedback.block_reason.name}."
                 return jsonify({"error": "Blocked by safety settings", "details": error_message, "reply": error_message}), 400
             # This check should be more specific. If candidates exist but parts don't, it implies a non-STOP finish reason.
             if response.candidates and response.candidates[0].finish_reason != genai.types.Candidate.FinishReason.STOP:
                 # ... (handle non-STOP finish reasons like SAFETY, RECITATION etc.) ...
+                metrics.inc(metrics.CHATBOT_BLOCKED_TOTAL, reason=response.candidates[0].finish_reason.name)
                 error_message = f"답변 생성 중 예상치 못한 이유({response.candidates[0].finish_reason.name})로 중단되었습니다."
                 return jsonify({"error": "Response generation stopped", "reply": error_message}), 500
             # Default fallback if no parts for other reasons
@@ -469,11 +544,11 @@ def handle_chatbot_request():
         # Check for payment confirmation intent first
         if "[USER_CONFIRMED_PAYMENT_INTENT]" in bot_response_text:
             action_message = process_user_confirmed_payment(user_question, bot_response_text)
+            if isinstance(action_message, dict):
+                # 결제를 맡김 — 완료 여부는 결제 상태 조회로 확인 (AI 의 "수납이 완료되었습니다." 는 쓰지 않음)
+                return jsonify(action_message)
             if action_message:
                 return jsonify({"reply": action_message})
-            # If action_message is None, backend processing was successful.
-            # bot_response_text (which should be "수납이 완료되었습니다.") will be used.
-            # So, we fall through to the end of the function to return jsonify({"reply": bot_response_text})
 
         # Attempt to process for RRN reception
         reception_response = process_rrn_reception(user_question, bot_response_text)
@@ -508,17 +583,35 @@ def handle_chatbot_request():
             bot_response_text = "죄송합니다. 현재 적절한 답변을 드리기 어렵습니다. 다른 방식으로 질문해주시겠어요?"
         return jsonify({"reply": bot_response_text})
 
+    except (resilience.CircuitOpenError, resilience.DeadlineExceededError, *resilience.TRANSIENT_ERRORS) as e:
+        # 업스트림 장애 · 지연 → 즉시 로컬 대체 응답 (다른 키오스크 기능은 계속 사용 가능)
+        metrics.inc(metrics.ERRORS_TOTAL, source="chatbot", reason=type(e).__name__)
+        return jsonify({"reply": LLM_FALLBACK_REPLY, "fallback": True})
     except genai.types.BlockedPromptException as bpe:
         # This exception is specifically for when the prompt is blocked.
         # The general check above for response.prompt_feedback might catch this too.
         block_reason = str(bpe) # The exception itself might contain the reason
+        metrics.inc(metrics.CHATBOT_BLOCKED_TOTAL, reason="BlockedPromptException")
         error_message = f"요청이 안전 설정에 의해 차단되었습니다: {block_reason}. 다른 질문을 시도해주세요."
         return jsonify({"error": "Blocked by safety settings", "details": error_message, "reply": error_message}), 400
     except Exception as e:
         # General error handling for API calls or other unexpected issues
         # Log the error for server-side review: print(f"Error generating content: {e}")
+        metrics.inc(metrics.ERRORS_TOTAL, source="chatbot", reason=type(e).__name__)
         return jsonify({"error": "Error communicating with AI service", "reply": f"AI 서비스 오류: {str(e)}"}), 500
 
+@chatbot_bp.after_request
+def _remember_turn(response):
+    """성공한 챗봇 응답을 (질문, 답변) 한 턴으로 세션 대화 기억에 저장"""
+    question = g.pop("chat_question", None)
+    if question and response.status_code == 200 and response.is_json:
+        data = response.get_json(silent=True) or {}
+        reply = data.get("reply")
+        if reply and not data.get("fallback"):
+            conversation_memory.store.record(
+                conversation_memory.session_id_for(session), question, reply)
+    return response
+
 # Example of how to register this blueprint in app/__init__.py:
 # from .routes.chatbot import chatbot_bp
 # app.register_blueprint(chatbot_bp)
@@ -0,0 +1,24 @@
+"""
+상태 확인 (Blueprint)
+  • GET /healthz/ready   → 시작 warm-up 이 끝났으면 200, 진행 중이면 503 + Retry-After,
+                           필수 단계가 실패했으면 503 (status "failed")
+"""
+from flask import Blueprint, current_app, jsonify
+
+health_bp = Blueprint("health", __name__, url_prefix="/healthz")
+
+
+@health_bp.route("/ready", methods=["GET"])
+def ready():
+    """
+    로드밸런서 준비 상태 확인용 — 단계별 소요 시간과 실패 내용을 함께 반환
+    """
+    warmup = current_app.extensions.get("warmup")
+    if warmup is None:
+        return jsonify({"status": "ready"}), 200
+    if not warmup.ready:
+        return jsonify(warmup.as_dict()), 503, {"Retry-After": "1"}
+    if warmup.failed:
+        # 캐시·인덱스를 만들지 못한 worker 에는 트래픽을 보내지 않음 (재시작해야 회복)
+        return jsonify(warmup.as_dict()), 503
+    return jsonify(warmup.as_dict()), 200
@@ -3,6 +3,7 @@
 """
 from flask import Blueprint, render_template, session, redirect, request, url_for
 from app.utils.i18n import get_locale
+from app.utils.page_cache import render_cached
 
 home_bp = Blueprint("home", __name__)
 
@@ -23,7 +24,7 @@ def inject_globals():
 # ────────────────────────────────────────────────
 @home_bp.route("/")
 def index():
-    return render_template("home.html")
+    return render_cached("home.html")
 
 # ────────────────────────────────────────────────
 # 글꼴 크기 변경: /font/<size>
@@ -46,4 +47,4 @@ def switch_language():
 
 @home_bp.route("/emergency")
 def emergency():
-    return render_template("emergency.html")
+    return render_cached("emergency.html")
@@ -0,0 +1,16 @@
+"""
+계측 데이터 노출 (Blueprint)
+  • GET /metrics   → Prometheus text format
+"""
+from flask import Blueprint, Response
+from app.utils import metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics")
+def export_metrics():
+    """
+    수집된 메트릭을 Prometheus 스크레이프 형식으로 반환
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
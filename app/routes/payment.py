@@ -1,15 +1,18 @@
 """
 진료비 수납 (Blueprint)
-  • GET  /payment/       → 결제 폼
-  • POST /payment/       → 결제 처리 → /payment/done
-  • GET  /payment/done   → 결제 완료 화면
+  • GET  /payment/              → 결제 폼 (결제 시도마다 idempotency key 발급)
+  • POST /payment/              → 결제 시작 (승인·매입은 app.utils.payment_gateway 가 백그라운드에서) → /payment/done
+                                   금액은 폼 값이 아니라 서버의 처방 계획(prescription_plans) 합계
+  • GET  /payment/done          → 진행 중이면 대기 화면, 끝나면 완료·실패 화면
+  • GET  /payment/status/<id>   → 결제 상태 JSON (대기 화면이 1초마다 조회 — 요청 스레드를 붙잡지 않음)
 """
-import uuid
 from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
-import random
-import csv
 import os
+from app.routes.certificate import prerender_certificates
 from app.routes.chatbot import update_reservation_status
+from app.utils import metrics, payment_gateway, prescription_plans
+from app.utils.aggregates import aggregates
+from app.utils.payment_gateway import CAPTURED, gateway
 
 # ──────────────────────────────────────────────────────────
 #  Blueprint 인스턴트를 'payment_bp'라는 이름으로 노출
@@ -20,9 +23,19 @@ payment_bp = Blueprint("payment", __name__, url_prefix="/payment")
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
 TREATMENT_FEES_CSV = os.path.join(BASE_DIR, "data", "treatment_fees.csv")
 RESERVATIONS_CSV = os.path.join(BASE_DIR, "data", "reservations.csv")
+PRESCRIPTION_ITEMS_CSV = os.path.join(BASE_DIR, "data", "prescription_items.csv")
 
-# 인-메모리 결제 내역(데모용)
-payments: list[dict] = []
+
+def _after_capture(record: dict, context: dict) -> None:
+    """매입 완료 — 집계 반영, 예약을 Paid 로 바꾸고 증명서를 미리 만들어 둠 (결제 처리 스레드에서)"""
+    aggregates.record_payment(record["department"], record["method"], record["amount"])
+    patient_rrn = context.get("patient_rrn")
+    if patient_rrn and update_reservation_status(patient_rrn, "Paid"):
+        # 대부분 곧바로 증명서를 발급받으므로 백그라운드에서 미리 만들어 둠
+        prerender_certificates(context.get("patient_name"), patient_rrn, record["department"])
+
+
+gateway.on_captured = _after_capture
 
 
 @payment_bp.route("/", methods=["GET", "POST"])
@@ -39,30 +52,42 @@ def payment():
     if request.method == "GET":
         # When first loading the payment page for a valid user
         session['payment_complete'] = False # Reset if they are just landing here
-        return render_template("payment.html", step="initial_payment", department=department)
+        return render_template("payment.html", step="initial_payment", department=department,
+                               idempotency_key=payment_gateway.new_idempotency_key())
 
     if request.method == "POST":
-        patient_id = request.form.get("patient_id", "").strip()
-
-        # 천 단위 콤마가 들어와도 안전하게 float 변환
-        amount_raw = request.form.get("amount", "0").replace(",", "")
+        # 금액은 화면에 보여 준 처방 계획의 합계 (폼의 amount 는 쓰지 않음)
+        patient_rrn = session.get("patient_rrn")
+        if not patient_rrn:
+            return jsonify({"error": "no prescription plan for this visit"}), 400
         try:
-            amount = float(amount_raw)
-        except ValueError:
-            amount = 0.0
+            plan = prescription_plans.plan_for(patient_rrn, department, TREATMENT_FEES_CSV, PRESCRIPTION_ITEMS_CSV)
+        except Exception:
+            metrics.inc(metrics.ERRORS_TOTAL, source="payment", reason="treatment_fees_csv")
+            return jsonify({"error": "Error processing treatment fees data"}), 500
+        amount = float(plan["total_fee"])
+        if amount <= 0:
+            return jsonify({"error": "nothing to pay for this visit"}), 400
 
         method = request.form.get("method", "card")  # cash | card | qr
 
-        pay_id = uuid.uuid4().hex[:8].upper()
-        payments.append(
-            {"id": pay_id, "patient": patient_id, "amount": amount, "method": method}
-        )
+        # 같은 키로 다시 제출되면(두 번 누름·새로고침) 새 결제를 만들지 않고 기존 결제로
+        idempotency_key = (request.form.get("idempotency_key") or request.headers.get("Idempotency-Key")
+                           or payment_gateway.new_idempotency_key())
+        if len(idempotency_key) > payment_gateway.MAX_KEY_LENGTH:
+            return jsonify({"error": "idempotency key too long"}), 400
 
-        # 완료 페이지로 리다이렉트
-        return redirect(url_for("payment.done", pay_id=pay_id))
+        record = gateway.start(amount, method, idempotency_key, department=department, context={
+            "patient_rrn": patient_rrn,
+            "patient_name": session.get("patient_name"),
+        })
+
+        # 완료 페이지로 리다이렉트 (결제가 끝나기 전이면 그 화면이 상태를 기다림)
+        return redirect(url_for("payment.done", pay_id=record["id"]))
 
     # GET → 결제 입력 폼
-    return render_template("payment.html", step="initial_payment", department=department)
+    return render_template("payment.html", step="initial_payment", department=department,
+                           idempotency_key=payment_gateway.new_idempotency_key())
 
 
 @payment_bp.route("/load_prescriptions", methods=["GET"])
@@ -74,36 +99,19 @@ def load_prescriptions():
     if not os.path.exists(TREATMENT_FEES_CSV):
         return jsonify({"error": "Treatment fees data not found"}), 500
 
-    prescriptions_for_dept = []
+    # 방문별 처방 계획 (처음 요청 때 한 번 만들고 챗봇·처방전과 공유)
     try:
-        with open(TREATMENT_FEES_CSV, newline='', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row["Department"].strip() == department:
-                    prescriptions_for_dept.append({"Prescription": row["Prescription"], "Fee": float(row["Fee"])})
+        plan = prescription_plans.plan_for(
+            session.get("patient_rrn"), department, TREATMENT_FEES_CSV, PRESCRIPTION_ITEMS_CSV)
     except Exception as e:
         # Log the error e
+        metrics.inc(metrics.ERRORS_TOTAL, source="payment", reason="treatment_fees_csv")
         return jsonify({"error": "Error processing treatment fees data"}), 500
 
-    if not prescriptions_for_dept:
-        return jsonify({"prescriptions": [], "total_fee": 0.0})
-
-    num_to_select = random.randint(2, 3)
-    if len(prescriptions_for_dept) < num_to_select:
-        selected_prescriptions = prescriptions_for_dept
-    else:
-        selected_prescriptions = random.sample(prescriptions_for_dept, num_to_select)
-
-    total_fee = sum(p["Fee"] for p in selected_prescriptions)
-
-    # Save the generated prescriptions and total fee for later use
-    session["last_prescriptions"] = [
-        {"name": p["Prescription"], "fee": float(p["Fee"])}
-        for p in selected_prescriptions
+    selected_prescriptions = [
+        {"Prescription": p["name"], "Fee": float(p["fee"])} for p in plan["prescriptions"]
     ]
-    session["last_total_fee"] = total_fee
-
-    return jsonify({"prescriptions": selected_prescriptions, "total_fee": total_fee})
+    return jsonify({"prescriptions": selected_prescriptions, "total_fee": float(plan["total_fee"])})
 
 
 @payment_bp.route("/done")
@@ -112,18 +120,23 @@ def done():
     결제 완료 화면
     """
     pay_id = request.args.get("pay_id", "")
-    record = next((p for p in payments if p["id"] == pay_id), None)
+    record = gateway.get(pay_id)
 
     # 잘못된 접근이면 다시 결제 폼으로
     if record is None:
         return redirect(url_for("payment.payment"))
 
-    session['payment_complete'] = True
+    if not payment_gateway.settled(record):
+        # 단말 승인 대기 — 화면이 /payment/status 로 결과를 기다렸다가 다시 이 주소로
+        return render_template("payment.html", step="processing", pay_id=record["id"])
 
-    # Update payment status in reservations.csv
-    patient_rrn = session.get("patient_rrn")
-    if patient_rrn:
-        update_reservation_status(patient_rrn, "Paid")
+    if record["state"] != CAPTURED:
+        session['payment_complete'] = False
+        return render_template("payment.html", step="failed", pay_id=record["id"],
+                               state=record["state"], error=record.get("error"))
+
+    # 예약 상태(Paid) 기록은 매입이 끝날 때 _after_capture 에서
+    session['payment_complete'] = True
 
     return render_template(
         "payment.html",
@@ -132,3 +145,13 @@ def done():
         amount=record["amount"],
         method=record["method"],
     )
+
+
+@payment_bp.route("/status/<pay_id>")
+def status(pay_id):
+    """결제 상태 (폴링용)"""
+    record = gateway.get(pay_id)
+    if record is None:
+        return jsonify({"error": "unknown payment"}), 404
+    return jsonify(payment_gateway.public_view(record))
+
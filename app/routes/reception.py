@@ -1,7 +1,10 @@
 # app/blueprints/reception.py
-import csv, os, random
+import os, random
 from datetime import datetime
 from flask import Blueprint, render_template, request, session
+from app.utils import metrics, reservation_store
+from app.utils.aggregates import aggregates
+from app.utils.page_cache import render_cached
 
 reception_bp = Blueprint('reception', __name__, template_folder='../../templates')
 
@@ -15,25 +18,25 @@ def fake_scan_rrn():
     return "홍길동", "900101-1234567"
 
 # CSV 예약 조회 ---------------------------------------------------------------
+@metrics.timed("csv_read", op="reservation_lookup")
 def lookup_reservation(name: str, rrn: str):
     """
     reservations.csv 에서 (이름, 주민번호) 완전 일치 행을 찾아 dict 반환.
-    못 찾으면 None.
+    못 찾으면 None. (reservation_store 의 메모리 인덱스 사용)
     """
     if not os.path.exists(RESV_CSV):
         return None
 
-    with open(RESV_CSV, newline='', encoding='utf-8') as f:
-        for row in csv.DictReader(f):
-            if row["name"].strip() == name and row["rrn"].strip() == rrn:
-                return {
-                    "department": row["department"],
-                    "time":       row["time"],
-                    "location":   row["location"],
-                    "doctor":     row["doctor"],
-                    "status":     row.get("payment_status", "Pending")
-                }
-    return None
+    row = reservation_store.get_store(RESV_CSV).lookup(name, rrn)
+    if row is None:
+        return None
+    return {
+        "department": row["department"],
+        "time":       row["time"],
+        "location":   row["location"],
+        "doctor":     row["doctor"],
+        "status":     row.get("payment_status", "Pending")
+    }
 
 # 증상 → 진료과 매핑 ----------------------------------------------------------
 SYMPTOMS = [
@@ -62,6 +65,7 @@ def reception():
         session.pop('patient_rrn', None)
         session.pop('department', None)
         session.pop('ticket', None)
+        session.pop('chat_session_id', None)   # 새 방문객 → 챗봇 대화 기억도 새로 시작
 
     if request.method == "POST":
         action = request.form.get("action")
@@ -73,6 +77,8 @@ def reception():
             session['patient_rrn'] = rrn
             resv = lookup_reservation(name, rrn)
             if resv:   # 예약 O → 안내
+                aggregates.record_check_in(resv["department"], "reserved")
+                session['department'] = resv["department"]
                 session['reception_complete'] = True
                 session['payment_complete'] = False
                 return render_template("reception.html", step="reserved",
@@ -92,6 +98,8 @@ def reception():
                                        err="이름과 주민번호를 모두 입력하세요.")
             resv = lookup_reservation(name, rrn)
             if resv:  # 예약 O
+                aggregates.record_check_in(resv["department"], "reserved")
+                session['department'] = resv["department"]
                 session['reception_complete'] = True
                 session['payment_complete'] = False
                 return render_template("reception.html", step="reserved",
@@ -109,8 +117,11 @@ def reception():
             session["ticket"] = ticket
             session['reception_complete'] = True
             session['payment_complete'] = False
+            aggregates.record_check_in(department, "walk_in")
             return render_template("reception.html", step="ticket",
                                    department=department, ticket=ticket)
 
-    # GET → 접수 방법 선택
+    # GET → 접수 방법 선택 (입력값이 없는 화면이므로 캐시된 렌더링 사용)
+    if request.method == "GET" and request.args.get("step", "method") == "method":
+        return render_cached("reception.html", step="method")
     return render_template("reception.html", step="method")
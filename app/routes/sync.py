@@ -0,0 +1,51 @@
+"""
+키오스크 레플리카 동기화 API (Blueprint, 중앙 서버에서만 등록)
+  • GET  /sync/reservations?cursor=…   → 커서 이후 바뀐 오늘 예약 (처음이면 오늘 예약 전체)
+  • GET  /sync/fees                    → 진료비 목록 CSV (ETag / If-None-Match → 304)
+  • POST /sync/status                  → 키오스크에서 바뀐 예약 상태 업로드 (충돌 시 서버 값 반환)
+
+X-Sync-Token 헤더가 SYNC_TOKEN 환경 변수와 일치해야 한다 (SYNC_TOKEN 이 없으면 모든 요청 403).
+"""
+import hmac
+import os
+
+from flask import Blueprint, jsonify, request, send_file
+
+from app.routes import payment, reception
+from app.utils import reservation_store, sync
+
+sync_bp = Blueprint("sync", __name__, url_prefix="/sync")
+
+
+@sync_bp.before_request
+def _require_token():
+    token = os.getenv("SYNC_TOKEN")
+    if not token:
+        return jsonify({"error": "sync is disabled: SYNC_TOKEN is not configured"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Sync-Token", "").encode("utf-8"), token.encode("utf-8")):
+        return jsonify({"error": "forbidden"}), 403
+    return None
+
+
+@sync_bp.route("/reservations", methods=["GET"])
+def reservations():
+    store = reservation_store.get_store(reception.RESV_CSV)
+    return jsonify(sync.changes(store, sync.change_log, request.args.get("cursor"), request.args.get("day")))
+
+
+@sync_bp.route("/fees", methods=["GET"])
+def fees():
+    if not os.path.exists(payment.TREATMENT_FEES_CSV):
+        return jsonify({"error": "Treatment fees data not found"}), 404
+    # send_file 이 mtime·크기 기반 ETag 와 조건부 요청(304)을 처리
+    return send_file(payment.TREATMENT_FEES_CSV, mimetype="text/csv", conditional=True, etag=True)
+
+
+@sync_bp.route("/status", methods=["POST"])
+def upload_status():
+    data = request.get_json(silent=True) or {}
+    changes = data.get("changes")
+    if not isinstance(changes, list):
+        return jsonify({"error": "changes must be a list"}), 400
+    store = reservation_store.get_store(reception.RESV_CSV)
+    return jsonify(sync.apply_status_changes(store, changes))
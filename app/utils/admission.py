@@ -0,0 +1,200 @@
+"""
+비싼 경로의 입장 제어 (create_app 에서 init_app 으로 등록 — WSGI·ASGI 모드 공통)
+
+  • chat : POST /api/chatbot              (원격 LLM 호출)
+  • pdf  : /certificate/prescription, /certificate/medical_confirmation (PDF 렌더링)
+  • 그 외(접수·수납 화면 등 kiosk 경로)는 제한하지 않는다
+
+경로 종류마다
+  • 키오스크(클라이언트)별 토큰 버킷 — 초당 rate 개씩 채워지고 최대 burst 개까지 쌓임.
+    토큰이 없으면 429 + Retry-After(다음 토큰까지 남은 초)
+    키오스크 구분: 접속 IP (request.remote_addr). 클라이언트가 보내는 헤더는 믿지 않는다
+    — 헤더 값을 바꿔 가며 보내면 버킷을 얼마든지 새로 받을 수 있으므로.
+    리버스 프록시 뒤에서는 프록시가 원래 주소를 remote_addr 로 넘겨야 한다 (werkzeug ProxyFix 등)
+  • 전체 동시 실행 상한 — 자리가 없으면 ADMISSION_QUEUE_TIMEOUT 초까지 줄 서서 기다리고,
+    그래도 자리가 없거나 대기열이 ADMISSION_MAX_QUEUE 를 넘으면 503 + Retry-After
+rate·burst·concurrency 를 0 으로 두면 해당 제한을 끈다. ADMISSION=0 이면 전체를 끈다.
+
+ASGI 모드 챗봇의 2단계(LLM 결과를 붙여 다시 실행하는 요청)는 같은 요청이므로 다시 세지 않는다.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+
+from app.utils import metrics
+
+CHAT_PATHS = {"/api/chatbot"}
+PDF_PREFIXES = ("/certificate/prescription", "/certificate/medical_confirmation")
+
+ENABLED = os.getenv("ADMISSION", "1") != "0"
+QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+
+# 경로 종류 → (rate, burst, concurrency)
+LIMITS = {
+    "chat": (float(os.getenv("ADMISSION_CHAT_RATE", "1")),
+             int(os.getenv("ADMISSION_CHAT_BURST", "10")),
+             int(os.getenv("ADMISSION_CHAT_CONCURRENCY", "32"))),
+    "pdf": (float(os.getenv("ADMISSION_PDF_RATE", "0.5")),
+            int(os.getenv("ADMISSION_PDF_BURST", "6")),
+            int(os.getenv("ADMISSION_PDF_CONCURRENCY", "4"))),
+}
+
+RATE_LIMITED_REPLY = "요청이 너무 잦습니다. 잠시 후 다시 시도해주세요."
+BUSY_REPLY = "지금은 이용자가 많아 잠시 후 다시 시도해주세요. 접수·수납·증명서 발급은 화면 메뉴로 계속 이용하실 수 있습니다."
+
+REJECTED_TOTAL = "kiosk_admission_rejected_total"
+metrics.register(REJECTED_TOTAL, "counter", "Requests shed by admission control, by route class and reason.")
+
+
+def route_class(path: str, method: str) -> str:
+    if path in CHAT_PATHS and method == "POST":
+        return "chat"
+    if path.startswith(PDF_PREFIXES):
+        return "pdf"
+    return "kiosk"
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: int, now: float):
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, rate: float, burst: int, now: float) -> float:
+        """토큰 1개를 쓰면 0, 모자라면 다음 토큰까지 남은 초"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class RouteGate:
+    """한 경로 종류의 토큰 버킷들과 동시 실행 자리"""
+
+    def __init__(self, name: str, rate: float, burst: int, concurrency: int,
+                 queue_timeout: float = QUEUE_TIMEOUT, max_queue: int = MAX_QUEUE,
+                 max_clients: int = MAX_CLIENTS):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+        self.active = 0
+        self.waiting = 0
+
+    def check_rate(self, client: str) -> float:
+        """0 이면 통과, 아니면 Retry-After 로 쓸 대기 초"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.burst, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)   # 가장 오래 안 온 키오스크부터
+            else:
+                self._buckets.move_to_end(client)
+            return bucket.take(self.rate, self.burst, now)
+
+    def acquire(self) -> str | None:
+        """자리를 얻으면 None, 못 얻으면 거절 사유 (queue_full | timeout)"""
+        if self._slots is None:
+            return None
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                self.active += 1
+            return None
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                return "queue_full"
+            self.waiting += 1
+        try:
+            with metrics.timed("admission_wait", route=self.name):
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            return "timeout"
+        with self._lock:
+            self.active += 1
+        return None
+
+    def release(self) -> None:
+        if self._slots is not None:
+            with self._lock:
+                self.active -= 1
+            self._slots.release()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"rate": self.rate, "burst": self.burst, "concurrency": self.concurrency,
+                    "active": self.active, "waiting": self.waiting, "clients": len(self._buckets)}
+
+
+def client_id() -> str:
+    return request.remote_addr or "-"
+
+
+def _reject(kind: str, status: int, reason: str, retry_after: float):
+    metrics.inc(REJECTED_TOTAL, route=kind, reason=reason)
+    payload = {"error": "rate_limited" if status == 429 else "busy"}
+    if kind == "chat":
+        payload["reply"] = RATE_LIMITED_REPLY if status == 429 else BUSY_REPLY
+    response = jsonify(payload)
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def init_app(app, enabled: bool = ENABLED, limits: dict | None = None) -> dict:
+    """
+    app.extensions["admission"] 에 경로 종류 → RouteGate 를 두고 before/teardown 훅 등록.
+    metrics.init_app 뒤에 호출해야 거절된 요청도 요청 지표에 남는다.
+    """
+    # 챗봇 2단계 요청 표시 (asgi_bridge 가 admission 을 import 하므로 여기서 가져옴)
+    from app.utils.asgi_bridge import LLM_RESULT
+
+    gates = app.extensions["admission"] = {
+        kind: RouteGate(kind, *values) for kind, values in (limits or LIMITS).items()
+    }
+    if not enabled:
+        gates.clear()
+        return gates
+
+    @app.before_request
+    def _admit():
+        gate = gates.get(route_class(request.path, request.method))
+        if gate is None or LLM_RESULT in request.environ:
+            return None
+        wait = gate.check_rate(client_id())
+        if wait:
+            return _reject(gate.name, 429, "rate", wait)
+        reason = gate.acquire()
+        if reason:
+            return _reject(gate.name, 503, reason, gate.queue_timeout)
+        g._admission_gate = gate
+        return None
+
+    @app.teardown_request
+    def _leave(exc):
+        gate = g.pop("_admission_gate", None)
+        if gate is not None:
+            gate.release()
+
+    return gates
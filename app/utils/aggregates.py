@@ -0,0 +1,367 @@
+"""
+운영 집계 (진료과별 접수·수납 현황, 결제수단별 매출, 증명서 발급 수)
+
+  • 이벤트가 생길 때마다 이 프로세스의 몫(pending)만 올림 — 조회 때 예약 파일을 훑지 않는다
+      - 접수 / 결제 / 증명서 발급 : 각 라우트에서 record_*()
+      - 예약 상태 변경 : reservation_store.on_status_change() → 진료과별 상태 증감
+  • 모든 worker 의 몫은 스냅샷 파일(data/aggregates.json)에 모은다 — flush() 가 파일 잠금 안에서
+    스냅샷을 다시 읽어 자기 몫을 더한 뒤 원자적으로 교체하므로 worker 끼리 덮어쓰거나 두 번 세지 않는다.
+    AGGREGATES_SNAPSHOT_SECONDS 마다, 조회(/admin/aggregates) 때, 프로세스가 끝날 때 flush
+  • 진료과별 상태 수 = 예약 파일 버전(inode, 크기)별 기준값 + 그 버전에서 생긴 상태 증감
+      - 기준값은 파일을 다시 쓴 프로세스가 쓰면서 센 값(reservation_store.on_rewrite)을 스냅샷에 올린다
+      - 증감은 쓰인 파일 버전을 달고 모았다가, 스냅샷의 기준값과 버전이 같을 때만 더한다.
+        이전 버전의 증감은 재작성이 그 행을 복사했으므로 이미 새 기준값에 들어 있어 버린다
+      - 시작할 때(worker 를 fork 하기 전)와, 잠금을 쓰지 않는 쪽이 파일을 바꿔 아무도 기준값을 올리지 않은
+        채 한 주기가 지났을 때만 파일 전체를 센다 (백그라운드 flush 스레드에서)
+  • 날짜가 바뀌면 일별 카운터(접수·매출·증명서)는 0 부터 다시 시작 (예약 상태 수는 유지)
+"""
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from app.utils import background, reservation_store
+
+try:
+    import fcntl
+except ImportError:   # Windows — worker 하나로 돌릴 때만 정확
+    fcntl = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+RESERVATIONS_CSV = os.path.join(BASE_DIR, "data", "reservations.csv")
+SNAPSHOT_PATH = os.getenv("AGGREGATES_SNAPSHOT_PATH", os.path.join(BASE_DIR, "data", "aggregates.json"))
+SNAPSHOT_SECONDS = float(os.getenv("AGGREGATES_SNAPSHOT_SECONDS", "60"))
+
+
+def _bump(table: dict, key: str, field: str, amount=1) -> None:
+    counts = table.setdefault(key, {})
+    counts[field] = counts.get(field, 0) + amount
+
+
+def _empty() -> dict:
+    return {
+        "check_ins": {},            # 진료과 → {reserved|walk_in: 수}
+        "revenue": {},              # 결제수단 → {count, amount}
+        "department_revenue": {},   # 진료과 → 금액
+        "certificates": {},         # 진료과 → {prescription|confirmation: 수}
+    }
+
+
+def _merge(into: dict, delta: dict) -> dict:
+    for table in ("check_ins", "revenue", "certificates"):
+        for key, counts in delta[table].items():
+            for field, n in counts.items():
+                _bump(into[table], key, field, n)
+    for dept, amount in delta["department_revenue"].items():
+        into["department_revenue"][dept] = into["department_revenue"].get(dept, 0.0) + amount
+    return into
+
+
+def _add_statuses(into: dict, delta: dict) -> dict:
+    for dept, counts in delta.items():
+        for status, n in counts.items():
+            _bump(into, dept, status, n)
+    return into
+
+
+def _file_version(path: str):
+    """예약 파일 버전 (inode, 크기) — reservation_store 의 view.signature 와 같은 값"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size
+
+
+def _from_snapshot(data: dict) -> dict:
+    return {
+        "check_ins": data.get("check_ins", {}),
+        "revenue": data.get("revenue", {}).get("by_method", {}),
+        "department_revenue": data.get("revenue", {}).get("by_department", {}),
+        "certificates": data.get("certificates", {}),
+    }
+
+
+def _read_snapshot(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+@contextmanager
+def _locked(path: str):
+    directory, name = os.path.split(path)
+    with open(os.path.join(directory, f".{name}.lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class Aggregates:
+    def __init__(self, reservations_path: str = RESERVATIONS_CSV):
+        self.reservations_path = os.path.abspath(reservations_path)
+        self.snapshot_path = None            # init_app() 이 정함 — 없으면 이 프로세스 몫만 보임
+        self._lock = threading.Lock()
+        self.statuses: dict[str, dict] = {}   # 진료과 → {상태: 예약 수} (마지막으로 읽은 스냅샷)
+        self._status_version = None           # statuses 가 가리키는 예약 파일 버전
+        self._status_deltas: dict[tuple, dict] = {}   # 파일 버전 → 아직 스냅샷에 더하지 않은 상태 증감
+        self._baseline = None                 # 이 프로세스가 다시 쓴 파일의 (버전, 상태 수)
+        self._stale_since = None              # 스냅샷의 기준값이 현재 파일과 달라진 것을 처음 본 시각
+        self._reset_day(date.today().isoformat())
+
+    def attach(self) -> None:
+        """예약 저장소의 상태 변경·재작성 알림을 받음 (프로세스당 한 번)"""
+        reservation_store.on_status_change(self._on_status_change)
+        reservation_store.on_rewrite(self._on_rewrite)
+
+    def _reset_day(self, day: str) -> None:
+        self.day = day
+        self._shared = _empty()    # 마지막으로 읽은 스냅샷 (모든 worker 의 합)
+        self._pending = _empty()   # 아직 스냅샷에 더하지 않은 이 프로세스의 몫
+        self.updated_at = None
+
+    def _touch(self) -> None:
+        """날짜가 바뀌었으면 일별 카운터를 비움 (self._lock 을 잡은 상태에서 호출)"""
+        today = date.today().isoformat()
+        if today != self.day:
+            self._reset_day(today)
+        self.updated_at = datetime.now().isoformat(timespec="seconds")
+
+    # ── 이벤트 기록 ───────────────────────────────────────────
+    def record_check_in(self, department: str, kind: str) -> None:
+        with self._lock:
+            self._touch()
+            _bump(self._pending["check_ins"], department or "-", kind)
+
+    def record_payment(self, department: str, method: str, amount: float) -> None:
+        with self._lock:
+            self._touch()
+            _bump(self._pending["revenue"], method, "count")
+            _bump(self._pending["revenue"], method, "amount", amount)
+            dept = department or "-"
+            revenue = self._pending["department_revenue"]
+            revenue[dept] = revenue.get(dept, 0.0) + amount
+
+    def record_certificate(self, department: str, kind: str) -> None:
+        with self._lock:
+            self._touch()
+            _bump(self._pending["certificates"], department or "-", kind)
+
+    # ── 예약 상태 ─────────────────────────────────────────────
+    def _on_status_change(self, path, row, old, new) -> None:
+        if os.path.abspath(path) != self.reservations_path:
+            return
+        version = reservation_store.status_version()
+        dept = (row.get("department") or "").strip() or "-"
+        with self._lock:
+            delta = self._status_deltas.setdefault(version, {})
+            _bump(delta, dept, old or "Pending", -1)
+            _bump(delta, dept, new, 1)
+
+    def _on_rewrite(self, path, version, counts) -> None:
+        if os.path.abspath(path) != self.reservations_path:
+            return
+        with self._lock:
+            self._baseline = (version, counts, False)
+
+    def _statuses(self, reservations: dict, baseline, deltas: dict) -> dict:
+        """
+        스냅샷의 예약 상태 부분에 이 프로세스 몫(재작성 기준값, 상태 증감)을 더한 새 내용.
+          - 기준값은 현재 파일 버전의 것이고 스냅샷이 아직 그 버전이 아닐 때만 바꿔 넣는다
+          - 증감은 기준값과 같은 버전이면 더하고, 아직 기준값이 없는 현재 버전이면 스냅샷에 남겨
+            (그 기준값이 올라올 때 더함) 그 밖의 버전은 버린다 — 재작성이 이미 복사한 변경
+          - 다시 센 기준값이면 같은 버전의 증감은 이미 들어 있는 것으로 본다
+        """
+        current = _file_version(self.reservations_path)
+        version = tuple(reservations["version"]) if reservations.get("version") else None
+        statuses = reservations.get("by_department") or {}
+        waiting: dict[tuple, dict] = {}
+        for delta_version, delta in reservations.get("deltas") or []:
+            _add_statuses(waiting.setdefault(tuple(delta_version), {}), delta)
+        for delta_version, delta in deltas.items():
+            _add_statuses(waiting.setdefault(delta_version, {}), delta)
+        if baseline is not None and baseline[0] == current and baseline[0] != version:
+            version, counts, recounted = baseline
+            statuses = copy.deepcopy(counts)
+            if recounted:
+                waiting.pop(version, None)
+        applied = waiting.pop(version, None)
+        if applied:
+            _add_statuses(statuses, applied)
+        return {"version": version, "by_department": statuses,
+                "deltas": [[list(v), d] for v, d in waiting.items() if v == current]}
+
+    def _keep_deltas(self, deltas: dict) -> None:
+        """떼어 낸 증감을 다시 pending 으로 (그 사이 새로 쌓인 증감과 합침, self._lock 을 잡은 상태에서 호출)"""
+        for version, delta in deltas.items():
+            _add_statuses(self._status_deltas.setdefault(version, {}), delta)
+
+    # ── 조회 / 스냅샷 ─────────────────────────────────────────
+    def _as_dict(self, counters: dict, reservations: dict) -> dict:
+        """reservations = {"by_department", 스냅샷에만 쓰는 "version"·"deltas"}"""
+        statuses = reservations["by_department"]
+        totals = {"Pending": 0, "Registered": 0, "Paid": 0}
+        for counts in statuses.values():
+            for status, n in counts.items():
+                totals[status] = totals.get(status, 0) + n
+        return {
+            "day": self.day,
+            "updated_at": self.updated_at,
+            "reservations": {"total": totals, "by_department": copy.deepcopy(statuses),
+                             **{k: v for k, v in reservations.items() if k != "by_department"}},
+            "check_ins": copy.deepcopy(counters["check_ins"]),
+            "revenue": {
+                "by_method": copy.deepcopy(counters["revenue"]),
+                "by_department": dict(counters["department_revenue"]),
+                "total": sum(v.get("amount", 0) for v in counters["revenue"].values()),
+            },
+            "certificates": copy.deepcopy(counters["certificates"]),
+        }
+
+    def as_dict(self) -> dict:
+        """모든 worker 의 합 (마지막으로 읽은 스냅샷 + 아직 더하지 않은 이 프로세스 몫) — 파일을 훑지 않음"""
+        with self._lock:
+            self._touch()
+            version, statuses = self._status_version, self.statuses
+            if self._baseline is not None:
+                version, statuses = self._baseline[:2]
+            delta = self._status_deltas.get(version)
+            if delta:
+                statuses = _add_statuses(copy.deepcopy(statuses), delta)
+            return self._as_dict(_merge(copy.deepcopy(self._shared), self._pending),
+                                 {"by_department": statuses})
+
+    def _recount(self, recount_after: float | None) -> None:
+        """
+        스냅샷 기준값이 현재 파일과 다른 채로 recount_after 초가 지났으면 파일 전체를 세어 기준값으로.
+        (잠금을 쓰지 않는 쪽이 파일을 바꾼 경우 — 그 사이 다른 worker 가 아직 올리지 않은 증감이 있으면
+        그만큼은 어긋날 수 있어 시작할 때와 이런 경우에만 쓴다)
+        """
+        current = _file_version(self.reservations_path)
+        with self._lock:
+            if current is None or current == self._status_version or (
+                    self._baseline is not None and self._baseline[0] == current):
+                self._stale_since = None
+                return
+            now = time.monotonic()
+            if self._stale_since is None:
+                self._stale_since = now
+            if now - self._stale_since < recount_after:
+                return
+        version, counts = reservation_store.get_store(self.reservations_path).status_counts()
+        with self._lock:
+            self._baseline = (version, counts, True)
+            self._status_deltas.pop(version, None)   # 센 값에 이미 들어 있음
+            self._stale_since = None
+
+    def flush(self, path: str | None = None, recount_after: float | None = None) -> None:
+        """
+        이 프로세스 몫을 스냅샷에 더함 — 파일 잠금 안에서 다시 읽고 → 더하고 → 원자적으로 교체.
+        recount_after 가 있으면 기준값이 그만큼 오래 맞지 않을 때 예약 파일을 다시 센다 (백그라운드에서만).
+        """
+        path = path or self.snapshot_path
+        if path is None:
+            return
+        if recount_after is not None:
+            self._recount(recount_after)
+        with _locked(path):
+            snapshot = _read_snapshot(path)
+            with self._lock:
+                self._touch()
+                counters = _from_snapshot(snapshot) if snapshot.get("day") == self.day else _empty()
+                pending, self._pending = self._pending, _empty()
+                baseline, self._baseline = self._baseline, None
+                deltas, self._status_deltas = self._status_deltas, {}
+                reservations = self._statuses(snapshot.get("reservations") or {}, baseline, deltas)
+                data = self._as_dict(_merge(counters, pending), reservations)
+            directory = os.path.dirname(path) or "."
+            fd, tmp_path = tempfile.mkstemp(prefix=".aggregates-", suffix=".json", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self._lock:   # 다음 flush 에서 다시
+                    _merge(self._pending, pending)
+                    self._keep_deltas(deltas)
+                    if self._baseline is None:
+                        self._baseline = baseline
+                raise
+            with self._lock:
+                if data["day"] == self.day:
+                    self._shared = counters
+                self.statuses = reservations["by_department"]
+                self._status_version = reservations["version"]
+
+    def load(self, path: str = SNAPSHOT_PATH) -> bool:
+        """스냅샷의 예약 상태 수를 읽고, 오늘 날짜면 일별 카운터도 모든 worker 의 합으로 읽어 둠"""
+        data = _read_snapshot(path)
+        reservations = data.get("reservations") or {}
+        with self._lock:
+            if reservations.get("version"):
+                self.statuses = reservations.get("by_department") or {}
+                self._status_version = tuple(reservations["version"])
+            if data.get("day") != date.today().isoformat():
+                return False
+            self._reset_day(data["day"])
+            self.updated_at = data.get("updated_at")
+            self._shared = _from_snapshot(data)
+        return True
+
+
+aggregates = Aggregates()
+aggregates.attach()
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _snapshot_loop(path: str, interval: float) -> None:
+    while True:
+        try:
+            aggregates.flush(path, recount_after=interval)
+        except Exception as e:
+            print(f"aggregates snapshot failed: {e}")
+        time.sleep(interval)
+
+
+def _flush_at_exit() -> None:
+    path = aggregates.snapshot_path
+    if path is None or not os.path.isdir(os.path.dirname(path) or "."):
+        return   # 임시 데이터 디렉터리가 먼저 지워진 경우 (테스트·벤치마크)
+    try:
+        aggregates.flush()
+    except Exception as e:
+        print(f"aggregates flush at exit failed: {e}")
+
+
+def init_app(app, path: str = SNAPSHOT_PATH, interval: float = SNAPSHOT_SECONDS) -> None:
+    """
+    스냅샷을 읽고 백그라운드 flush 스레드 시작 (프로세스당 한 번), 끝날 때도 flush.
+    interval 이 0 이하이면 스레드를 띄우지 않는다 (테스트·벤치마크용).
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    aggregates.snapshot_path = path
+    aggregates.load(path)
+    # 스냅샷의 기준값이 지금 파일과 다르면 바로 센다 (serve.py 에서는 worker 를 fork 하기 전)
+    aggregates.flush(path, recount_after=0)
+    if interval > 0:
+        background.start(_snapshot_loop, (path, interval), name="aggregates-snapshot")
+        atexit.register(_flush_at_exit)
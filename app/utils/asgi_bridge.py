@@ -0,0 +1,354 @@
+"""
+ASGI 서빙 모드 (asgi.py → uvicorn / hypercorn 등에서 실행)
+
+Flask 앱은 그대로 두고, 그 앞에 얇은 ASGI 계층을 둔다.
+
+  • 일반 화면(접수·수납·증명서 …) : 전용 스레드 풀(ASGI_KIOSK_THREADS)에서 WSGI 로 실행하고
+    본문은 조각이 나오는 대로 보냄 (more_body) — SSE·PDF 도 다 만들어질 때까지 모아 두지 않는다.
+    보내기가 밀리면 STREAM_BUFFER 조각에서 WSGI 쪽이 기다리고, 클라이언트가 끊으면 응답을 닫는다.
+  • 챗봇(POST /api/chatbot)        : 두 단계로 나눠 LLM 대기 중에는 스레드를 쓰지 않음
+      1단계  챗봇 스레드 풀에서 Flask 뷰 실행 — 입력 검증·세션 처리·프롬프트 구성까지 하고
+             LLM 호출 정보(LLMCall)를 environ 에 남긴 뒤 내부용 202 응답으로 종료
+      대기   이벤트 루프에서 model.generate_content_async() 를 await
+             (마감시간·재시도·회로 차단기·동일 질문 병합은 동기 경로와 동일)
+      2단계  같은 요청을 1단계 세션 쿠키와 LLM 결과(Outcome)를 붙여 다시 실행 —
+             의도 태그 후처리, 대화 기억 기록, 세션 갱신
+    LLM 호출이 필요 없는 요청(빠른 수납 확인 등)은 1단계 응답이 그대로 나간다.
+    (챗봇 응답은 작은 JSON 이고 상태코드·쿠키를 보고 2단계를 정하므로 모아서 보냄)
+  • 경로별 동시 실행 상한 — 초과 요청은 ASGI_QUEUE_TIMEOUT 초까지 기다린 뒤 503 + Retry-After
+      chat : ASGI_CHAT_CONCURRENCY (기본 256)
+      pdf  : ASGI_PDF_CONCURRENCY  (기본 4, 증명서 PDF 생성)
+      kiosk: ASGI_KIOSK_CONCURRENCY (기본 64)
+
+키오스크별 요청 빈도 제한과 Flask 쪽 동시 실행 상한은 app.utils.admission 이 WSGI·ASGI 모드 공통으로 맡는다.
+WSGI(python run.py)로 실행하면 Flask 뷰가 예전처럼 동기 호출을 한다.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from flask import Response
+
+from app.utils import metrics, resilience
+from app.utils.admission import BUSY_REPLY, route_class
+from app.utils.singleflight import AsyncSingleFlight
+
+# Flask 뷰와 주고받는 environ 키
+LLM_DEFER = "kiosk.llm.defer"     # ASGI → 뷰 : LLM 호출을 미뤄도 됨
+LLM_CALL = "kiosk.llm.call"       # 뷰 → ASGI : 미뤄 둔 호출 (LLMCall)
+LLM_RESULT = "kiosk.llm.result"   # ASGI → 뷰 : 호출 결과 (Outcome)
+DEFERRED_STATUS = 202
+
+KIOSK_THREADS = int(os.getenv("ASGI_KIOSK_THREADS", "16"))
+CHAT_THREADS = int(os.getenv("ASGI_CHAT_THREADS", "4"))
+QUEUE_TIMEOUT = float(os.getenv("ASGI_QUEUE_TIMEOUT", "2"))
+STREAM_BUFFER = 8   # 보내기를 기다리는 본문 조각 수 (넘으면 WSGI 쪽 스레드가 기다림)
+ROUTE_LIMITS = {
+    "chat": int(os.getenv("ASGI_CHAT_CONCURRENCY", "256")),
+    "pdf": int(os.getenv("ASGI_PDF_CONCURRENCY", "4")),
+    "kiosk": int(os.getenv("ASGI_KIOSK_CONCURRENCY", "64")),
+}
+
+REJECTED_TOTAL = "kiosk_route_rejected_total"
+metrics.register(REJECTED_TOTAL, "counter", "Requests rejected by the ASGI per-route concurrency limit.")
+
+
+class LLMCall:
+    """1단계에서 만든 LLM 호출 정보"""
+    __slots__ = ("model", "contents", "coalesce_key")
+
+    def __init__(self, model, contents, coalesce_key=None):
+        self.model = model
+        self.contents = contents
+        self.coalesce_key = coalesce_key
+
+
+class Outcome:
+    """LLM 호출 결과 또는 예외 — get() 은 동기 호출과 같이 값 반환 / 예외 발생"""
+    __slots__ = ("value", "error")
+
+    def __init__(self, value=None, error: BaseException | None = None):
+        self.value = value
+        self.error = error
+
+    def get(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def deferred_response() -> Response:
+    """1단계 종료용 내부 응답 (클라이언트에게는 나가지 않음)"""
+    return Response(status=DEFERRED_STATUS)
+
+
+class _Overloaded(Exception):
+    pass
+
+
+class _RouteLimiter:
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __aenter__(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            metrics.inc(REJECTED_TOTAL, route=self.name)
+            raise _Overloaded(self.name) from None
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+
+
+def _build_environ(scope: dict, body: bytes, cookie: str | None = None) -> dict:
+    """ASGI http scope → WSGI environ"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "REMOTE_ADDR": client[0],
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        if key in environ:
+            value = environ[key] + ("; " if name == "COOKIE" else ",") + value
+        environ[key] = value
+    environ["CONTENT_LENGTH"] = str(len(body))   # 본문은 이미 모두 읽었음
+    if cookie is not None:
+        environ["HTTP_COOKIE"] = cookie
+    return environ
+
+
+def _call_wsgi(app, environ: dict) -> tuple[int, list, bytes]:
+    """WSGI 앱을 끝까지 실행하고 (상태코드, 헤더, 본문) 반환"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = status, headers
+
+    result = app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return int(started["status"].split(" ", 1)[0]), started["headers"], body
+
+
+_END = object()
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _stream_wsgi(app, environ: dict, loop, queue: asyncio.Queue, stop: threading.Event) -> None:
+    """
+    스레드 풀에서 WSGI 앱을 실행하며 (상태코드, 헤더), 본문 조각들, _END 를 차례로 queue 에 넣는다.
+    예외는 queue 로 넘기고, 받는 쪽이 멈추면(stop) 응답을 닫고 끝낸다.
+    """
+    def put(item) -> None:
+        if stop.is_set():
+            raise _Stopped
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = status, headers
+
+    result = None
+    try:
+        result = app(environ, start_response)
+        chunks = iter(result)
+        first = next(chunks, b"")   # 첫 조각을 만들 때 start_response 를 부르는 앱도 있음
+        put((int(started["status"].split(" ", 1)[0]), started["headers"]))
+        if first:
+            put(first)
+        for chunk in chunks:
+            if chunk:
+                put(chunk)
+        put(_END)
+    except _Stopped:
+        pass
+    except Exception as e:
+        try:
+            put(e)
+        except _Stopped:
+            pass
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+
+
+def _merge_cookies(cookie_header: str | None, set_cookies: list[str]) -> str:
+    """요청 Cookie 헤더에 1단계 응답의 Set-Cookie 값을 덮어씀"""
+    jar = SimpleCookie()
+    if cookie_header:
+        jar.load(cookie_header)
+    for value in set_cookies:
+        jar.load(value)
+    return "; ".join(f"{name}={morsel.coded_value}" for name, morsel in jar.items())
+
+
+def _set_cookies(headers: list) -> list[str]:
+    return [value for name, value in headers if name.lower() == "set-cookie"]
+
+
+class KioskASGI:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self._kiosk_pool = ThreadPoolExecutor(KIOSK_THREADS, thread_name_prefix="kiosk")
+        self._chat_pool = ThreadPoolExecutor(CHAT_THREADS, thread_name_prefix="chat")
+        self._limiters: dict[str, _RouteLimiter] | None = None
+        self._llm_flight = AsyncSingleFlight("llm_async")
+
+    def _limiter(self, name: str) -> _RouteLimiter:
+        if self._limiters is None:   # 이벤트 루프 안에서 처음 사용할 때 생성
+            self._limiters = {key: _RouteLimiter(key, limit) for key, limit in ROUTE_LIMITS.items()}
+        return self._limiters[name]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return   # websocket 등은 지원하지 않음
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        kind = route_class(scope["path"], scope["method"])
+        try:
+            async with self._limiter(kind):
+                if kind == "chat":
+                    status, headers, out = await self._chat(scope, bytes(body))
+                else:
+                    await self._stream(self._kiosk_pool, _build_environ(scope, bytes(body)), send)
+                    return
+        except _Overloaded:
+            status, headers, out = self._busy(kind)
+        await self._send(send, status, headers, out)
+
+    async def _run(self, pool, environ):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, _call_wsgi, self.flask_app, environ)
+
+    async def _stream(self, pool, environ: dict, send) -> None:
+        """WSGI 응답을 조각마다 more_body=True 로 보내고 마지막에 빈 조각으로 끝냄"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(STREAM_BUFFER)
+        stop = threading.Event()
+        producer = loop.run_in_executor(pool, _stream_wsgi, self.flask_app, environ, loop, queue, stop)
+        try:
+            item = await queue.get()
+            if isinstance(item, BaseException):
+                raise item
+            status, headers = item
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+            })
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                await send({"type": "http.response.body", "body": item, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+            await producer
+        finally:
+            # 보내는 중에 끊겼거나 실패했으면 WSGI 쪽을 멈추고, 꽉 찬 큐에서 기다리는 put 을 풀어 줌
+            stop.set()
+            while not queue.empty():
+                queue.get_nowait()
+
+    async def _chat(self, scope: dict, body: bytes):
+        environ = _build_environ(scope, body)
+        environ[LLM_DEFER] = True
+        status, headers, out = await self._run(self._chat_pool, environ)
+        call = environ.get(LLM_CALL)
+        if status != DEFERRED_STATUS or call is None:
+            return status, headers, out
+
+        outcome = await self._generate(call)
+
+        first_cookies = _set_cookies(headers)
+        cookie = _merge_cookies(environ.get("HTTP_COOKIE"), first_cookies)
+        resumed = _build_environ(scope, body, cookie=cookie)
+        resumed[LLM_RESULT] = outcome
+        status, headers, out = await self._run(self._chat_pool, resumed)
+        if first_cookies and not _set_cookies(headers):
+            headers = list(headers) + [("Set-Cookie", value) for value in first_cookies]
+        return status, headers, out
+
+    async def _generate(self, call: LLMCall) -> Outcome:
+        def start():
+            return resilience.generate_content_async(call.model, call.contents)
+
+        try:
+            with metrics.timed("llm_call", op="generate_content_async"):
+                if call.coalesce_key is None:
+                    value = await start()
+                else:
+                    value = await self._llm_flight.do(call.coalesce_key, start)
+            return Outcome(value)
+        except Exception as e:
+            return Outcome(error=e)
+
+    @staticmethod
+    def _busy(kind: str):
+        payload = {"error": "busy", "reply": BUSY_REPLY} if kind == "chat" else {"error": "busy"}
+        headers = [("Content-Type", "application/json"), ("Retry-After", str(max(1, int(QUEUE_TIMEOUT))))]
+        return 503, headers, json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    async def _send(send, status: int, headers: list, body: bytes):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._kiosk_pool.shutdown(wait=False)
+                self._chat_pool.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,37 @@
+"""
+백그라운드 스레드 시작 지점 (집계 스냅샷, 레플리카 동기화, 예약 보관, warm-up)
+
+스레드는 fork 를 넘어가지 않는다. 프리포크 런처(serve.py)는 master 에서 create_app() 을
+미리 불러 둔 뒤 worker 를 fork 하므로, master 에서는 defer() 로 스레드 시작을 미뤄 두고
+각 worker 가 fork 직후 start_deferred() 로 자기 스레드를 띄운다.
+(master 에 스레드가 남아 있으면 fork 이전 상태로 계속 돌며 worker 와 같은 파일을 덮어쓴다.)
+
+일반 실행(python run.py, uvicorn asgi:application)에서는 start() 가 바로 스레드를 띄운다.
+"""
+import threading
+
+_deferred: list[tuple] | None = None
+
+
+def start(target, args=(), name: str | None = None) -> None:
+    """데몬 스레드 시작 (defer() 중이면 start_deferred() 때까지 보류)"""
+    if _deferred is not None:
+        _deferred.append((target, args, name))
+        return
+    threading.Thread(target=target, args=args, name=name, daemon=True).start()
+
+
+def defer() -> None:
+    """이후 start() 호출을 보류 (fork 전 master 에서)"""
+    global _deferred
+    if _deferred is None:
+        _deferred = []
+
+
+def start_deferred() -> int:
+    """보류된 스레드를 이 프로세스에서 시작하고 개수 반환 (fork 직후 worker 에서)"""
+    global _deferred
+    pending, _deferred = _deferred or [], None
+    for target, args, name in pending:
+        start(target, args, name)
+    return len(pending)
@@ -0,0 +1,144 @@
+"""
+챗봇 세션별 대화 기억 (서버측, 토큰 예산 고정)
+
+  • 최근 대화는 원문 그대로 보관
+  • 예산을 넘으면 오래된 대화부터 한 줄 요약으로 압축해 rolling summary 에 합침
+    (이름·주민번호처럼 이후 처리에 필요한 값은 별도로 추출해 유지)
+  • 오래 쓰이지 않은 세션은 LRU 순서로 제거
+
+요약은 LLM 을 다시 호출하지 않고 로컬에서 추출식으로 만든다.
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "1200"))
+SUMMARY_BUDGET = int(os.getenv("CHAT_MEMORY_SUMMARY_BUDGET", "300"))
+MAX_SESSIONS = int(os.getenv("CHAT_MEMORY_MAX_SESSIONS", "500"))
+IDLE_SECONDS = int(os.getenv("CHAT_MEMORY_IDLE_SECONDS", "1800"))
+
+SUMMARY_SNIPPET_CHARS = 40
+
+_NAME_RE = re.compile(r"(?:이름|성함)[\s:]*([가-힣]{2,10})")
+_RRN_RE = re.compile(r"(\d{6}-\d{7})")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    대략적인 토큰 수 추정 (한글은 1~2자당 1토큰, 영문은 4자당 1토큰 정도).
+    예산 관리용이므로 정확할 필요는 없고, 약간 크게 잡는다.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars + 1) // 2 + ascii_chars // 4 + 1
+
+
+class Conversation:
+    """한 세션의 대화 기록"""
+
+    def __init__(self):
+        self.turns: list[tuple[str, str]] = []   # (user, model)
+        self.summary_lines: list[str] = []
+        self.facts: dict[str, str] = {}
+        self.last_used = time.monotonic()
+
+    def _turn_tokens(self, turn) -> int:
+        return estimate_tokens(turn[0]) + estimate_tokens(turn[1])
+
+    def _compact(self, turn) -> None:
+        user, reply = turn
+        for source in (user, reply):
+            name = _NAME_RE.search(source)
+            rrn = _RRN_RE.search(source)
+            if name:
+                self.facts["이름"] = name.group(1)
+            if rrn:
+                self.facts["주민번호"] = rrn.group(1)
+        self.summary_lines.append(
+            f"사용자: {user[:SUMMARY_SNIPPET_CHARS]} → 안내: {reply[:SUMMARY_SNIPPET_CHARS]}"
+        )
+        while (len(self.summary_lines) > 1
+               and sum(estimate_tokens(l) for l in self.summary_lines) > SUMMARY_BUDGET):
+            self.summary_lines.pop(0)
+
+    def add(self, user: str, reply: str) -> None:
+        self.turns.append((user, reply))
+        self.last_used = time.monotonic()
+        budget = TOKEN_BUDGET - SUMMARY_BUDGET
+        while len(self.turns) > 1 and sum(self._turn_tokens(t) for t in self.turns) > budget:
+            self._compact(self.turns.pop(0))
+
+    def summary(self) -> str:
+        """압축된 이전 대화 요약 (없으면 빈 문자열)"""
+        if not self.summary_lines and not self.facts:
+            return ""
+        lines = ["[이전 대화 요약]"]
+        if self.facts:
+            lines.append(" ".join(f"{k}={v}" for k, v in self.facts.items()))
+        lines.extend(self.summary_lines)
+        return "\n".join(lines)
+
+    def history(self) -> list[dict]:
+        """generate_content() 에 넘길 수 있는 role/parts 형식의 최근 대화"""
+        contents = []
+        for user, reply in self.turns:
+            contents.append({"role": "user", "parts": [user]})
+            contents.append({"role": "model", "parts": [reply]})
+        return contents
+
+
+class ConversationStore:
+    """세션 ID → Conversation, LRU + 유휴 시간 기준 제거"""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_seconds: int = IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions: OrderedDict[str, Conversation] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._sessions:
+            sid, conv = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - conv.last_used > self.idle_seconds:
+                del self._sessions[sid]
+            else:
+                break
+
+    def get(self, session_id: str) -> Conversation:
+        with self._lock:
+            conv = self._sessions.get(session_id)
+            if conv is None:
+                conv = self._sessions[session_id] = Conversation()
+            else:
+                self._sessions.move_to_end(session_id)
+            conv.last_used = time.monotonic()
+            self._evict()
+            return conv
+
+    def record(self, session_id: str, user: str, reply: str) -> None:
+        conv = self.get(session_id)
+        with self._lock:
+            conv.add(user, reply)
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+store = ConversationStore()
+
+
+def session_id_for(session) -> str:
+    """Flask 세션에 대화 ID 가 없으면 새로 발급"""
+    sid = session.get("chat_session_id")
+    if not sid:
+        sid = session["chat_session_id"] = uuid.uuid4().hex
+    return sid
@@ -0,0 +1,285 @@
+"""
+부하 테스트·벤치마크용 합성 데이터 생성기
+
+  python -m app.utils.datagen reservations --rows 1000000 --seed 42 -o /tmp/reservations.csv
+  python -m app.utils.datagen fees --per-department 30 --seed 42 -o /tmp/treatment_fees.csv
+  python -m app.utils.datagen items --reservations /tmp/reservations.csv \
+      --fees /tmp/treatment_fees.csv -o /tmp/prescription_items.csv
+
+data/reservations.csv, data/treatment_fees.csv 와 같은 형식의 행을
+청크 단위로 디스크에 바로 기록하므로 행 수와 무관하게 메모리 사용량이 일정하다.
+같은 seed 를 주면 항상 같은 파일이 만들어진다.
+"""
+import argparse
+import csv
+import random
+import sys
+from bisect import bisect
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from app.routes.reception import SYM_TO_DEPT
+from app.utils.prescription_plans import ITEM_FIELDS
+
+RESERVATION_FIELDS = ["name", "rrn", "time", "department", "location", "doctor", "payment_status"]
+FEE_FIELDS = ["Department", "Prescription", "Fee"]
+
+DEPARTMENTS = sorted(set(SYM_TO_DEPT.values()))
+
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류전홍고문양손배백허유남심노하곽성차주우구민진나지엄채원천방공현함변염여추도소석선설마길연위표명기반왕금옥육인맹제모탁국어은편용"
+GIVEN_SYLLABLES = (
+    "가경계고관광교구국규근기길나남녀다단달담대덕도동두라란래려련령례로록룡류륜률리린림마만명무문미민"
+    "배백범병보봉부빈사산상서석선설성세소송수숙순승시식신실아안애양언여연열영예오옥완용우욱운원월위유"
+    "윤율은을음의이익인일임자재정제조종주준중지진찬창채천철초춘충치태택하한해향혁현형혜호홍화환회효후훈희"
+)
+DRUG_NAMES = [
+    "비타민D", "철분제", "위장약", "혈압약", "진통제", "해열제", "항생제", "항히스타민제",
+    "소염제", "거담제", "기침억제제", "지사제", "정장제", "연고", "수액", "소화효소제",
+    "수면유도제", "근이완제", "안약", "비염 스프레이", "흡입제", "프로바이오틱스",
+]
+DEFAULT_STATUS_MIX = {"Pending": 0.80, "Registered": 0.10, "Paid": 0.10}
+
+# 주민번호 (생년월일, 일련번호) 조합을 행 번호에 대해 1:1 로 섞기 위한 값
+_BIRTH_START = date(1935, 1, 1)
+_BIRTH_DAYS = 365 * 85
+_SERIALS = 100_000
+_RRN_SPACE = _BIRTH_DAYS * _SERIALS
+_RRN_MULTIPLIER = 2654435761   # _RRN_SPACE 와 서로소 → i ↦ (i*m + c) mod N 은 순열
+
+CHUNK_ROWS = 10_000
+
+
+def rrn_check_digit(first12: str) -> int:
+    """주민등록번호 검증번호(13번째 자리) 계산"""
+    weights = (2, 3, 4, 5, 6, 7, 8, 9, 2, 3, 4, 5)
+    total = sum(int(d) * w for d, w in zip(first12, weights))
+    return (11 - total % 11) % 10
+
+
+def make_rrn(index: int, offset: int, rng: random.Random) -> str:
+    """
+    행 번호 index 마다 서로 다른, 형식이 올바른 주민번호를 만든다.
+    (생년월일·성별 자리·검증번호가 모두 유효)
+    """
+    k = (index * _RRN_MULTIPLIER + offset) % _RRN_SPACE
+    birth = _BIRTH_START + timedelta(days=k // _SERIALS)
+    serial = k % _SERIALS
+    female = rng.random() < 0.5
+    gender = (3 if birth.year >= 2000 else 1) + (1 if female else 0)
+    first12 = f"{birth:%y%m%d}{gender}{serial:05d}"
+    return f"{first12[:6]}-{first12[6:]}{rrn_check_digit(first12)}"
+
+
+class _RrnTable:
+    """
+    make_rrn() 의 고속 버전에서 쓰는 사전 계산 표.
+    생년월일 문자열·가중합과 일련번호 가중합을 미리 구해 두어
+    행마다 날짜 연산과 검증번호 합계를 다시 계산하지 않는다.
+    """
+    def __init__(self):
+        weights = (2, 3, 4, 5, 6, 7, 8, 9, 2, 3, 4, 5)
+        self.births = []
+        for d in range(_BIRTH_DAYS):
+            birth = _BIRTH_START + timedelta(days=d)
+            text = f"{birth:%y%m%d}"
+            wsum = sum(int(c) * w for c, w in zip(text, weights[:6]))
+            self.births.append((text, wsum, 3 if birth.year >= 2000 else 1))
+        self.serial_sums = [
+            sum(int(c) * w for c, w in zip(f"{s:05d}", weights[7:]))
+            for s in range(_SERIALS)
+        ]
+
+
+_rrn_table = None
+
+
+def make_name(rng: random.Random) -> str:
+    given = "".join(rng.choice(GIVEN_SYLLABLES) for _ in range(2))
+    return rng.choice(SURNAMES) + given
+
+
+def make_staff(rng: random.Random, doctors_per_department: int = 3) -> dict:
+    """진료과별 위치와 담당 의사 목록"""
+    staff = {}
+    for i, dept in enumerate(DEPARTMENTS):
+        floor = 1 + i // 4
+        wing = "ABC"[i % 3]
+        rooms = [f"{floor}층 {wing}-{n}" for n in range(1, 5)]
+        doctors = [f"{make_name(rng)} 전문의" for _ in range(doctors_per_department)]
+        staff[dept] = (rooms, doctors)
+    return staff
+
+
+def iter_reservations(rows: int, seed: int = 0, start: date | None = None,
+                      days: int = 1, status_mix: dict | None = None):
+    """
+    예약 행(list)을 하나씩 생성하는 제너레이터.
+    예약 시간은 start 부터 days 일 동안, 09:00~17:50 사이 10분 단위 슬롯.
+    행마다 호출되는 부분은 지역 변수와 rng.random() 만 사용하도록 풀어 썼다
+    (결과는 make_name / make_rrn 과 같은 형식).
+    """
+    global _rrn_table
+    if _rrn_table is None:
+        _rrn_table = _RrnTable()
+    births, serial_sums = _rrn_table.births, _rrn_table.serial_sums
+
+    rng = random.Random(seed)
+    rand = rng.random
+    start = start or date.today()
+    status_mix = status_mix or DEFAULT_STATUS_MIX
+    statuses = list(status_mix)
+    cum_weights = list(accumulate(status_mix.values()))
+    total_weight = cum_weights[-1]
+    staff = make_staff(rng)
+    offset = rng.randrange(_RRN_SPACE)
+    times = [
+        f"{start + timedelta(days=d):%Y-%m-%d} {h:02d}:{m:02d}"
+        for d in range(days) for h in range(9, 18) for m in range(0, 60, 10)
+    ]
+    depts = [(dept, *staff[dept]) for dept in DEPARTMENTS]
+    surnames, syllables = SURNAMES, GIVEN_SYLLABLES
+    n_surnames, n_syllables = len(surnames), len(syllables)
+    n_depts, n_times = len(depts), len(times)
+
+    for i in range(rows):
+        dept, rooms, doctors = depts[int(rand() * n_depts)]
+        name = (surnames[int(rand() * n_surnames)]
+                + syllables[int(rand() * n_syllables)]
+                + syllables[int(rand() * n_syllables)])
+
+        k = (i * _RRN_MULTIPLIER + offset) % _RRN_SPACE
+        birth, birth_sum, gender = births[k // _SERIALS]
+        serial = k % _SERIALS
+        if rand() < 0.5:
+            gender += 1
+        check = (11 - (birth_sum + gender * 8 + serial_sums[serial]) % 11) % 10
+        rrn = f"{birth}-{gender}{serial:05d}{check}"
+
+        yield [
+            name,
+            rrn,
+            times[int(rand() * n_times)],
+            dept,
+            rooms[int(rand() * len(rooms))],
+            doctors[int(rand() * len(doctors))],
+            statuses[bisect(cum_weights, rand() * total_weight)],
+        ]
+
+
+def iter_fees(per_department: int = 10, seed: int = 0):
+    """진료과별 처방 항목과 금액 행을 생성"""
+    rng = random.Random(seed)
+    for dept in DEPARTMENTS:
+        names = rng.sample(DRUG_NAMES, min(per_department, len(DRUG_NAMES)))
+        for n in range(per_department):
+            base = names[n % len(names)]
+            suffix = "" if n < len(names) else f" {n // len(names) + 1}"
+            fee = rng.randrange(5_000, 50_000)
+            yield [dept, f"{base}{suffix} 처방", fee]
+
+
+def iter_items(reservations_path: str, fees_path: str, seed: int = 0):
+    """
+    접수 이후 단계(Registered / Paid)의 예약마다 같은 진료과 항목 2~3개를 골라
+    처방 항목 원장(prescription_items.csv) 행을 생성. 방문(주민번호, 날짜)당 한 번.
+    """
+    rng = random.Random(seed)
+    catalog: dict[str, list] = {}
+    with open(fees_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            catalog.setdefault(row["Department"].strip(), []).append(
+                (row["Prescription"].strip(), row["Fee"].strip()))
+
+    seen = set()
+    with open(reservations_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if (row.get("payment_status") or "").strip() not in ("Registered", "Paid"):
+                continue
+            dept = row["department"].strip()
+            visit = (row["rrn"].strip(), row["time"].strip()[:10])
+            if visit in seen or dept not in catalog:
+                continue
+            seen.add(visit)
+            choices = catalog[dept]
+            for name, fee in rng.sample(choices, min(len(choices), rng.randint(2, 3))):
+                yield [*visit, dept, name, fee]
+
+
+def write_rows(path: str, fieldnames: list[str], rows, encoding: str = "utf-8") -> list | None:
+    """
+    행 이터레이터를 CHUNK_ROWS 단위로 나눠 기록한다.
+    마지막으로 기록한 행을 반환한다 (없으면 None).
+    """
+    last = None
+    with open(path, "w", newline="", encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= CHUNK_ROWS:
+                writer.writerows(chunk)
+                last = chunk[-1]
+                chunk.clear()
+        if chunk:
+            writer.writerows(chunk)
+            last = chunk[-1]
+    return last
+
+
+def write_reservations(path: str, rows: int, **kwargs) -> dict | None:
+    """예약 파일을 생성하고 마지막 행을 dict 로 반환"""
+    last = write_rows(path, RESERVATION_FIELDS, iter_reservations(rows, **kwargs))
+    return dict(zip(RESERVATION_FIELDS, last)) if last else None
+
+
+def write_fees(path: str, per_department: int = 10, seed: int = 0) -> None:
+    # 원본 파일과 같이 BOM 포함 UTF-8
+    write_rows(path, FEE_FIELDS, iter_fees(per_department, seed), encoding="utf-8-sig")
+
+
+def _parse_status_mix(text: str) -> dict:
+    """'Pending=0.8,Paid=0.2' → {'Pending': 0.8, 'Paid': 0.2}"""
+    mix = {}
+    for part in text.split(","):
+        status, _, weight = part.partition("=")
+        mix[status.strip()] = float(weight)
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic kiosk data files")
+    sub = parser.add_subparsers(dest="kind", required=True)
+
+    p_resv = sub.add_parser("reservations", help="reservations.csv 형식")
+    p_resv.add_argument("--rows", type=int, default=100_000)
+    p_resv.add_argument("--start", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="first reservation date (YYYY-MM-DD, default: today)")
+    p_resv.add_argument("--days", type=int, default=1, help="number of days to spread over")
+    p_resv.add_argument("--status-mix", type=_parse_status_mix,
+                        help="e.g. Pending=0.8,Registered=0.1,Paid=0.1")
+
+    p_fees = sub.add_parser("fees", help="treatment_fees.csv 형식")
+    p_fees.add_argument("--per-department", type=int, default=10)
+
+    p_items = sub.add_parser("items", help="prescription_items.csv 형식 (예약·진료비 파일 기반)")
+    p_items.add_argument("--reservations", required=True)
+    p_items.add_argument("--fees", required=True)
+
+    for p in (p_resv, p_fees, p_items):
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("-o", "--output", required=True)
+
+    args = parser.parse_args(argv)
+    if args.kind == "reservations":
+        write_reservations(args.output, args.rows, seed=args.seed, start=args.start,
+                           days=args.days, status_mix=args.status_mix)
+    elif args.kind == "fees":
+        write_fees(args.output, args.per_department, args.seed)
+    else:
+        write_rows(args.output, ITEM_FIELDS, iter_items(args.reservations, args.fees, args.seed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+경량 계측(metrics) 모듈 — Prometheus 텍스트 형식으로 노출
+
+  • 요청 지연시간 히스토그램 (Blueprint endpoint 별)
+  • 내부 단계별 소요시간 (CSV 읽기, 상태 기록, PDF 생성, LLM 호출 …)
+  • 오류·차단 사유 카운터
+
+외부 의존성 없이 dict + Lock 만 사용하므로 운영 환경에서 상시 켜 두어도
+요청당 수 μs 수준의 비용만 든다.
+
+사용 예)
+    from app.utils import metrics
+
+    @metrics.timed("csv_read", op="reservation_lookup")
+    def lookup_reservation(...): ...
+
+    with metrics.timed("llm_call", op="generate_content"):
+        response = model.generate_content(...)
+
+    metrics.inc("kiosk_errors_total", source="certificate", reason="csv_access")
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request
+
+# 기본 히스토그램 버킷 (초) — 수 ms 의 CSV 조회부터 수 초의 LLM 호출까지
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_DURATION = "kiosk_request_duration_seconds"
+REQUESTS_TOTAL = "kiosk_requests_total"
+STAGE_DURATION = "kiosk_stage_duration_seconds"
+ERRORS_TOTAL = "kiosk_errors_total"
+CHATBOT_BLOCKED_TOTAL = "kiosk_chatbot_blocked_total"
+
+_lock = threading.Lock()
+_meta: dict[str, tuple[str, str]] = {}           # name → (type, help)
+_buckets: dict[str, tuple] = {}                   # name → histogram buckets
+_counters: dict[tuple, float] = {}                # (name, labels) → value
+_histograms: dict[tuple, list] = {}               # (name, labels) → [bucket counts…, sum, count]
+
+
+def register(name: str, kind: str, help_text: str, buckets: tuple | None = None) -> None:
+    """메트릭 이름과 종류(counter | histogram), 설명을 등록 (buckets 생략 시 DEFAULT_BUCKETS)"""
+    _meta[name] = (kind, help_text)
+    if kind == "histogram":
+        _buckets[name] = tuple(buckets or DEFAULT_BUCKETS)
+
+
+register(REQUEST_DURATION, "histogram", "HTTP request latency by endpoint.")
+register(REQUESTS_TOTAL, "counter", "HTTP requests by endpoint and status code.")
+register(STAGE_DURATION, "histogram", "Duration of internal stages (CSV reads, status writes, PDF renders, LLM calls).")
+register(ERRORS_TOTAL, "counter", "Handled errors by source and reason.")
+register(CHATBOT_BLOCKED_TOTAL, "counter", "Chatbot responses blocked or cut short, by reason.")
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    """카운터 증가"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """히스토그램에 관측값 기록"""
+    key = _key(name, labels)
+    buckets = _buckets.get(name, DEFAULT_BUCKETS)
+    idx = bisect_left(buckets, value)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(buckets) + 2)
+        if idx < len(buckets):
+            hist[idx] += 1
+        hist[-2] += value
+        hist[-1] += 1
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    """
+    with 블록 또는 데코레이터로 감싼 구간의 소요시간을
+    kiosk_stage_duration_seconds{stage=..., ...} 에 기록한다.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(STAGE_DURATION, time.perf_counter() - start, stage=stage, **labels)
+
+
+def reset() -> None:
+    """수집된 값 전체 초기화 (테스트·벤치마크용)"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# ── Prometheus 텍스트 출력 ─────────────────────────────────────
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs, extra: tuple = ()) -> str:
+    items = list(pairs) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render() -> str:
+    """현재 값을 Prometheus text exposition format(0.0.4) 문자열로 변환"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text) in _meta.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+        else:
+            for (n, labels), hist in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(_buckets.get(name, DEFAULT_BUCKETS), hist):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels, (('le', '+Inf'),))} {hist[-1]}")
+                lines.append(f"{name}_sum{_labels(labels)} {hist[-2]:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# ── Flask 연동: 요청 단위 지연시간 측정 ───────────────────────────
+def init_app(app) -> None:
+    """모든 요청의 지연시간과 상태 코드를 endpoint 별로 기록"""
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            endpoint = request.endpoint or "unmatched"
+            observe(REQUEST_DURATION, time.perf_counter() - start, endpoint=endpoint)
+            inc(REQUESTS_TOTAL, endpoint=endpoint, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def _record_exception(exc):
+        if exc is not None:
+            inc(ERRORS_TOTAL, source=request.endpoint or "unmatched", reason=type(exc).__name__)
@@ -0,0 +1,97 @@
+"""
+정적 키오스크 화면 렌더링 캐시
+
+home / certificate / emergency / reception(첫 단계) 화면은 세션의
+`lang`, `font_size` 값 외에는 입력이 없으므로, (endpoint, lang, font_size)
+조합별로 렌더링 결과(bytes)를 보관했다가 재사용한다.
+
+  • ETag 를 계산해 If-None-Match 가 일치하면 304 로 응답
+  • 템플릿 파일이 수정되면(mtime 변경) 캐시 전체를 비움
+"""
+import hashlib
+import os
+import threading
+import time
+
+from flask import current_app, render_template, request, session
+
+# 템플릿 디렉터리 mtime 을 다시 확인하기까지의 최소 간격(초)
+_CHECK_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_pages: dict[tuple, tuple[bytes, str]] = {}   # key → (body, etag)
+_templates_version: float | None = None
+_last_check = 0.0
+
+
+def _template_dirs() -> list[str]:
+    """앱과 각 Blueprint 에 등록된 템플릿 폴더 목록"""
+    app = current_app
+    dirs = []
+    if app.template_folder:
+        dirs.append(os.path.join(app.root_path, app.template_folder))
+    for bp in app.blueprints.values():
+        if bp.template_folder:
+            dirs.append(os.path.join(bp.root_path, bp.template_folder))
+    return [os.path.abspath(d) for d in dict.fromkeys(dirs) if os.path.isdir(d)]
+
+
+def _scan_templates_version() -> float:
+    latest = 0.0
+    for folder in _template_dirs():
+        for root, _dirs, files in os.walk(folder):
+            for fname in files:
+                try:
+                    latest = max(latest, os.path.getmtime(os.path.join(root, fname)))
+                except OSError:
+                    continue
+    return latest
+
+
+def _check_templates() -> None:
+    """템플릿이 바뀌었으면 캐시 무효화 (최대 _CHECK_INTERVAL 마다 1회 검사)"""
+    global _templates_version, _last_check
+    now = time.monotonic()
+    if now - _last_check < _CHECK_INTERVAL:
+        return
+    _last_check = now
+    version = _scan_templates_version()
+    if version != _templates_version:
+        with _lock:
+            _pages.clear()
+            _templates_version = version
+
+
+def clear() -> None:
+    """캐시 전체 삭제"""
+    with _lock:
+        _pages.clear()
+
+
+def render_cached(template_name: str, **context):
+    """
+    render_template() 대체 함수.
+    같은 (endpoint, lang, font_size) 조합이면 저장된 bytes 를 그대로 돌려주고,
+    요청의 ETag 가 같으면 304 Not Modified 로 응답한다.
+    """
+    _check_templates()
+
+    key = (
+        request.endpoint,
+        template_name,
+        session.get("lang"),
+        session.get("font_size"),
+        tuple(sorted(context.items())),
+    )
+    cached = _pages.get(key)
+    if cached is None:
+        body = render_template(template_name, **context).encode("utf-8")
+        etag = hashlib.sha1(body).hexdigest()
+        cached = (body, etag)
+        with _lock:
+            _pages[key] = cached
+
+    body, etag = cached
+    response = current_app.response_class(body, mimetype="text/html")
+    response.set_etag(etag)
+    return response.make_conditional(request)
@@ -0,0 +1,611 @@
+"""
+결제 단말·PG 연동 계층 (수납 승인·매입을 요청 스레드 밖에서 처리)
+
+  • PaymentProvider : 승인(authorize)·매입(capture) 인터페이스 — 둘 다 코루틴.
+    같은 idempotency_key 로 다시 호출하면 같은 결과를 돌려줘야 한다 (시간 초과 뒤 재시도해도 이중 결제 없음).
+      - SimulatorProvider : 네트워크 없이 동작하는 로컬 모의 단말 (지연·거절·일시 오류 비율 설정)
+      - HttpProvider      : JSON HTTP PG 게이트웨이 — keep-alive 연결을 PAYMENT_GATEWAY_CONNECTIONS 개까지 재사용,
+                            요청마다 Idempotency-Key 헤더
+  • PaymentGateway.start() : 결제 기록을 만들고 승인·매입을 전용 이벤트 루프 스레드에 맡긴 뒤 바로 반환.
+    단말 응답을 기다리는 동안 요청 스레드를 붙잡지 않으므로 수납 처리량이 단말 지연에 묶이지 않는다.
+    결제 화면은 /payment/status/<id> 폴링으로 결과를 받는다.
+  • 호출마다 resilience.call_with_resilience_async 로 마감시간(PAYMENT_TIMEOUT)·재시도·회로 차단기 적용
+  • 결제 기록은 PAYMENT_DIR/<결제 ID>.json (상태가 바뀔 때마다 원자적으로 교체) — 어느 worker 로
+    상태 조회가 가도 보인다. 결제 ID 는 idempotency key 에서 만들고 파일을 O_EXCL 방식(os.link)으로
+    만들기 때문에, 같은 키로 두 번 제출되면(버튼 두 번 누름, 다른 worker) 두 번째는 기존 결제를 돌려받는다.
+    후속 처리에 필요한 값(context — 환자 주민번호·이름)은 follow_up 으로 기록에 남겨, 처리하던 worker 가
+    사라져도 다른 worker 가 후속 처리를 끝낼 수 있게 한다. 후속 처리가 끝나면 기록에서 지운다.
+  • 매입이 끝나면 CAPTURED 를 먼저 기록한 뒤 on_captured(예약 Paid 기록 등)를 실행하고 followed_up 표시.
+    화면·챗봇은 settled() 가 참일 때(후속 처리까지 끝났을 때) 결제를 끝난 것으로 본다 —
+    그래야 완료 화면 직후의 증명서 요청이 아직 Paid 가 아닌 예약을 보지 않는다.
+  • 기록의 owner(호스트:pid)가 결제를 진행 중인 프로세스. owner 가 사라졌거나(worker 재시작·교체)
+    PAYMENT_STALE_SECONDS 동안 진행이 없으면 "주인 없는" 결제로 본다.
+      - 같은 키로 다시 제출하면 그 결제를 넘겨받아 남은 단계부터 이어서 진행
+        (제공자 호출은 같은 idempotency key 라 이중 승인·매입 없음, 매입 뒤 후속 처리만 남았으면 그것만)
+      - init_app() 이 띄운 정리 스레드가 PAYMENT_RECOVER_SECONDS 마다 주인 없는 pending / authorized
+        결제를 failed 로 정리 (매입 전이므로 청구되지 않음 — 승인 보류는 PG 에서 만료)하고,
+        매입은 끝났는데 후속 처리가 남은 결제는 기록의 follow_up 으로 on_captured 를 실행해 마무리
+        (청구된 결제의 예약이 Paid 가 되지 않거나 완료 화면이 끝없이 기다리는 일이 없도록)
+"""
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import re
+import socket
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.utils import background, metrics, resilience
+
+try:
+    import fcntl
+except ImportError:   # Windows — 넘겨받기를 프로세스 간에 직렬화하지 않음
+    fcntl = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+PAYMENT_DIR = os.getenv("PAYMENT_DIR", os.path.join(BASE_DIR, "data", "payments"))
+GATEWAY_URL = os.getenv("PAYMENT_GATEWAY_URL", "")
+GATEWAY_KEY = os.getenv("PAYMENT_GATEWAY_KEY", "")
+GATEWAY_CONNECTIONS = int(os.getenv("PAYMENT_GATEWAY_CONNECTIONS", "8"))
+PROVIDER = os.getenv("PAYMENT_PROVIDER", "http" if GATEWAY_URL else "simulator")
+TIMEOUT = float(os.getenv("PAYMENT_TIMEOUT", "15"))        # 승인·매입 각각의 마감시간 (재시도 포함, 초)
+MAX_RETRIES = int(os.getenv("PAYMENT_MAX_RETRIES", "2"))
+KEEP_SECONDS = float(os.getenv("PAYMENT_KEEP_SECONDS", "86400"))
+STALE_SECONDS = float(os.getenv("PAYMENT_STALE_SECONDS", str(2 * TIMEOUT + 60)))   # 승인·매입 마감시간보다 길게
+RECOVER_SECONDS = float(os.getenv("PAYMENT_RECOVER_SECONDS", "60"))
+SIM_LATENCY = os.getenv("PAYMENT_SIM_LATENCY", "0")        # "0.8" 고정 또는 "0.3,1.5" 균등 분포 (초)
+SIM_DECLINE_RATE = float(os.getenv("PAYMENT_SIM_DECLINE_RATE", "0"))
+SIM_ERROR_RATE = float(os.getenv("PAYMENT_SIM_ERROR_RATE", "0"))
+MAX_KEY_LENGTH = 128
+
+PENDING, AUTHORIZED, CAPTURED, DECLINED, FAILED = "pending", "authorized", "captured", "declined", "failed"
+FINAL_STATES = (CAPTURED, DECLINED, FAILED)
+
+PAYMENTS_TOTAL = "kiosk_payments_total"
+PAYMENT_DURATION = "kiosk_payment_duration_seconds"
+metrics.register(PAYMENTS_TOTAL, "counter", "Payments by provider, method and final state.")
+metrics.register(PAYMENT_DURATION, "histogram", "Payment provider call latency by provider and step (authorize, capture, total).")
+
+_ID_RE = re.compile(r"^[0-9A-F]{16}$")
+
+
+class PaymentError(RuntimeError):
+    """재시도해도 결과가 바뀌지 않는 결제 오류"""
+    pass
+
+
+class PaymentDeclined(PaymentError):
+    """카드사·PG 가 결제를 거절함"""
+    pass
+
+
+class ProviderError(ConnectionError):
+    """단말·게이트웨이 일시 오류 (같은 idempotency key 로 재시도)"""
+    pass
+
+
+def payment_id(idempotency_key: str) -> str:
+    return hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()[:16].upper()
+
+
+def is_payment_id(value: str) -> bool:
+    return bool(_ID_RE.match(value or ""))
+
+
+def new_idempotency_key() -> str:
+    return uuid.uuid4().hex
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: str | None) -> bool | None:
+    """owner 프로세스가 살아 있는지 (다른 호스트거나 알 수 없으면 None)"""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# ── 제공자 ─────────────────────────────────────────────────────
+class PaymentProvider:
+    """
+    승인·매입 인터페이스. timeout 은 이 호출에 남은 시간(초).
+    거절은 PaymentDeclined, 재시도해도 되는 오류는 ProviderError / TimeoutError 로 알린다.
+    """
+    name = "base"
+
+    async def authorize(self, amount: int, method: str, idempotency_key: str, timeout: float) -> str:
+        """승인 ID 반환"""
+        raise NotImplementedError
+
+    async def capture(self, authorization_id: str, amount: int, idempotency_key: str, timeout: float) -> str:
+        """매입 ID 반환"""
+        raise NotImplementedError
+
+
+def _parse_latency(spec: str) -> tuple[float, float]:
+    """'0.8' → (0.8, 0.8), '0.3,1.5' → (0.3, 1.5)"""
+    parts = [float(p) for p in str(spec).split(",") if p.strip()] or [0.0]
+    return min(parts), max(parts)
+
+
+class SimulatorProvider(PaymentProvider):
+    """
+    로컬 모의 단말 — 지연은 [lo, hi] 균등 분포, 승인 중 decline_rate 비율은 거절,
+    호출 중 error_rate 비율은 일시 오류(재시도하면 성공할 수 있음).
+    결과는 idempotency key 별로 기억해 재시도 때 같은 결과를 돌려준다.
+    """
+    name = "simulator"
+    MAX_REMEMBERED = 10000
+
+    def __init__(self, latency: str = SIM_LATENCY, decline_rate: float = SIM_DECLINE_RATE,
+                 error_rate: float = SIM_ERROR_RATE, seed: int | None = None):
+        self.latency = _parse_latency(latency)
+        self.decline_rate = decline_rate
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._results: OrderedDict[str, object] = OrderedDict()
+
+    async def _call(self, idempotency_key: str, timeout: float, outcome):
+        lo, hi = self.latency
+        delay = self._rng.uniform(lo, hi)
+        if delay > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError("simulated terminal did not answer in time")
+        await asyncio.sleep(delay)
+        if idempotency_key not in self._results:
+            if self._rng.random() < self.error_rate:
+                raise ProviderError("simulated terminal error")
+            self._results[idempotency_key] = outcome()
+            while len(self._results) > self.MAX_REMEMBERED:
+                self._results.popitem(last=False)
+        result = self._results[idempotency_key]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def authorize(self, amount: int, method: str, idempotency_key: str, timeout: float) -> str:
+        def outcome():
+            if self._rng.random() < self.decline_rate:
+                return PaymentDeclined("card declined (simulated)")
+            return f"sim-auth-{uuid.uuid4().hex[:12]}"
+        return await self._call(idempotency_key, timeout, outcome)
+
+    async def capture(self, authorization_id: str, amount: int, idempotency_key: str, timeout: float) -> str:
+        return await self._call(idempotency_key, timeout, lambda: f"sim-cap-{uuid.uuid4().hex[:12]}")
+
+
+class _ConnectionPool:
+    """keep-alive HTTP(S) 연결 재사용 — 호출 스레드 수(= 최대 동시 요청) 만큼만 열린다"""
+
+    def __init__(self, url: str):
+        parts = urllib.parse.urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+
+    def _connect(self, timeout: float):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.netloc, timeout=timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=timeout)
+
+    def request(self, method: str, path: str, body: bytes, headers: dict, timeout: float) -> tuple[int, bytes]:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect(timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        except TimeoutError:
+            conn.close()
+            raise
+        except (OSError, http.client.HTTPException) as e:
+            # 게이트웨이가 닫은 유휴 연결 포함 — 같은 idempotency key 로 재시도하므로 안전
+            conn.close()
+            raise ProviderError(f"gateway request failed: {e}") from e
+        if resp.will_close:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        return resp.status, data
+
+
+class HttpProvider(PaymentProvider):
+    """
+    JSON HTTP PG 게이트웨이
+      POST {url}/authorizations               {"amount", "method", "currency"}
+           → 200 {"id", "status": "approved" | "declined", "reason"}
+      POST {url}/authorizations/{id}/capture  {"amount"}  → 200 {"id"}
+    모든 요청에 Authorization: Bearer <PAYMENT_GATEWAY_KEY>, Idempotency-Key.
+    429·5xx·연결 오류는 일시 오류(재시도), 402 는 거절, 그 밖의 4xx 는 PaymentError.
+    """
+    name = "http"
+
+    def __init__(self, url: str = GATEWAY_URL, api_key: str = GATEWAY_KEY,
+                 connections: int = GATEWAY_CONNECTIONS):
+        if not url:
+            raise ValueError("PAYMENT_GATEWAY_URL is not set")
+        self.api_key = api_key
+        self.connections = connections
+        self._pool = _ConnectionPool(url)
+        self._executor = None
+        self._pid = None
+
+    def _threads(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(self.connections, thread_name_prefix="payment-http")
+            self._pid = os.getpid()
+        return self._executor
+
+    def _post_blocking(self, path: str, payload: dict, idempotency_key: str, timeout: float) -> dict:
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Idempotency-Key": idempotency_key,
+        }
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        status, data = self._pool.request("POST", path, json.dumps(payload).encode("utf-8"), headers, timeout)
+        try:
+            body = json.loads(data or b"{}")
+        except ValueError:
+            body = {}
+        if status == 429 or status >= 500:
+            raise ProviderError(f"gateway returned {status}")
+        if status == 402:
+            raise PaymentDeclined(body.get("reason") or "declined")
+        if status >= 400:
+            raise PaymentError(f"gateway rejected request ({status}): {body.get('reason') or body.get('error') or ''}")
+        return body
+
+    async def _post(self, path: str, payload: dict, idempotency_key: str, timeout: float) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._threads(), self._post_blocking, path, payload, idempotency_key, timeout)
+
+    async def authorize(self, amount: int, method: str, idempotency_key: str, timeout: float) -> str:
+        body = await self._post("/authorizations", {"amount": amount, "method": method, "currency": "KRW"},
+                                idempotency_key, timeout)
+        if body.get("status") == "declined":
+            raise PaymentDeclined(body.get("reason") or "declined")
+        return str(body["id"])
+
+    async def capture(self, authorization_id: str, amount: int, idempotency_key: str, timeout: float) -> str:
+        path = f"/authorizations/{urllib.parse.quote(authorization_id, safe='')}/capture"
+        body = await self._post(path, {"amount": amount}, idempotency_key, timeout)
+        return str(body["id"])
+
+
+def make_provider(name: str = PROVIDER) -> PaymentProvider:
+    if name == "simulator":
+        return SimulatorProvider()
+    if name == "http":
+        return HttpProvider()
+    raise ValueError(f"unknown payment provider: {name}")
+
+
+# ── 결제 기록 (모든 worker 가 공유하는 파일) ─────────────────────
+class PaymentStore:
+    def __init__(self, directory: str = PAYMENT_DIR, keep_seconds: float = KEEP_SECONDS):
+        self.directory = directory
+        self.keep_seconds = keep_seconds
+        self._next_prune = 0.0
+
+    def _path(self, pay_id: str) -> str:
+        return os.path.join(self.directory, f"{pay_id}.json")
+
+    def _write_tmp(self, record: dict) -> str:
+        fd, tmp_path = tempfile.mkstemp(prefix=".payment-", suffix=".json", dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        return tmp_path
+
+    def create(self, record: dict) -> tuple[dict, bool]:
+        """새 결제면 (record, True), 같은 ID 가 이미 있으면 (기존 기록, False)"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._prune()
+        tmp_path = self._write_tmp(record)
+        try:
+            os.link(tmp_path, self._path(record["id"]))
+        except FileExistsError:
+            return self.load(record["id"]) or record, False
+        finally:
+            os.remove(tmp_path)
+        return record, True
+
+    def save(self, record: dict) -> None:
+        os.replace(self._write_tmp(record), self._path(record["id"]))
+
+    @contextmanager
+    def locked(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def claim(self, pay_id: str, check, owner: str) -> dict | None:
+        """잠금 안에서 다시 읽어 check(기록)이 참이면 owner 로 넘겨받은 기록, 아니면 None"""
+        with self.locked():
+            record = self.load(pay_id)
+            if record is None or not check(record):
+                return None
+            record.update(owner=owner, updated=time.time())
+            self.save(record)
+            return record
+
+    def records(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            pay_id, ext = os.path.splitext(name)
+            if ext == ".json" and is_payment_id(pay_id):
+                record = self.load(pay_id)
+                if record is not None:
+                    yield record
+
+    def load(self, pay_id: str) -> dict | None:
+        if not is_payment_id(pay_id):
+            return None
+        try:
+            with open(self._path(pay_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 3600
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name == ".lock":
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.stat(path).st_mtime > self.keep_seconds:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# ── 결제 진행 ─────────────────────────────────────────────────
+payment_breaker = resilience.CircuitBreaker("payment")
+
+
+class PaymentGateway:
+    """
+    결제 한 건 = 승인 → 매입 → on_captured(기록, context) 를 이벤트 루프 스레드에서 진행.
+    context 는 on_captured 에만 넘기는 값(환자 정보 등)으로 파일에 저장하지 않는다.
+    """
+
+    def __init__(self, provider: PaymentProvider | None = None, store: PaymentStore | None = None,
+                 timeout: float = TIMEOUT, max_retries: int = MAX_RETRIES, stale_seconds: float = STALE_SECONDS):
+        self._provider = provider
+        self.store = store or PaymentStore()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.stale_seconds = stale_seconds
+        self.on_captured = None
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def provider(self) -> PaymentProvider:
+        if self._provider is None:
+            self._provider = make_provider()
+        return self._provider
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        # fork 된 worker 에는 master 의 루프 스레드가 없으므로 프로세스마다 새로 띄운다
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="payments", daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop
+
+    def start(self, amount: float, method: str, idempotency_key: str, department: str = "",
+              context: dict | None = None) -> dict:
+        """
+        결제 기록을 만들고 승인·매입을 맡긴 뒤 바로 반환.
+        같은 키로 이미 시작한 결제면 그 기록 — 주인 없는 결제면 넘겨받아 남은 단계를 이어서 진행.
+        """
+        now = time.time()
+        record = {
+            "id": payment_id(idempotency_key),
+            "state": PENDING,
+            "amount": amount,
+            "method": method,
+            "department": department,
+            "provider": self.provider.name,
+            "owner": _owner(),
+            "created": now,
+            "updated": now,
+            "follow_up": context or {},
+        }
+        record, created = self.store.create(record)
+        if not created and self._resumable(record):
+            claimed = self.store.claim(record["id"], self._resumable, _owner())
+            if claimed is None:
+                return self.get(record["id"]) or record
+            record, created = claimed, True
+        if created:
+            asyncio.run_coroutine_threadsafe(
+                self._process(dict(record), idempotency_key, context or {}), self._event_loop())
+        return record
+
+    def _orphaned(self, record: dict) -> bool:
+        if time.time() - record.get("updated", 0) > self.stale_seconds:
+            return True
+        return _owner_alive(record.get("owner")) is False
+
+    def _resumable(self, record: dict) -> bool:
+        """진행 중이거나 매입 뒤 후속 처리가 남았는데 주인이 없는 결제"""
+        unfinished = record["state"] not in FINAL_STATES or (
+            record["state"] == CAPTURED and not record.get("followed_up", True))
+        return unfinished and self._orphaned(record)
+
+    def _abandoned(self, record: dict) -> bool:
+        return record["state"] in (PENDING, AUTHORIZED) and self._orphaned(record)
+
+    def _unfollowed(self, record: dict) -> bool:
+        return record["state"] == CAPTURED and not record.get("followed_up", True) and self._orphaned(record)
+
+    def recover(self) -> int:
+        """
+        주인 없는 결제를 정리하고 개수 반환.
+        pending / authorized 는 failed 로 (매입 전이라 청구되지 않음),
+        후속 처리가 남은 captured 는 기록의 follow_up 으로 on_captured 를 실행해 마무리.
+        """
+        count = 0
+        for record in self.store.records():
+            if self._abandoned(record):
+                claimed = self.store.claim(record["id"], self._abandoned, _owner())
+                if claimed is None:
+                    continue
+                self._update(claimed, state=FAILED, error="payment was interrupted; please try again", follow_up=None)
+                metrics.inc(PAYMENTS_TOTAL, provider=claimed.get("provider", ""), method=claimed["method"], state=FAILED)
+                count += 1
+            elif self._unfollowed(record):
+                claimed = self.store.claim(record["id"], self._unfollowed, _owner())
+                if claimed is None:
+                    continue
+                self._follow_up(claimed, claimed.get("follow_up") or {})
+                count += 1
+        return count
+
+    def get(self, pay_id: str) -> dict | None:
+        return self.store.load(pay_id)
+
+    def _update(self, record: dict, **changes) -> None:
+        record.update(changes, updated=time.time())
+        self.store.save(record)
+
+    async def _call(self, step: str, fn):
+        started = time.perf_counter()
+        try:
+            return await resilience.call_with_resilience_async(
+                fn, breaker=payment_breaker, deadline=self.timeout, max_retries=self.max_retries)
+        finally:
+            metrics.observe(PAYMENT_DURATION, time.perf_counter() - started,
+                            provider=self.provider.name, step=step)
+
+    async def _process(self, record: dict, idempotency_key: str, context: dict) -> None:
+        """기록의 상태부터 이어서 진행 (넘겨받은 결제는 승인이나 매입이 이미 끝났을 수 있음)"""
+        provider = self.provider
+        amount = int(round(record["amount"]))
+        started = time.perf_counter()
+        if record["state"] not in FINAL_STATES:
+            try:
+                if record["state"] == PENDING:
+                    authorization_id = await self._call("authorize", lambda timeout: provider.authorize(
+                        amount, record["method"], f"{idempotency_key}:authorize", timeout))
+                    self._update(record, state=AUTHORIZED, authorization_id=authorization_id)
+                capture_id = await self._call("capture", lambda timeout: provider.capture(
+                    record["authorization_id"], amount, f"{idempotency_key}:capture", timeout))
+                if self.on_captured is None:
+                    self._update(record, state=CAPTURED, capture_id=capture_id, followed_up=True, follow_up=None)
+                else:
+                    self._update(record, state=CAPTURED, capture_id=capture_id, followed_up=False)
+            # 청구되지 않은 결제는 후속 처리가 없으므로 환자 정보를 바로 지움
+            except PaymentDeclined as e:
+                self._update(record, state=DECLINED, error=str(e), follow_up=None)
+            except resilience.CircuitOpenError:
+                self._update(record, state=FAILED, error="payment service unavailable", follow_up=None)
+            except Exception as e:
+                self._update(record, state=FAILED, error=f"{type(e).__name__}: {e}", follow_up=None)
+            metrics.observe(PAYMENT_DURATION, time.perf_counter() - started, provider=provider.name, step="total")
+            metrics.inc(PAYMENTS_TOTAL, provider=provider.name, method=record["method"], state=record["state"])
+
+        if record["state"] == CAPTURED and not record.get("followed_up", True):
+            # 예약 상태 기록 등 파일 I/O 는 루프 밖에서 (다른 결제의 진행을 막지 않도록)
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._follow_up, record, context or record.get("follow_up") or {})
+
+    def _follow_up(self, record: dict, context: dict) -> None:
+        """on_captured 실행 후 followed_up 표시 (실패해도 표시하고 오류를 남김), 기록의 follow_up 은 지움"""
+        try:
+            if self.on_captured is not None:
+                self.on_captured(record, context)
+        except Exception as e:
+            print(f"payment {record['id']} captured but follow-up failed: {e}")
+            metrics.inc(metrics.ERRORS_TOTAL, source="payment", reason="after_capture")
+            self._update(record, followed_up=True, follow_up=None, follow_up_error=f"{type(e).__name__}: {e}")
+        else:
+            self._update(record, followed_up=True, follow_up=None)
+
+
+gateway = PaymentGateway()
+
+
+def _recover_loop(interval: float) -> None:
+    while True:
+        try:
+            recovered = gateway.recover()
+            if recovered:
+                print(f"payments: recovered {recovered} interrupted payment(s)")
+        except Exception as e:
+            print(f"payment recovery failed: {e}")
+        time.sleep(interval)
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def init_app(app, interval: float = RECOVER_SECONDS) -> None:
+    """worker 마다 주인 없는 결제 정리 스레드 시작 (시작 직후 한 번, 이후 interval 초마다)"""
+    global _started
+    with _start_lock:
+        if _started or interval <= 0:
+            return
+        _started = True
+    background.start(_recover_loop, (interval,), name="payment-recovery")
+
+
+def settled(record: dict) -> bool:
+    """끝난 상태이고, 매입이면 후속 처리(on_captured)까지 끝남"""
+    return record["state"] in FINAL_STATES and (record["state"] != CAPTURED or record.get("followed_up", True))
+
+
+def public_view(record: dict) -> dict:
+    """결제 화면·상태 API 에 내보내는 항목"""
+    view = {key: record.get(key) for key in ("id", "state", "amount", "method", "error")}
+    view["settled"] = settled(record)
+    return view
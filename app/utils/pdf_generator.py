@@ -1,6 +1,18 @@
 from fpdf import FPDF
 import os
 from datetime import datetime
+from app.utils import metrics
+
+# 출력 최적화 모드 (기본 켜짐)
+#   1 : 페이지 내용 스트림을 Flate 압축
+#   0 : 내용 스트림을 압축하지 않음 (PDF 내부를 직접 들여다볼 때)
+# 글꼴은 어느 모드든 fpdf2 가 문서에 쓰인 글리프만 담은 부분집합을 압축해 임베드하므로
+# 2.2 MB 원본 글꼴 대신 수 KB 만 들어간다 (문서 크기는 benchmarks/bench_hotpaths.py 의 "pdf" 항목 참고).
+PDF_OPTIMIZE = os.getenv("PDF_OPTIMIZE", "1") != "0"
+
+PDF_BYTES = "kiosk_pdf_bytes"
+metrics.register(PDF_BYTES, "histogram", "Size of generated PDF documents in bytes, by document type.",
+                 buckets=(4096, 8192, 16384, 32768, 65536, 131072, 262144, 524288, 1048576, 4194304))
 
 
 class MissingKoreanFontError(FileNotFoundError):
@@ -26,7 +38,7 @@ KOREAN_FONT_PATH = os.path.join(FONT_DIR, "NanumSquareNeo-bRg.ttf")
 def _add_korean_font(pdf_instance):
     """Helper to add NanumSquareNeo font to the PDF instance."""
     if os.path.exists(KOREAN_FONT_PATH):
-        pdf_instance.add_font("NanumSquareNeo", "", KOREAN_FONT_PATH, uni=True)
+        pdf_instance.add_font("NanumSquareNeo", "", KOREAN_FONT_PATH)
         pdf_instance.set_font("NanumSquareNeo", size=12)
         return True
     raise MissingKoreanFontError(
@@ -37,8 +49,21 @@ def _add_korean_font(pdf_instance):
         )
     )
 
-def generate_prescription_pdf(patient_name, patient_rrn, department, prescriptions, total_fee):
+def _new_pdf():
+    """출력 최적화 모드를 적용한 빈 문서"""
     pdf = FPDF()
+    pdf.set_compression(PDF_OPTIMIZE)
+    return pdf
+
+def _output(pdf_instance, doc):
+    """문서를 bytes 로 출력하고 문서 종류별 크기를 기록"""
+    pdf_bytes = bytes(pdf_instance.output())
+    metrics.observe(PDF_BYTES, len(pdf_bytes), doc=doc)
+    return pdf_bytes
+
+@metrics.timed("pdf_render", doc="prescription")
+def generate_prescription_pdf(patient_name, patient_rrn, department, prescriptions, total_fee):
+    pdf = _new_pdf()
     pdf.add_page()
     _add_korean_font(pdf)
 
@@ -86,13 +111,11 @@ def generate_prescription_pdf(patient_name, patient_rrn, department, prescriptio
     pdf.cell(0, 7, txt="* 이 처방전은 발행일로부터 7일간 유효합니다.", ln=True)
 
 
-    pdf_bytes = pdf.output(dest="S")
-    if isinstance(pdf_bytes, str):
-        return pdf_bytes.encode("latin-1")
-    return bytes(pdf_bytes)
+    return _output(pdf, "prescription")
 
+@metrics.timed("pdf_render", doc="medical_confirmation")
 def generate_medical_confirmation_pdf(patient_name, patient_rrn, disease_name):
-    pdf = FPDF()
+    pdf = _new_pdf()
     pdf.add_page()
     _add_korean_font(pdf)
 
@@ -132,7 +155,4 @@ def generate_medical_confirmation_pdf(patient_name, patient_rrn, disease_name):
     # pdf.image("path/to/stamp.png", x=pdf.get_x() + 120, y=pdf.get_y() -10, w=30)
 
 
-    pdf_bytes = pdf.output(dest="S")
-    if isinstance(pdf_bytes, str):
-        return pdf_bytes.encode("latin-1")
-    return bytes(pdf_bytes)
+    return _output(pdf, "medical_confirmation")
@@ -0,0 +1,140 @@
+"""
+증명서 미리 만들기 (수납 직후 백그라운드에서 처방전·진료확인서 PDF 를 렌더링)
+
+방문객은 대개 수납(/payment/done, 챗봇 수납 확인) 뒤 1분 안에 /certificate 에서 증명서를 누른다.
+수납이 끝나는 시점에 두 문서를 미리 만들어 두면, 버튼을 눌렀을 때 바로 내려줄 수 있다.
+
+  • submit(key, render) : render() 를 백그라운드 스레드(PRERENDER_THREADS 개)에 맡김.
+    같은 key 가 이미 있으면(렌더링 중이거나 끝났으면) 다시 만들지 않는다.
+  • take(key)           : 끝났으면 바로 PDF 바이트, 렌더링 중이면 최대 PRERENDER_WAIT 초 기다림,
+    없거나 만료(PRERENDER_TTL)·실패면 None → 요청 스레드에서 지금처럼 직접 렌더링.
+  • key 는 make_key(문서, **렌더 인자) — 렌더링 함수에 넘기는 값과 발행일을 그대로 담으므로
+    환자·진료과·처방 내용·날짜 중 하나라도 다르면 미리 만든 문서를 쓰지 않는다.
+  • 결과는 이 프로세스 메모리에만 둔다 (주민번호가 담긴 문서를 디스크에 남기지 않음).
+    여러 worker 로 돌릴 때는 수납을 처리한 worker 로 증명서 요청이 가야 적중한다.
+  • 백그라운드 렌더링은 입장 제어(admission)의 PDF 동시 실행 상한 밖에서 돌므로
+    스레드 수(PRERENDER_THREADS)로 CPU 사용을 제한한다.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import date
+
+from app.utils import metrics
+
+ENABLED = os.getenv("PRERENDER", "1") != "0"
+TTL = float(os.getenv("PRERENDER_TTL", "600"))
+WAIT = float(os.getenv("PRERENDER_WAIT", "3"))
+THREADS = int(os.getenv("PRERENDER_THREADS", "1"))
+MAX_ENTRIES = int(os.getenv("PRERENDER_MAX_ENTRIES", "64"))
+
+PRERENDER_TOTAL = "kiosk_prerender_total"
+metrics.register(PRERENDER_TOTAL, "counter",
+                 "Speculative certificate renders by document and result "
+                 "(scheduled, duplicate, hit, miss, timeout, failed, evicted).")
+
+
+def make_key(doc: str, **inputs) -> tuple:
+    """문서 종류 + 발행일 + 렌더 인자 (PDF 에 들어가는 값이 같을 때만 같은 key)"""
+    return doc, date.today().isoformat(), json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class _Entry:
+    __slots__ = ("future", "expires")
+
+    def __init__(self, future, expires: float):
+        self.future = future
+        self.expires = expires
+
+
+class Prerenderer:
+    def __init__(self, ttl: float = TTL, threads: int = THREADS, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.threads = threads
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # fork 된 worker 에서는 master 의 스레드 풀을 쓸 수 없으므로 프로세스마다 새로 만든다
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix="prerender")
+            self._pid = os.getpid()
+        return self._pool
+
+    def _expire(self, now: float) -> None:
+        for key in [k for k, entry in self._entries.items() if entry.expires <= now]:
+            del self._entries[key]
+
+    def submit(self, key: tuple, render) -> bool:
+        """render() 예약 — 새로 맡겼으면 True, 같은 key 가 이미 있으면 False"""
+        doc = key[0]
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if key in self._entries:
+                metrics.inc(PRERENDER_TOTAL, doc=doc, result="duplicate")
+                return False
+            self._entries[key] = _Entry(self._executor().submit(render), now + self.ttl)
+            while len(self._entries) > self.max_entries:
+                old_key, old = self._entries.popitem(last=False)
+                old.future.cancel()
+                metrics.inc(PRERENDER_TOTAL, doc=old_key[0], result="evicted")
+        metrics.inc(PRERENDER_TOTAL, doc=doc, result="scheduled")
+        return True
+
+    def take(self, key: tuple, wait: float = WAIT) -> bytes | None:
+        """미리 만든 PDF (없거나 wait 초 안에 끝나지 않으면 None). 다시 눌러도 쓸 수 있게 만료 때까지 둔다."""
+        doc = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                del self._entries[key]
+                entry = None
+        if entry is None:
+            metrics.inc(PRERENDER_TOTAL, doc=doc, result="miss")
+            return None
+        try:
+            pdf_bytes = entry.future.result(timeout=wait)
+        except FutureTimeout:
+            metrics.inc(PRERENDER_TOTAL, doc=doc, result="timeout")
+            return None
+        except Exception as e:
+            print(f"prerender {doc} failed: {e}")
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            metrics.inc(PRERENDER_TOTAL, doc=doc, result="failed")
+            return None
+        metrics.inc(PRERENDER_TOTAL, doc=doc, result="hit")
+        return pdf_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                entry.future.cancel()
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+prerenderer = Prerenderer()
+
+
+def submit(key: tuple, render) -> bool:
+    if not ENABLED:
+        return False
+    return prerenderer.submit(key, render)
+
+
+def take(key: tuple, wait: float = WAIT) -> bytes | None:
+    if not ENABLED:
+        return None
+    return prerenderer.take(key, wait)
@@ -0,0 +1,244 @@
+"""
+방문별 처방 계획 (주민번호 + 방문일 + 진료과 → 처방 항목 목록)
+
+  • 처음 필요할 때(수납 화면, 챗봇 수납 안내, 처방전 발급 중 먼저 오는 곳) 한 번만 만들고
+    이후에는 같은 계획을 재사용 → 청구 항목과 처방전 항목이 항상 일치
+  • 만든 계획은 방문일별 처방 항목 원장(data/prescription_items-YYYY-MM-DD.csv)에 추가 기록하며,
+    이 원장은 일일 정산(app.utils.settlement)의 입력이기도 하다
+  • 메모리에는 오늘 날짜의 계획만 보관 (날짜가 바뀌면 오늘 파일만 처음부터 읽음 — 지난 기록은 읽지 않는다)
+    조회할 때마다 원장에 새로 덧붙은 줄(다른 worker 프로세스가 만든 계획)만 이어서 읽는다
+  • 계획을 새로 만들 때는 원장 파일에 fcntl 잠금을 걸고 끝부분을 다시 읽은 뒤에 만든다
+    → 여러 worker 가 같은 방문의 계획을 동시에 만들어도 원장에는 하나만 기록
+  • 진료비 목록(treatment_fees.csv)은 파일이 바뀔 때만 다시 읽어 진료과별로 보관
+
+세션 쿠키에는 처방 목록을 넣지 않는다.
+"""
+import csv
+import os
+import random
+import threading
+from datetime import date
+
+from app.utils import metrics
+
+try:
+    import fcntl
+except ImportError:   # Windows — 프로세스 간 잠금 없이 동작
+    fcntl = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+TREATMENT_FEES_CSV = os.path.join(BASE_DIR, "data", "treatment_fees.csv")
+ITEMS_CSV = os.path.join(BASE_DIR, "data", "prescription_items.csv")
+
+# 처방 항목 원장 — 방문(주민번호, 방문일)마다 항목 한 줄
+ITEM_FIELDS = ["rrn", "visit_date", "department", "prescription", "fee"]
+
+
+def ledger_path(day: str, path: str = ITEMS_CSV) -> str:
+    """방문일 day 의 원장 파일 (prescription_items.csv → prescription_items-YYYY-MM-DD.csv)"""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{day}{ext}"
+
+
+def ledger_paths(path: str = ITEMS_CSV, day: str | None = None) -> list[str]:
+    """
+    정산이 읽을 원장 파일들 — 날짜별 파일(day 가 있으면 그 날짜만) + 나누기 전의 단일 원장 path.
+    없는 파일은 빠진다.
+    """
+    if day:
+        paths = [ledger_path(day, path)]
+    else:
+        root, ext = os.path.splitext(path)
+        directory, prefix = os.path.split(f"{root}-")
+        try:
+            names = os.listdir(directory or ".")
+        except FileNotFoundError:
+            names = []
+        paths = [os.path.join(directory, name) for name in sorted(names)
+                 if name.startswith(prefix) and name.endswith(ext)
+                 and len(name) == len(prefix) + len("YYYY-MM-DD") + len(ext)]
+    return [p for p in [path, *paths] if os.path.exists(p)]
+
+
+def _number(text: str):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+class FeeCatalog:
+    """진료과 → [{"name", "fee"}] (파일의 mtime·크기가 바뀌면 다시 읽음)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._by_department: dict[str, list] = {}
+        self._folded: dict[str, str] = {}
+
+    def _reload(self) -> None:
+        st = os.stat(self.path)   # 없으면 FileNotFoundError
+        signature = (st.st_mtime_ns, st.st_size)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            by_department: dict[str, list] = {}
+            with metrics.timed("csv_read", op="treatment_fees"), \
+                    open(self.path, newline="", encoding="utf-8-sig") as f:
+                for row in csv.DictReader(f):
+                    by_department.setdefault(row["Department"].strip(), []).append(
+                        {"name": row["Prescription"], "fee": _number(row["Fee"])})
+            self._by_department = by_department
+            self._folded = {dept.casefold(): dept for dept in by_department}
+            self._signature = signature
+
+    def items(self, department: str) -> list[dict]:
+        """진료과의 처방 항목 (대소문자·앞뒤 공백 무시)"""
+        self._reload()
+        dept = self._folded.get(department.strip().casefold(), department)
+        return self._by_department.get(dept, [])
+
+    def departments(self) -> set[str]:
+        self._reload()
+        return set(self._by_department)
+
+
+def draw_plan(department: str, catalog_items: list[dict], rng=random) -> dict:
+    """진료과 항목 중 2~3개를 골라 계획을 만든다 (저장하지 않음)"""
+    count = rng.randint(2, 3)
+    picked = list(catalog_items) if len(catalog_items) < count else rng.sample(catalog_items, count)
+    prescriptions = [dict(item) for item in picked]
+    return {
+        "department": department,
+        "prescriptions": prescriptions,
+        "total_fee": sum(item["fee"] for item in prescriptions),
+    }
+
+
+class PlanStore:
+    def __init__(self, path: str = ITEMS_CSV):
+        self.path = path   # 원장 이름 — 실제 기록은 ledger_path(오늘, path)
+        self._lock = threading.Lock()
+        self._day = None
+        self._plans: dict[tuple[str, str], dict] = {}   # (주민번호, 진료과) → 오늘의 계획
+        self._inode = None
+        self._offset = 0   # 원장에서 읽은 위치 (바이트)
+
+    def _sync(self) -> None:
+        """
+        오늘 원장에 새로 덧붙은 줄을 읽어 오늘의 계획에 반영 (self._lock 을 잡은 상태에서 호출).
+        날짜가 바뀌었거나 원장이 다른 파일로 바뀌었으면 오늘 파일을 처음부터 다시 읽는다.
+        """
+        today = date.today().isoformat()
+        try:
+            st = os.stat(ledger_path(today, self.path))
+        except FileNotFoundError:
+            st = None
+        inode = st.st_ino if st else None
+        if today != self._day or inode != self._inode or (st and st.st_size < self._offset):
+            self._plans, self._offset, self._day, self._inode = {}, 0, today, inode
+        if st is None or st.st_size == self._offset:
+            return
+        with open(ledger_path(today, self.path), "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1   # 아직 쓰는 중인 마지막 줄은 다음에 읽음
+        if not end:
+            return
+        for row in csv.reader(data[:end].decode("utf-8").splitlines()):
+            if len(row) < len(ITEM_FIELDS) or row == ITEM_FIELDS or row[1] != today:
+                continue
+            rrn, _, department, name, fee = row[:len(ITEM_FIELDS)]
+            plan = self._plans.setdefault((rrn, department), {
+                "department": department, "prescriptions": [], "total_fee": 0})
+            fee = _number(fee or "0")
+            plan["prescriptions"].append({"name": name, "fee": fee})
+            plan["total_fee"] += fee
+        self._offset += end
+
+    def _append(self, f, rrn: str, plan: dict) -> None:
+        writer = csv.writer(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            writer.writerow(ITEM_FIELDS)
+        for item in plan["prescriptions"]:
+            writer.writerow([rrn, self._day, plan["department"], item["name"], item["fee"]])
+        f.flush()
+        os.fsync(f.fileno())
+
+    def get(self, rrn: str, department: str) -> dict | None:
+        """오늘 이 환자에게 이 진료과로 만들어진 계획 (없으면 None)"""
+        with self._lock:
+            self._sync()
+            return self._plans.get((rrn, department.strip()))
+
+    def get_or_create(self, rrn: str, department: str, catalog: FeeCatalog) -> dict:
+        """
+        오늘의 계획을 반환하고, 없으면 진료비 목록에서 새로 만들어 원장에 기록한다.
+        진료과에 항목이 없으면 빈 계획을 반환하고 저장하지 않는다.
+        """
+        department = department.strip()
+        key = (rrn, department)
+        with self._lock:
+            self._sync()
+            plan = self._plans.get(key)
+            if plan is not None:
+                return plan
+            items = catalog.items(department)
+            if not items:
+                return {"department": department, "prescriptions": [], "total_fee": 0}
+            while key not in self._plans:
+                day = self._day
+                with open(ledger_path(day, self.path), "a", newline="", encoding="utf-8") as f:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    try:
+                        # 잠금을 기다리는 동안 다른 프로세스가 같은 방문의 계획을 만들었을 수 있음
+                        # (자정을 넘겼으면 새 날짜의 파일로 다시)
+                        self._sync()
+                        if self._day == day and key not in self._plans:
+                            self._append(f, rrn, draw_plan(department, items))
+                            self._sync()
+                    finally:
+                        if fcntl is not None:
+                            fcntl.flock(f, fcntl.LOCK_UN)
+            return self._plans[key]
+
+
+_catalogs: dict[str, FeeCatalog] = {}
+_stores: dict[str, PlanStore] = {}
+_registry_lock = threading.Lock()
+
+
+def get_catalog(path: str = TREATMENT_FEES_CSV) -> FeeCatalog:
+    """경로별로 하나의 진료비 목록 인스턴스를 공유"""
+    path = os.path.abspath(path)
+    catalog = _catalogs.get(path)
+    if catalog is None:
+        with _registry_lock:
+            catalog = _catalogs.setdefault(path, FeeCatalog(path))
+    return catalog
+
+
+def get_plan_store(path: str = ITEMS_CSV) -> PlanStore:
+    """경로별로 하나의 계획 저장소 인스턴스를 공유"""
+    path = os.path.abspath(path)
+    store = _stores.get(path)
+    if store is None:
+        with _registry_lock:
+            store = _stores.setdefault(path, PlanStore(path))
+    return store
+
+
+def plan_for(rrn: str | None, department: str, fees_path: str = TREATMENT_FEES_CSV,
+             items_path: str = ITEMS_CSV) -> dict:
+    """
+    방문의 처방 계획. 주민번호를 모르면 저장하지 않는 일회성 계획을 만든다.
+    진료비 목록이 없으면 FileNotFoundError.
+    """
+    catalog = get_catalog(fees_path)
+    if not rrn:
+        items = catalog.items(department)
+        return draw_plan(department, items) if items else {
+            "department": department, "prescriptions": [], "total_fee": 0}
+    return get_plan_store(items_path).get_or_create(rrn, department, catalog)
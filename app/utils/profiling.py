@@ -0,0 +1,263 @@
+"""
+운영 중 요청 샘플링 프로파일러 (create_app 에서 init_app 으로 등록)
+
+느린 화면의 원인을 재배포 없이 실제 요청으로 확인한다.
+
+  • 켜는 방법
+      - 관리자 API : POST /admin/profiling {"endpoints": ["certificate.generate_prescription_pdf"],
+                                           "sample_rate": 0.1, "seconds": 600}
+        → 설정은 PROFILE_DIR/profiling.json 에 저장되어 모든 worker 프로세스가 따른다
+          (각 worker 는 최대 1초마다 파일이 바뀌었는지 확인). seconds 가 지나면 자동으로 꺼짐.
+      - 요청 헤더 : X-Profile: <PROFILE_TOKEN> — 그 요청 하나만 프로파일 (PROFILE_TOKEN 이 설정된 경우)
+  • 측정 : 별도 샘플러 스레드가 PROFILE_INTERVAL 초마다 대상 요청 스레드의 호출 스택을
+    sys._current_frames() 로 읽어 센다 (통계적 프로파일링 — 요청 코드에 계측을 넣지 않음)
+  • 결과 : 요청마다 "collapsed stack" 파일(<시각>-<endpoint>-<id>.folded, 한 줄에 "f1;f2;f3 횟수")
+    flamegraph.pl, speedscope, inferno 등에 그대로 넣을 수 있다.
+    디렉터리에는 최근 PROFILE_MAX_FILES 개만 남긴다.
+  • 꺼져 있을 때 요청당 비용 : 헤더 확인 1번과 시각 비교 1번
+"""
+import hmac
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "data", "profiles"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_MAX_SECONDS = 3600
+PROFILE_HEADER = "X-Profile"
+CONFIG_NAME = "profiling.json"
+SUFFIX = ".folded"
+MAX_DEPTH = 128
+
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+# ── 샘플러 ─────────────────────────────────────────────────────
+class Profile:
+    """요청 하나의 스택 표본"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stacks: dict[str, int] = {}
+        self.samples = 0
+        self.started = time.perf_counter()
+
+    def add(self, frame) -> None:
+        names = []
+        while frame is not None and len(names) < MAX_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack = ";".join(reversed(names))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+
+class Sampler:
+    """대상 스레드가 있을 때만 깨어나 PROFILE_INTERVAL 마다 스택을 읽는 스레드"""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._targets: dict[int, Profile] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id: int, profile: Profile) -> None:
+        with self._lock:
+            self._targets[thread_id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+
+    def stop(self, thread_id: int) -> Profile | None:
+        """대상에서 빼고 Profile 반환 — 반환 뒤에는 더 이상 표본이 추가되지 않음"""
+        with self._lock:
+            return self._targets.pop(thread_id, None)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            with self._lock:
+                if not self._targets:
+                    self._wake.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, profile in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.add(frame)
+                del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler()
+
+
+# ── 설정 (모든 worker 가 공유하는 파일) ─────────────────────────
+class Settings:
+    def __init__(self, directory: str = PROFILE_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, CONFIG_NAME)
+        self.endpoints: set[str] = set()
+        self.sample_rate = 0.0
+        self.until = 0.0
+        self._mtime = None
+        self._next_check = 0.0
+
+    def active_for(self, endpoint: str | None) -> bool:
+        now = time.time()
+        if now >= self._next_check:
+            self._next_check = now + 1.0
+            self._reload()
+        if not self.endpoints or now >= self.until or endpoint not in self.endpoints:
+            return False
+        return random.random() < self.sample_rate
+
+    def _reload(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        data = {}
+        if mtime is not None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        self.endpoints = set(data.get("endpoints") or [])
+        self.sample_rate = float(data.get("sample_rate", 0))
+        self.until = float(data.get("until", 0))
+
+    def save(self, endpoints: list[str], sample_rate: float, seconds: float) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        data = {
+            "endpoints": sorted(set(endpoints)),
+            "sample_rate": max(0.0, min(1.0, sample_rate)),
+            "until": time.time() + max(0.0, min(seconds, PROFILE_MAX_SECONDS)),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._next_check = 0.0
+        return self.as_dict()
+
+    def clear(self) -> dict:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._next_check = 0.0
+        return self.as_dict()
+
+    def as_dict(self) -> dict:
+        self._next_check = 0.0
+        self.active_for(None)
+        remaining = max(0.0, self.until - time.time())
+        return {
+            "enabled": bool(self.endpoints) and remaining > 0,
+            "endpoints": sorted(self.endpoints),
+            "sample_rate": self.sample_rate,
+            "remaining_seconds": round(remaining, 1),
+        }
+
+
+settings = Settings()
+
+
+# ── 결과 파일 ─────────────────────────────────────────────────
+def write_profile(profile: Profile, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES) -> str | None:
+    if not profile.samples:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    name = f"{stamp}-{_SAFE_RE.sub('_', profile.endpoint)}-{secrets.token_hex(3)}{SUFFIX}"
+    tmp_path = os.path.join(directory, "." + name)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for stack, count in sorted(profile.stacks.items()):
+            f.write(f"{stack} {count}\n")
+    os.replace(tmp_path, os.path.join(directory, name))
+    _prune(directory, max_files)
+    return name
+
+
+def _prune(directory: str, max_files: int) -> None:
+    for old in list_profiles(directory)[max_files:]:
+        try:
+            os.remove(os.path.join(directory, old["name"]))
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles(directory: str = PROFILE_DIR) -> list[dict]:
+    """최근 것부터"""
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(SUFFIX) and not n.startswith(".")]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        profiles.append({
+            "name": name,
+            "endpoint": name.split("-", 1)[1].rsplit("-", 1)[0] if name.count("-") >= 2 else "",
+            "bytes": st.st_size,
+            "created": datetime.fromtimestamp(st.st_mtime).isoformat(timespec="seconds"),
+        })
+    return sorted(profiles, key=lambda p: p["name"], reverse=True)
+
+
+def is_profile_name(name: str) -> bool:
+    return name.endswith(SUFFIX) and not name.startswith(".") and _SAFE_RE.search(name) is None
+
+
+# ── Flask 훅 ──────────────────────────────────────────────────
+def _header_allowed() -> bool:
+    token = os.getenv("PROFILE_TOKEN")
+    value = request.headers.get(PROFILE_HEADER)
+    return bool(token and value) and hmac.compare_digest(value.encode("utf-8"), token.encode("utf-8"))
+
+
+def init_app(app) -> None:
+    """요청 시작·끝에 샘플링 대상 등록·해제 (admission 뒤에 등록 — 거절된 요청은 재지 않음)"""
+
+    @app.before_request
+    def _start_profile():
+        if not (settings.active_for(request.endpoint) or
+                (PROFILE_HEADER in request.headers and _header_allowed())):
+            return None
+        thread_id = threading.get_ident()
+        g._profile_thread = thread_id
+        sampler.start(thread_id, Profile(request.endpoint or "unmatched"))
+        return None
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        thread_id = g.pop("_profile_thread", None)
+        if thread_id is None:
+            return
+        profile = sampler.stop(thread_id)
+        if profile is not None:
+            try:
+                write_profile(profile)
+            except OSError as e:
+                print(f"profile write failed: {e}")
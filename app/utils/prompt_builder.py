@@ -0,0 +1,117 @@
+"""
+챗봇 프롬프트 구성 계층
+
+  • 고정된 시스템 지시문은 매 요청 본문에 다시 넣지 않고
+    GenerativeModel(system_instruction=...) 또는 Gemini 컨텍스트 캐시로 한 번만 등록
+  • 세션 상태(접수/수납 여부, 이름, 주민번호, 진료과, 예약 상태)는
+    하나의 짧은 구조화 블록으로 인코딩
+  • 호출마다 입력 토큰 수를 metrics 로 기록
+"""
+import hashlib
+import os
+import threading
+
+import google.generativeai as genai
+
+from app.utils import metrics
+
+PROMPT_TOKENS = "kiosk_llm_prompt_tokens"
+metrics.register(PROMPT_TOKENS, "histogram", "Input tokens sent to the LLM per call.",
+                 buckets=(50, 100, 200, 400, 800, 1600, 3200, 6400, 12800))
+
+# GEMINI_CONTEXT_CACHE=1 이면 시스템 지시문을 서버측 컨텍스트 캐시로 등록 시도.
+# (모델별 최소 토큰 수에 못 미치면 system_instruction 방식으로 자동 대체)
+CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1"
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+
+_lock = threading.Lock()
+_models: dict[tuple, "genai.GenerativeModel"] = {}
+_configured_key: str | None = None
+
+
+def configure(api_key: str) -> None:
+    """API 키가 바뀐 경우에만 genai.configure() 호출"""
+    global _configured_key
+    if api_key != _configured_key:
+        genai.configure(api_key=api_key)
+        _configured_key = api_key
+
+
+def _create_model(model_name: str, system_instruction: str):
+    if CONTEXT_CACHE_ENABLED:
+        try:
+            from google.generativeai import caching
+            cached = caching.CachedContent.create(
+                model=model_name,
+                display_name="kiosk-system-instruction",
+                system_instruction=system_instruction,
+                ttl=CONTEXT_CACHE_TTL_SECONDS,
+            )
+            return genai.GenerativeModel.from_cached_content(cached)
+        except Exception as e:
+            print(f"Context cache unavailable, using system_instruction: {e}")
+            metrics.inc(metrics.ERRORS_TOTAL, source="prompt_builder", reason="context_cache")
+    return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+
+def get_model(model_name: str, system_instruction: str):
+    """
+    (모델명, 지시문) 조합별로 GenerativeModel 을 한 번만 만들어 재사용한다.
+    지시문이 바뀌면 해시가 달라져 새 모델이 만들어진다.
+    """
+    key = (model_name, hashlib.sha1(system_instruction.encode("utf-8")).hexdigest())
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = _models[key] = _create_model(model_name, system_instruction)
+    return model
+
+
+def reset_models() -> None:
+    with _lock:
+        _models.clear()
+
+
+def encode_state(reception_complete=None, payment_complete=None, name=None,
+                 rrn=None, department=None, status=None) -> str:
+    """
+    세션 상태를 한 줄짜리 블록으로 인코딩.
+    값이 없는 항목은 생략한다.
+      예) [상태] 접수=Y 수납=N 이름=홍길동 주민번호=900101-1234567 진료과=내과 예약=Pending
+    """
+    def yn(value):
+        return "Y" if value else "N"
+
+    fields = [f"접수={yn(reception_complete)}", f"수납={yn(payment_complete)}"]
+    for label, value in (("이름", name), ("주민번호", rrn), ("진료과", department), ("예약", status)):
+        if value:
+            fields.append(f"{label}={value}")
+    return "[상태] " + " ".join(fields)
+
+
+def build_prompt(user_question: str, state_block: str, image_blob: dict | None = None,
+                 history: list | None = None, summary: str = "") -> list:
+    """
+    generate_content() 에 넘길 요청 본문.
+    시스템 지시문은 모델에 등록되어 있으므로 포함하지 않는다.
+    history(최근 대화)가 있으면 role/parts 형식의 multi-turn 목록을 반환한다.
+    """
+    parts = []
+    if image_blob:
+        parts.append(image_blob)
+    header = "\n".join(block for block in (summary, state_block) if block)
+    parts.append(f"{header}\n사용자 질문:\n{user_question}")
+    if not history:
+        return parts
+    return list(history) + [{"role": "user", "parts": parts}]
+
+
+def record_usage(response) -> int | None:
+    """응답의 usage_metadata 에서 입력 토큰 수를 읽어 기록 (별도 API 호출 없음)"""
+    usage = getattr(response, "usage_metadata", None)
+    tokens = getattr(usage, "prompt_token_count", None) if usage else None
+    if tokens:
+        metrics.observe(PROMPT_TOKENS, tokens)
+    return tokens
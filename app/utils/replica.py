@@ -0,0 +1,315 @@
+"""
+키오스크 레플리카 모드 (REPLICA_CENTRAL_URL 이 설정된 경우)
+
+중앙 서버와의 연결이 느리거나 끊겨도 접수·수납이 멈추지 않도록
+키오스크가 오늘 예약과 진료비 목록의 로컬 사본을 가지고 화면을 처리한다.
+
+  • 로컬 파일 (REPLICA_DIR, 기본 data/replica/)
+      reservations.csv    오늘 예약 사본 — 접수·수납·증명서 화면이 이 파일을 사용
+      treatment_fees.csv  진료비 목록 사본
+      outbox.jsonl        아직 중앙 서버에 올리지 못한 상태 변경 (한 줄에 하나, fsync)
+      state.json          마지막 동기화 커서·날짜·진료비 ETag
+  • 동기화 (REPLICA_SYNC_SECONDS 마다, 로컬 상태 변경이 생기면 즉시)
+      1) push  : outbox 의 상태 변경을 POST /sync/status 로 업로드
+                 서버가 거절한 변경(상태 역행)은 서버 값으로 로컬 사본을 맞춤
+      2) pull  : GET /sync/reservations?cursor=… 로 바뀐 예약만 받아 로컬 사본에 반영
+                 (아직 올리지 못한 로컬 변경이 더 앞선 단계면 로컬 값 유지)
+      3) fees  : GET /sync/fees (If-None-Match) — 바뀐 경우에만 내려받음
+  • 중앙 서버에 닿지 못하면 로컬 사본으로 계속 동작하고, 변경은 outbox 에 쌓였다가 복구 후 업로드
+  • 날짜가 바뀌면 오늘 예약 전체를 다시 받음
+"""
+import json
+import os
+import socket
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import date, datetime
+
+from app.utils import background, metrics, reservation_store
+from app.utils.sync import STATUS_RANK
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+CENTRAL_URL = os.getenv("REPLICA_CENTRAL_URL", "")
+REPLICA_DIR = os.getenv("REPLICA_DIR", os.path.join(BASE_DIR, "data", "replica"))
+SYNC_SECONDS = float(os.getenv("REPLICA_SYNC_SECONDS", "5"))
+TIMEOUT = float(os.getenv("REPLICA_TIMEOUT", "2"))
+KIOSK_ID = os.getenv("KIOSK_ID", socket.gethostname())
+
+SYNC_TOTAL = "kiosk_replica_sync_total"
+metrics.register(SYNC_TOTAL, "counter", "Replica sync rounds with the central server by result.")
+
+
+def _keep_higher_status(current: dict, row: dict) -> dict:
+    local = (current.get("payment_status") or "Pending").strip()
+    if STATUS_RANK.get(local, 0) > STATUS_RANK.get(row.get("payment_status"), 0):
+        return {**row, "payment_status": local}
+    return row
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(prefix=".replica-", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Outbox:
+    """업로드 대기 중인 상태 변경 (JSON Lines, 추가할 때마다 fsync)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def add(self, change: dict) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(change, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pending(self) -> list[dict]:
+        with self._lock:
+            return self._read()
+
+    def _read(self) -> list[dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def remove(self, ids: set) -> None:
+        """업로드가 끝난 변경 삭제 (그 사이에 추가된 변경은 유지)"""
+        if not ids:
+            return
+        with self._lock:
+            remaining = [c for c in self._read() if c.get("id") not in ids]
+            data = "".join(json.dumps(c, ensure_ascii=False) + "\n" for c in remaining)
+            _atomic_write(self.path, data.encode("utf-8"))
+
+    def pending_status(self) -> dict[str, str]:
+        """주민번호 → 업로드 대기 중인 가장 앞선 상태"""
+        statuses: dict[str, str] = {}
+        for change in self.pending():
+            rrn, status = change.get("rrn"), change.get("status")
+            if STATUS_RANK.get(status, -1) > STATUS_RANK.get(statuses.get(rrn), -1):
+                statuses[rrn] = status
+        return statuses
+
+
+class Replica:
+    def __init__(self, central_url: str, directory: str = REPLICA_DIR, timeout: float = TIMEOUT,
+                 kiosk_id: str = KIOSK_ID):
+        self.central_url = central_url.rstrip("/")
+        self.directory = directory
+        self.timeout = timeout
+        self.kiosk_id = kiosk_id
+        os.makedirs(directory, exist_ok=True)
+        self.reservations_path = os.path.join(directory, "reservations.csv")
+        self.fees_path = os.path.join(directory, "treatment_fees.csv")
+        self.state_path = os.path.join(directory, "state.json")
+        self.outbox = Outbox(os.path.join(directory, "outbox.jsonl"))
+        self.store = reservation_store.get_store(self.reservations_path)
+        self.state = self._load_state()
+        self.last_error: str | None = None
+        self._sync_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    # ── 상태 파일 ─────────────────────────────────────────────
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self) -> None:
+        _atomic_write(self.state_path, json.dumps(self.state, ensure_ascii=False).encode("utf-8"))
+
+    # ── HTTP ──────────────────────────────────────────────────
+    def _request(self, path: str, payload: dict | None = None, headers: dict | None = None):
+        """(상태코드, 응답 헤더, 본문). 304 는 예외 없이 반환, 그 밖의 실패는 OSError"""
+        headers = dict(headers or {})
+        token = os.getenv("SYNC_TOKEN")
+        if token:
+            headers["X-Sync-Token"] = token
+        data = None
+        if payload is not None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.central_url + path, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.headers, resp.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, e.headers, b""
+            raise
+
+    # ── 로컬 변경 기록 ────────────────────────────────────────
+    def record_local_change(self, path, row, old, new) -> None:
+        """reservation_store.on_status_change 콜백 — 로컬 사본의 상태 변경을 outbox 에 추가"""
+        if os.path.abspath(path) != self.store.path:
+            return
+        self.outbox.add({
+            "id": uuid.uuid4().hex,
+            "rrn": row["rrn"].strip(),
+            "time": row.get("time", "").strip(),
+            "status": new,
+            "base": old,
+            "at": datetime.now().isoformat(timespec="seconds"),
+        })
+        self._wake.set()
+
+    def _set_local_status(self, rrn: str, status: str) -> None:
+        """서버 값으로 로컬 사본을 맞춤 (outbox 에 다시 쌓이지 않도록 상태 변경 콜백 없이)"""
+        upserts = {}
+        for row in self.store.rows_for(rrn):
+            if row.get("payment_status") != status:
+                upserts[(rrn, row.get("time", "").strip())] = {**row, "payment_status": status}
+        self.store.apply_delta(upserts)
+
+    # ── 동기화 단계 ───────────────────────────────────────────
+    def push(self) -> int:
+        changes = self.outbox.pending()
+        if not changes:
+            return 0
+        _, _, body = self._request("/sync/status", {"kiosk": self.kiosk_id, "changes": changes})
+        result = json.loads(body)
+        for conflict in result.get("conflicts", []):
+            self._set_local_status(conflict["rrn"], conflict["status"])
+        done = set(result.get("applied", [])) | set(result.get("unknown", []))
+        done |= {conflict["id"] for conflict in result.get("conflicts", [])}
+        self.outbox.remove(done)
+        return len(done)
+
+    def pull(self) -> int:
+        today = date.today().isoformat()
+        cursor = self.state.get("cursor") if self.state.get("day") == today else None
+        query = urllib.parse.urlencode({"cursor": cursor or "", "day": today})
+        _, _, body = self._request(f"/sync/reservations?{query}")
+        data = json.loads(body)
+
+        pending = self.outbox.pending_status()
+
+        def merged(row: dict) -> dict:
+            local = pending.get(row["rrn"].strip())
+            if local and STATUS_RANK[local] > STATUS_RANK.get(row.get("payment_status"), 0):
+                return {**row, "payment_status": local}
+            return row
+
+        if data["full"]:
+            self.store.replace_all(merged(row) for row in data["rows"])
+            count = len(data["rows"])
+        else:
+            upserts, deletes = {}, []
+            for rrn, rows in data["rows"].items():
+                local = {row.get("time", "").strip(): row for row in self.store.rows_for(rrn)}
+                remote_times = set()
+                for row in rows:
+                    row = merged(row)
+                    key_time = row.get("time", "").strip()
+                    remote_times.add(key_time)
+                    current = local.get(key_time)
+                    if current is None or any(current.get(f, "").strip() != str(row.get(f, "")).strip()
+                                              for f in reservation_store.FIELDNAMES):
+                        upserts[(rrn, key_time)] = row
+                deletes += [(rrn, t) for t in local if t not in remote_times]
+            # 비교한 뒤 반영하기 전까지 이 키오스크에서 진행된 상태는 되돌리지 않음
+            self.store.apply_delta(upserts, deletes, merge=_keep_higher_status)
+            count = len(upserts) + len(deletes)
+
+        self.state.update(cursor=data["cursor"], day=data["day"])
+        self._save_state()
+        return count
+
+    def pull_fees(self) -> bool:
+        headers = {}
+        if self.state.get("fees_etag") and os.path.exists(self.fees_path):
+            headers["If-None-Match"] = self.state["fees_etag"]
+        status, resp_headers, body = self._request("/sync/fees", headers=headers)
+        if status == 304:
+            return False
+        _atomic_write(self.fees_path, body)
+        self.state["fees_etag"] = resp_headers.get("ETag")
+        self._save_state()
+        return True
+
+    def sync_once(self) -> bool:
+        """push → pull → fees 한 번. 중앙 서버에 닿지 못하면 False (로컬 사본은 그대로)"""
+        with self._sync_lock:
+            try:
+                self.push()
+                self.pull()
+                self.pull_fees()
+            except (OSError, ValueError, KeyError) as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                metrics.inc(SYNC_TOTAL, result="error")
+                return False
+            self.last_error = None
+            self.state["last_sync"] = datetime.now().isoformat(timespec="seconds")
+            self._save_state()
+            metrics.inc(SYNC_TOTAL, result="ok")
+            return True
+
+    def run_forever(self, interval: float) -> None:
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.sync_once()
+
+    def status(self) -> dict:
+        return {
+            "central_url": self.central_url,
+            "kiosk_id": self.kiosk_id,
+            "day": self.state.get("day"),
+            "last_sync": self.state.get("last_sync"),
+            "last_error": self.last_error,
+            "reservations": len(self.store),
+            "outbox": len(self.outbox.pending()),
+        }
+
+
+def _use_local_files(reservations_path: str, fees_path: str) -> None:
+    """화면 라우트들이 로컬 사본을 읽고 쓰도록 경로 교체"""
+    from app.routes import certificate, chatbot, payment, reception
+    reception.RESV_CSV = reservations_path
+    chatbot.RESERVATIONS_CSV_PATH = reservations_path
+    chatbot.TREATMENT_FEES_CSV_PATH = fees_path
+    payment.RESERVATIONS_CSV = reservations_path
+    payment.TREATMENT_FEES_CSV = fees_path
+    certificate.RESERVATIONS_CSV = reservations_path
+    certificate.TREATMENT_FEES_CSV = fees_path
+
+
+_replica: Replica | None = None
+_start_lock = threading.Lock()
+
+
+def init_app(app, central_url: str = CENTRAL_URL, interval: float = SYNC_SECONDS) -> Replica | None:
+    """
+    레플리카 모드 시작 (프로세스당 한 번). central_url 이 비어 있으면 아무것도 하지 않고 None.
+    첫 동기화에 실패해도 이전에 받아 둔 로컬 사본으로 시작한다.
+    """
+    global _replica
+    if not central_url:
+        return None
+    with _start_lock:
+        if _replica is None:
+            _replica = Replica(central_url)
+            reservation_store.on_status_change(_replica.record_local_change)
+            _replica.sync_once()
+            if interval > 0:
+                background.start(_replica.run_forever, (interval,), name="replica-sync")
+    _use_local_files(_replica.reservations_path, _replica.fees_path)
+    app.extensions["replica"] = _replica
+    return _replica
@@ -0,0 +1,275 @@
+"""
+예약 날짜별 분할 보관 (data/reservations.csv → data/archive/reservations-YYYY-MM-DD.csv.gz)
+
+  • 예약 파일(reservations.csv)은 오늘(+ 이후 날짜) 예약만 담는 "현재 파티션" —
+    키오스크의 모든 경로(접수·수납·증명서·챗봇·동기화)는 지금처럼 이 파일만 본다.
+    인덱스 생성·전체 재작성·집계 계산 비용이 누적 기간이 아니라 오늘 예약 수에 비례한다.
+  • roll() : time 열의 날짜가 기준일(오늘 - RESERVATION_HOT_DAYS) 이전인 행을
+    날짜별 gzip CSV 로 옮긴다.
+      1) 날짜별 보관 파일을 (기존 보관분과 합쳐) 임시 파일에 쓰고 원자적으로 교체
+      2) 예약 파일에서 옮긴 행 삭제 (reservation_store.apply_delta)
+    중간에 멈추면 다음 roll() 이 같은 행을 다시 합치므로(키 (rrn, time) 기준 중복 제거) 안전하다.
+    여러 worker 가 동시에 돌리지 않도록 보관 디렉터리의 잠금 파일로 직렬화하고,
+    읽은 행을 보관하고 지우는 동안에는 예약 저장소 잠금(store.locked())을 잡아
+    그 사이 다른 worker 의 상태 변경이 보관본에서 빠지지 않게 한다.
+  • 보관된 날짜도 조회 가능 — day_rows(날짜), history(주민번호), 정산(app.utils.settlement)
+    보관 파일은 읽을 때 주민번호 인덱스와 함께 메모리에 캐시 (최근 ARCHIVE_CACHE_SIZE 개)
+  • RESERVATION_ARCHIVE=1 이면 중앙 서버가 시작할 때와 RESERVATION_ARCHIVE_CHECK_SECONDS 마다
+    기준일이 바뀌었는지 보고 roll() 한다. cron 등으로 돌릴 때는
+      python -m app.utils.reservation_archive roll
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from app.utils import background, reservation_store
+from app.utils.reservation_store import FIELDNAMES
+
+try:
+    import fcntl
+except ImportError:   # Windows — 프로세스 간 잠금 없이 동작
+    fcntl = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+RESERVATIONS_CSV = os.path.join(BASE_DIR, "data", "reservations.csv")
+ARCHIVE_DIR = os.getenv("RESERVATION_ARCHIVE_DIR", os.path.join(BASE_DIR, "data", "archive"))
+ENABLED = os.getenv("RESERVATION_ARCHIVE", "0") == "1"
+HOT_DAYS = int(os.getenv("RESERVATION_HOT_DAYS", "0"))
+CHECK_SECONDS = float(os.getenv("RESERVATION_ARCHIVE_CHECK_SECONDS", "600"))
+ARCHIVE_CACHE_SIZE = 8
+
+PREFIX, SUFFIX = "reservations-", ".csv.gz"
+
+
+def archive_path(day: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"{PREFIX}{day}{SUFFIX}")
+
+
+def archived_days(archive_dir: str = ARCHIVE_DIR) -> list[str]:
+    """보관된 날짜 목록 (오름차순)"""
+    try:
+        names = os.listdir(archive_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(n[len(PREFIX):-len(SUFFIX)] for n in names if n.startswith(PREFIX) and n.endswith(SUFFIX))
+
+
+def cutoff_day(today: date | None = None, hot_days: int = HOT_DAYS) -> str:
+    """이 날짜보다 앞선 예약은 보관 대상"""
+    return ((today or date.today()) - timedelta(days=hot_days)).isoformat()
+
+
+def _row_key(row: dict) -> tuple[str, str]:
+    return row["rrn"].strip(), row.get("time", "").strip()
+
+
+# ── 보관 파일 읽기 ─────────────────────────────────────────────
+class _Partition:
+    """보관 파일 한 개의 행과 주민번호 인덱스"""
+    __slots__ = ("rows", "index")
+
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self.index: dict[str, list[dict]] = {}
+        for row in rows:
+            self.index.setdefault(row["rrn"].strip(), []).append(row)
+
+
+_cache: OrderedDict[tuple, _Partition] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def read_archive(path: str) -> list[dict]:
+    """gzip CSV 보관 파일의 행 목록 (없으면 빈 목록)"""
+    try:
+        with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+            return [dict(row) for row in csv.DictReader(f)]
+    except FileNotFoundError:
+        return []
+
+
+def _partition(day: str, archive_dir: str) -> _Partition | None:
+    path = archive_path(day, archive_dir)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (path, st.st_ino, st.st_mtime_ns)
+    with _cache_lock:
+        part = _cache.get(key)
+        if part is not None:
+            _cache.move_to_end(key)
+            return part
+    part = _Partition(read_archive(path))
+    with _cache_lock:
+        _cache[key] = part
+        while len(_cache) > ARCHIVE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return part
+
+
+def day_rows(day: str, store_path: str = RESERVATIONS_CSV, archive_dir: str = ARCHIVE_DIR) -> list[dict]:
+    """그 날짜의 예약 — 보관분 + 예약 파일에 남아 있는 행"""
+    part = _partition(day, archive_dir)
+    rows = list(part.rows) if part else []
+    store = reservation_store.get_store(store_path)
+    if store.exists():
+        rows.extend(row for row in store.iter_rows() if row.get("time", "").startswith(day))
+    return rows
+
+
+def history(rrn: str, store_path: str = RESERVATIONS_CSV, archive_dir: str = ARCHIVE_DIR,
+            days: list[str] | None = None) -> list[dict]:
+    """
+    주민번호의 예약 — 예약 파일 + 보관된 날짜들(days 를 주면 그 날짜만), 예약 시각 순.
+    보관 파일마다 처음 한 번 읽어 인덱스를 만들므로, 오래된 기간을 자주 조회하면 days 로 좁힌다.
+    """
+    rows = list(reservation_store.get_store(store_path).rows_for(rrn))
+    for day in days if days is not None else archived_days(archive_dir):
+        part = _partition(day, archive_dir)
+        if part:
+            rows.extend(part.index.get(rrn, []))
+    return sorted(rows, key=lambda row: row.get("time", ""))
+
+
+# ── 보관 ──────────────────────────────────────────────────────
+@contextmanager
+def _exclusive(archive_dir: str):
+    os.makedirs(archive_dir, exist_ok=True)
+    with open(os.path.join(archive_dir, ".lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _write_archive(path: str, rows: list[dict]) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".reservations-", suffix=SUFFIX, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+                with io.TextIOWrapper(gz, encoding="utf-8", newline="") as f:
+                    writer = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
+                    writer.writeheader()
+                    for row in rows:
+                        writer.writerow({**row, "payment_status": (row.get("payment_status") or "Pending").strip()})
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def roll(store_path: str = RESERVATIONS_CSV, archive_dir: str = ARCHIVE_DIR,
+         today: date | None = None, hot_days: int = HOT_DAYS) -> dict[str, int]:
+    """
+    기준일 이전 예약을 날짜별 보관 파일로 옮기고 {날짜: 옮긴 행 수} 반환.
+    time 열이 비었거나 날짜 형식이 아닌 행은 예약 파일에 남긴다.
+    """
+    cutoff = cutoff_day(today, hot_days)
+    store = reservation_store.get_store(store_path)
+    if not store.exists():
+        return {}
+    with _exclusive(archive_dir), store.locked():
+        by_day: dict[str, list[dict]] = {}
+        for row in store.iter_rows():
+            day = row.get("time", "").strip()[:10]
+            if len(day) == 10 and day[4] == "-" and day < cutoff:
+                by_day.setdefault(day, []).append(row)
+        if not by_day:
+            return {}
+
+        for day, rows in sorted(by_day.items()):
+            path = archive_path(day, archive_dir)
+            merged = {_row_key(row): row for row in read_archive(path)}
+            merged.update((_row_key(row), row) for row in rows)
+            _write_archive(path, sorted(merged.values(), key=lambda r: (r.get("time", ""), r["rrn"])))
+
+        store.apply_delta({}, [_row_key(row) for rows in by_day.values() for row in rows])
+    return {day: len(rows) for day, rows in sorted(by_day.items())}
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _roll_loop(store_path: str, interval: float) -> None:
+    last_cutoff = None
+    while True:
+        cutoff = cutoff_day()
+        if cutoff != last_cutoff:
+            try:
+                moved = roll(store_path)
+                if moved:
+                    print(f"reservation archive: moved {sum(moved.values())} rows ({', '.join(moved)})")
+                last_cutoff = cutoff
+            except Exception as e:
+                print(f"reservation archive failed: {e}")
+        time.sleep(interval)
+
+
+def init_app(app, enabled: bool = ENABLED, store_path: str | None = None,
+             interval: float = CHECK_SECONDS) -> None:
+    """
+    중앙 서버 모드에서 날짜별 보관 스레드 시작 (프로세스당 한 번).
+    store_path 를 주지 않으면 접수 화면이 쓰는 예약 파일을 따른다.
+    """
+    global _started
+    if not enabled:
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    if store_path is None:
+        from app.routes import reception
+        store_path = reception.RESV_CSV
+    background.start(_roll_loop, (store_path, interval), name="reservation-archive")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Date-partitioned reservation archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_roll = sub.add_parser("roll", help="move past days out of the reservation file")
+    p_roll.add_argument("--hot-days", type=int, default=HOT_DAYS,
+                        help="past days to keep in the reservation file besides today")
+    p_day = sub.add_parser("day", help="print one day's reservations as JSON")
+    p_day.add_argument("date", help="YYYY-MM-DD")
+    p_history = sub.add_parser("history", help="print one RRN's reservations as JSON")
+    p_history.add_argument("rrn")
+    sub.add_parser("list", help="list archived days")
+    for p in (p_roll, p_day, p_history):
+        p.add_argument("--store", default=RESERVATIONS_CSV)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "roll":
+        result = roll(args.store, args.archive_dir, hot_days=args.hot_days)
+    elif args.command == "day":
+        result = day_rows(args.date, args.store, args.archive_dir)
+    elif args.command == "history":
+        result = history(args.rrn, args.store, args.archive_dir)
+    else:
+        result = archived_days(args.archive_dir)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
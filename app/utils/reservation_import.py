@@ -0,0 +1,193 @@
+"""
+일일 예약 피드 가져오기
+
+  python -m app.utils.reservation_import feed.csv
+  python -m app.utils.reservation_import feed.csv --replace --reject rejects.csv
+  python -m app.utils.reservation_import feed.csv --dry-run
+
+피드 파일을 한 행씩 읽으며 검증하고(주민번호 형식, 진료과, 예약 시간),
+잘못된 행은 사유와 함께 reject 파일로 보낸다.
+진료과는 증상 매핑·진료비 목록·IMPORT_DEPARTMENTS 에 있는 것만 받는다.
+현재 저장소와 비교해 새로 생겼거나 바뀐 행만 reservation_store.apply_delta() 로
+반영한다. 기존 행은 저장소의 오프셋 인덱스로 한 행씩 조회하므로
+현재 예약 전체를 메모리에 올리지 않는다.
+
+  • 이미 키오스크에서 Registered / Paid 로 바뀐 상태는 피드의 Pending 으로 되돌리지 않음
+    (비교한 뒤 반영하기 전까지 다른 worker 가 바꾼 상태도 — 반영할 때 저장소 잠금 안에서 다시 확인)
+  • --replace : 피드에 없는 기존 예약을 삭제 (피드가 전체 목록일 때)
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from datetime import date, datetime
+
+from app.routes.reception import RESV_CSV, SYM_TO_DEPT
+from app.utils import reservation_store
+from app.utils.reservation_store import FIELDNAMES, STATUSES
+
+TREATMENT_FEES_CSV = os.path.join(os.path.dirname(RESV_CSV), "treatment_fees.csv")
+# 진료비 목록·증상 매핑에 없는 진료과 (쉼표로 구분) — 새 진료과는 여기에 추가해야 피드로 들어온다
+IMPORT_DEPARTMENTS = os.getenv("IMPORT_DEPARTMENTS", "비뇨의학과,산부인과,소아과,정형외과,치과")
+
+RRN_RE = re.compile(r"^(\d{2})(\d{2})(\d{2})-([1-4])\d{6}$")
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+REQUIRED = ("name", "rrn", "time", "department")
+
+
+class ImportResult:
+    def __init__(self):
+        self.read = 0
+        self.rejected = 0
+        self.unchanged = 0
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def known_departments() -> set[str]:
+    """
+    증상 매핑 · 진료비 목록 · IMPORT_DEPARTMENTS 의 진료과.
+    지금 저장소의 내용과는 무관 — 빈 저장소로 가져와도, --replace 로 바꿔도 같은 목록
+    """
+    departments = set(SYM_TO_DEPT.values()) | {d.strip() for d in IMPORT_DEPARTMENTS.split(",")}
+    if os.path.exists(TREATMENT_FEES_CSV):
+        with open(TREATMENT_FEES_CSV, newline="", encoding="utf-8-sig") as f:
+            departments |= {row["Department"].strip() for row in csv.DictReader(f)}
+    departments.discard("")
+    return departments
+
+
+def validate_row(row: dict, departments: set[str]) -> str | None:
+    """문제가 있으면 사유 문자열, 정상이면 None"""
+    for field in REQUIRED:
+        if not (row.get(field) or "").strip():
+            return f"missing_{field}"
+    if row["name"].strip() == "name" and row["rrn"].strip() == "rrn":
+        return "header_row"
+
+    match = RRN_RE.match(row["rrn"].strip())
+    if not match:
+        return "bad_rrn_format"
+    yy, mm, dd, gender = match.groups()
+    century = 1900 if gender in "12" else 2000
+    try:
+        date(century + int(yy), int(mm), int(dd))
+    except ValueError:
+        return "bad_rrn_birthdate"
+
+    if row["department"].strip() not in departments:
+        return "unknown_department"
+    try:
+        datetime.strptime(row["time"].strip(), TIME_FORMAT)
+    except ValueError:
+        return "bad_time"
+    status = (row.get("payment_status") or "Pending").strip()
+    if status not in STATUSES:
+        return "bad_status"
+    return None
+
+
+def _normalize(row: dict) -> dict:
+    clean = {field: (row.get(field) or "").strip() for field in FIELDNAMES}
+    clean["payment_status"] = clean["payment_status"] or "Pending"
+    return clean
+
+
+def _keep_kiosk_status(current: dict, new_row: dict) -> dict:
+    """apply_delta merge — 저장소 잠금 안에서 본 현재 상태가 Pending 이 아니면 유지"""
+    status = (current.get("payment_status") or "Pending").strip()
+    if status != "Pending":
+        return {**new_row, "payment_status": status}
+    return new_row
+
+
+def import_feed(feed_path: str, store_path: str = RESV_CSV, reject_path: str | None = None,
+                replace: bool = False, dry_run: bool = False) -> ImportResult:
+    """
+    피드를 스트리밍으로 읽어 검증 → delta 계산 → 변경분만 반영.
+    메모리에는 바뀐 행과 (replace 일 때) 피드에 나온 키만 보관한다.
+    """
+    started = time.perf_counter()
+    result = ImportResult()
+    store = reservation_store.get_store(store_path)
+    departments = known_departments()
+
+    upserts: dict[tuple, dict] = {}
+    seen: set[tuple] = set()
+    reject_file = reject_writer = None
+    try:
+        if reject_path:
+            reject_file = open(reject_path, "w", newline="", encoding="utf-8")
+            reject_writer = csv.writer(reject_file)
+            reject_writer.writerow(["line", "reason", *FIELDNAMES])
+
+        with open(feed_path, newline="", encoding="utf-8-sig") as f:
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                result.read += 1
+                reason = validate_row(row, departments)
+                key = ((row.get("rrn") or "").strip(), (row.get("time") or "").strip())
+                if reason is None and key in seen:
+                    reason = "duplicate_in_feed"
+                if reason:
+                    result.rejected += 1
+                    if reject_writer:
+                        reject_writer.writerow([line_no, reason, *(row.get(k, "") for k in FIELDNAMES)])
+                    continue
+
+                seen.add(key)
+                new_row = _normalize(row)
+                old_row = store.find(*key)
+                if old_row is not None:
+                    # 키오스크에서 진행된 상태는 유지
+                    old_status = old_row.get("payment_status") or "Pending"
+                    if old_status != "Pending":
+                        new_row["payment_status"] = old_status
+                    if _normalize(old_row) == new_row:
+                        result.unchanged += 1
+                        continue
+                    result.updated += 1
+                else:
+                    result.inserted += 1
+                upserts[key] = new_row
+    finally:
+        if reject_file:
+            reject_file.close()
+
+    deletes = []
+    if replace:
+        for row in store.iter_rows():
+            key = (row["rrn"].strip(), row.get("time", "").strip())
+            if key not in seen:
+                deletes.append(key)
+    result.deleted = len(deletes)
+    if not dry_run and (upserts or deletes):
+        store.apply_delta(upserts, deletes, merge=_keep_kiosk_status)
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import a daily reservation feed")
+    parser.add_argument("feed", help="CSV with reservations.csv columns")
+    parser.add_argument("--store", default=RESV_CSV, help="reservation file to update")
+    parser.add_argument("--reject", help="write rejected rows (with reason) to this CSV")
+    parser.add_argument("--replace", action="store_true",
+                        help="delete reservations that are not in the feed")
+    parser.add_argument("--dry-run", action="store_true", help="validate and diff only")
+    args = parser.parse_args(argv)
+
+    result = import_feed(args.feed, args.store, args.reject, args.replace, args.dry_run)
+    print(json.dumps(result.as_dict(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
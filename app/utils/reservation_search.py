@@ -0,0 +1,290 @@
+"""
+예약 검색 인덱스 (창구 직원용 검색 API — GET /admin/reservations/search)
+
+예약 저장소(reservation_store)는 주민번호로만 찾을 수 있으므로, 검색용 보조 인덱스를 메모리에 둔다.
+인덱스에는 행의 키 (time, rrn) 만 들어 있고, 결과 페이지의 행은 저장소에서 mmap 으로 읽는다.
+
+  • 이름 접두어        : (이름, time, rrn) 정렬 배열 → bisect 로 접두어 구간
+  • 생년월일 접두어    : (rrn[:6], time, rrn) 정렬 배열 → bisect 로 접두어 구간
+  • 진료과 / 의사 / 상태 : 값 → 키 집합
+  • 예약 시각 범위     : 키 (time, rrn) 정렬 배열 → bisect 로 [from, to) 구간
+
+  • 처음 검색할 때(또는 warm-up) 예약 파일을 한 번 훑어 만들고,
+    이후에는 reservation_store.subscribe() 통지로 바뀐 주민번호의 행만 다시 색인
+    (상태 변경·레플리카 delta 반영 포함). 전체 재적재 통지(None)나 대량 변경이면 다음 검색 때 다시 만든다.
+  • 여러 조건은 교집합. 결과는 예약 시각 → 주민번호 순으로 정렬해 offset / limit 로 자른다.
+
+다른 worker 프로세스가 바꾼 예약(제자리 상태 변경 포함)은 그 프로세스의 통지가 오지 않으므로,
+검색할 때 예약 파일의 (inode, 크기, mtime) 이 마지막으로 맞춘 값과 다르면 따라잡는다.
+  • 중앙 서버(sync.init_app 이 follow() 로 변경 기록을 넘겨줌) : 변경 기록의 커서 이후 바뀐 주민번호만 다시 색인
+  • 변경 기록이 없으면(레플리카 키오스크) 다시 만든다 — 보관 덕분에 오늘 예약만 담은 작은 파일
+"""
+import os
+import threading
+import time as _time
+from bisect import bisect_left, insort
+
+from app.utils import reservation_store
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+BIRTH_DIGITS = 6
+REBUILD_THRESHOLD = 1000   # 한 번에 이보다 많은 주민번호가 바뀌면 전체 재구성
+RACY_NS = 2_000_000_000    # 이보다 최근에 바뀐 파일은 같은 mtime 으로 또 바뀔 수 있으므로 다음 검색 때 다시 확인
+
+_HIGH = "\U0010ffff"   # 접두어 구간의 끝 (어떤 문자보다 큼)
+
+
+_change_log = None
+
+
+def follow(change_log) -> None:
+    """다른 worker 의 변경을 따라잡을 때 쓸 변경 기록 (app.utils.sync.ChangeLog)"""
+    global _change_log
+    _change_log = change_log
+
+
+def _file_stamp(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _settled(stamp: tuple | None) -> tuple | None:
+    """막 바뀐 파일의 stamp 는 기억하지 않음 (같은 mtime 으로 한 번 더 바뀌었을 수 있음)"""
+    if stamp is None or _time.time_ns() - stamp[2] < RACY_NS:
+        return None
+    return stamp
+
+
+def _row_key(row: dict) -> tuple[str, str]:
+    """검색 인덱스의 키 — 정렬하면 그대로 결과 순서(예약 시각 → 주민번호)"""
+    return row.get("time", "").strip(), row["rrn"].strip()
+
+
+def _add(table: dict, value: str, key: tuple) -> None:
+    table.setdefault(value, set()).add(key)
+
+
+def _discard(table: dict, value: str, key: tuple) -> None:
+    keys = table.get(value)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del table[value]
+
+
+def _remove_sorted(items: list, item: tuple) -> None:
+    i = bisect_left(items, item)
+    if i < len(items) and items[i] == item:
+        del items[i]
+
+
+def _prefix_keys(items: list, prefix: str) -> set[tuple]:
+    """(값, time, rrn) 정렬 배열에서 값이 prefix 로 시작하는 키 집합"""
+    lo = bisect_left(items, (prefix,))
+    hi = bisect_left(items, (prefix + _HIGH,))
+    return {(time, rrn) for _, time, rrn in items[lo:hi]}
+
+
+class SearchIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._built = False
+        self._entries: dict[str, dict] = {}   # rrn → {time: (이름, 진료과, 의사, 상태)}
+        self._names: list[tuple] = []
+        self._births: list[tuple] = []
+        self._by_time: list[tuple] = []
+        self._departments: dict[str, set] = {}
+        self._doctors: dict[str, set] = {}
+        self._statuses: dict[str, set] = {}
+        self._stamp = None    # 마지막으로 맞춘 예약 파일 (inode, 크기, mtime)
+        self._cursor = None   # 변경 기록 커서
+
+    # ── 색인 ──────────────────────────────────────────────────
+    def _index_row(self, row: dict) -> None:
+        time, rrn = key = _row_key(row)
+        name = row.get("name", "").strip()
+        department = row.get("department", "").strip()
+        doctor = row.get("doctor", "").strip()
+        status = row.get("payment_status", "Pending")
+        entries = self._entries.setdefault(rrn, {})
+        if time in entries:
+            return   # 같은 (rrn, time) 이 여러 줄이면 첫 행만 (저장소의 find() 와 같음)
+        entries[time] = (name, department, doctor, status)
+        insort(self._names, (name, time, rrn))
+        insort(self._births, (rrn[:BIRTH_DIGITS], time, rrn))
+        insort(self._by_time, key)
+        _add(self._departments, department, key)
+        _add(self._doctors, doctor, key)
+        _add(self._statuses, status, key)
+
+    def _unindex(self, rrn: str) -> None:
+        for time, (name, department, doctor, status) in self._entries.pop(rrn, {}).items():
+            key = (time, rrn)
+            _remove_sorted(self._names, (name, time, rrn))
+            _remove_sorted(self._births, (rrn[:BIRTH_DIGITS], time, rrn))
+            _remove_sorted(self._by_time, key)
+            _discard(self._departments, department, key)
+            _discard(self._doctors, doctor, key)
+            _discard(self._statuses, status, key)
+
+    def rebuild(self) -> None:
+        """예약 파일 전체를 한 번 훑어 인덱스를 새로 만든다"""
+        # 훑기 전에 기준을 잡아 둠 — 훑는 동안 바뀐 것은 다음 검색 때 따라잡음
+        stamp = _file_stamp(self.path)
+        cursor = _change_log.read_since(None)[0] if _change_log is not None else None
+        store = reservation_store.get_store(self.path)
+        entries, names, births, by_time = {}, [], [], []
+        departments, doctors, statuses = {}, {}, {}
+        for row in store.iter_rows():
+            time, rrn = key = _row_key(row)
+            per_rrn = entries.setdefault(rrn, {})
+            if time in per_rrn:
+                continue
+            name = row.get("name", "").strip()
+            department = row.get("department", "").strip()
+            doctor = row.get("doctor", "").strip()
+            status = row["payment_status"]
+            per_rrn[time] = (name, department, doctor, status)
+            names.append((name, time, rrn))
+            births.append((rrn[:BIRTH_DIGITS], time, rrn))
+            by_time.append(key)
+            _add(departments, department, key)
+            _add(doctors, doctor, key)
+            _add(statuses, status, key)
+        names.sort()
+        births.sort()
+        by_time.sort()
+        with self._lock:
+            self._entries, self._names, self._births, self._by_time = entries, names, births, by_time
+            self._departments, self._doctors, self._statuses = departments, doctors, statuses
+            self._built = True
+            self._stamp, self._cursor = _settled(stamp), cursor
+
+    def _ensure(self) -> None:
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.rebuild()
+
+    def _catch_up(self) -> None:
+        """다른 worker 프로세스가 바꾼 예약 반영 (예약 파일이 바뀐 경우에만)"""
+        stamp = _file_stamp(self.path)
+        if stamp is not None and stamp == self._stamp:
+            return
+        with self._lock:
+            if _change_log is None or self._cursor is None:
+                self._built = False
+                return
+            self._cursor, rrns = _change_log.read_since(self._cursor)
+            self.refresh(rrns)
+            if self._built:
+                self._stamp = _settled(stamp)
+
+    def refresh(self, rrns) -> None:
+        """
+        바뀐 주민번호들의 행만 다시 색인 (None 이면 다음 검색 때 전체 재구성).
+        한꺼번에 많이 바뀌면(날짜별 보관 등) 하나씩 고치는 것보다 다시 만드는 편이 빠르다.
+        """
+        with self._lock:
+            if rrns is None or len(rrns) > REBUILD_THRESHOLD:
+                self._built = False
+                return
+            if not self._built:
+                return
+            store = reservation_store.get_store(self.path)
+            for rrn in rrns:
+                self._unindex(rrn)
+                for row in store.rows_for(rrn):
+                    self._index_row(row)
+
+    def __len__(self) -> int:
+        self._ensure()
+        return len(self._by_time)
+
+    # ── 검색 ──────────────────────────────────────────────────
+    def search(self, name: str | None = None, birth: str | None = None,
+               department: str | None = None, doctor: str | None = None,
+               status: str | None = None, time_from: str | None = None, time_to: str | None = None,
+               offset: int = 0, limit: int = DEFAULT_LIMIT) -> dict:
+        """
+        조건에 맞는 예약을 예약 시각 순으로 offset 부터 limit 건.
+        time_from 이상, time_to 미만 (문자열 비교 — "2025-06-19" 처럼 앞부분만 줘도 됨).
+        반환: {"total", "offset", "limit", "items": [행...]}
+        """
+        if self._built:
+            self._catch_up()
+        self._ensure()
+        limit = max(1, min(limit, MAX_LIMIT))
+        offset = max(0, offset)
+        with self._lock:
+            sets = []
+            if name:
+                sets.append(_prefix_keys(self._names, name))
+            if birth:
+                sets.append(_prefix_keys(self._births, birth))
+            for table, value in ((self._departments, department), (self._doctors, doctor),
+                                 (self._statuses, status)):
+                if value:
+                    sets.append(table.get(value, set()))
+
+            by_time = self._by_time
+            lo = bisect_left(by_time, (time_from,)) if time_from else 0
+            hi = bisect_left(by_time, (time_to,)) if time_to else len(by_time)
+            hi = max(lo, hi)
+
+            if not sets:
+                total = hi - lo
+                page = by_time[lo + offset:min(hi, lo + offset + limit)]
+            else:
+                sets.sort(key=len)
+                keys = sets[0].intersection(*sets[1:])
+                if time_from or time_to:
+                    keys = {k for k in keys if (not time_from or k[0] >= time_from)
+                            and (not time_to or k[0] < time_to)}
+                total = len(keys)
+                if total > 8 * (offset + limit):
+                    # 결과가 많으면 전부 정렬하지 않고 시각 순 배열을 따라가며 페이지만 채움
+                    page, skip = [], offset
+                    for i in range(lo, hi):
+                        key = by_time[i]
+                        if key in keys:
+                            if skip:
+                                skip -= 1
+                                continue
+                            page.append(key)
+                            if len(page) == limit:
+                                break
+                else:
+                    page = sorted(keys)[offset:offset + limit]
+
+        store = reservation_store.get_store(self.path)
+        items = [row for row in (store.find(rrn, time) for time, rrn in page) if row is not None]
+        return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+
+_indexes: dict[str, SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(path: str) -> SearchIndex:
+    """경로별로 하나의 검색 인덱스를 공유"""
+    path = reservation_store.get_store(path).path
+    index = _indexes.get(path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(path, SearchIndex(path))
+    return index
+
+
+def _on_change(path, rrns) -> None:
+    index = _indexes.get(path)
+    if index is not None:
+        index.refresh(rrns)
+
+
+reservation_store.subscribe(_on_change)
@@ -0,0 +1,469 @@
+"""
+예약 저장소 (data/reservations.csv)
+
+CSV 형식은 그대로 유지하면서 다음과 같이 접근한다.
+
+  • 인덱스 : 주민번호 → 해당 예약 행의 파일 내 바이트 오프셋
+  • 조회   : 파일을 mmap 으로 열어 오프셋 위치의 한 줄만 파싱
+  • 상태 변경 : payment_status 를 마지막 열에 고정 폭(STATUS_WIDTH, 공백 채움)으로
+    기록해 두므로, 상태 변경은 그 몇 바이트만 제자리에서 덮어쓰고 fsync
+    → 조회·변경 모두 환자 1명당 O(1), 파일은 여전히 사람이 읽을 수 있는 CSV
+
+  • 고정 폭이 아닌 파일(수작업 편집, 외부 피드 등)은 첫 상태 변경 때 한 번 전체를 다시 써서 정규화
+  • 파일이 교체되면(inode·크기 변경) 다음 접근 때 인덱스를 다시 만듦
+    (제자리 덮어쓰기는 inode·크기를 바꾸지 않으므로 다른 프로세스의 인덱스도 그대로 유효)
+  • 반복된 헤더 행(name,rrn,...)은 데이터로 취급하지 않음
+  • 변경이 생기면 subscribe() 로 등록한 콜백에 (경로, 변경된 주민번호 집합) 통지
+    — 전체 재적재인 경우 집합 대신 None. 콜백은 언제나 저장소 잠금을 놓은 뒤 호출
+  • 상태 변경은 on_status_change() 콜백에 (경로, 행, 이전 상태, 새 상태) 로도 통지
+    — 콜백 안에서 status_version() 이 그 변경이 쓰인 파일 버전
+  • 전체 재작성은 on_rewrite() 콜백에 (경로, 새 파일 버전, 진료과별 상태 수) 로 통지 — 쓰면서 센 값이라
+    그 버전의 정확한 기준값이다 (version = (inode, 크기) : 제자리 상태 변경으로는 바뀌지 않음)
+  • generation 은 인덱스를 새로 만들 때마다(재적재·전체 재작성) 1 증가
+  • 파일을 바꾸는 모든 작업(제자리 상태 변경, 전체 재작성)은 locked() 로 직렬화한다.
+    같은 프로세스의 스레드뿐 아니라 다른 worker 프로세스까지 (예약 파일 옆 .<파일 이름>.lock 에 fcntl 잠금).
+    재작성이 이전 행을 복사하는 사이에 다른 프로세스가 쓴 상태가 교체로 사라지지 않도록 하기 위함
+
+행의 키는 (rrn, time) 이다. 같은 사람이 여러 날짜에 예약할 수 있다.
+필드 안에 줄바꿈이 들어간 행은 지원하지 않는다 (한 행 = 한 줄).
+"""
+import codecs
+import csv
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:   # Windows — 프로세스 간 잠금 없이 동작
+    fcntl = None
+
+FIELDNAMES = ["name", "rrn", "time", "department", "location", "doctor", "payment_status"]
+STATUSES = ("Pending", "Registered", "Paid")
+STATUS_WIDTH = max(len(s) for s in STATUSES)
+
+_listeners: list = []
+_status_listeners: list = []
+_rewrite_listeners: list = []
+_stores: dict[str, "ReservationStore"] = {}
+_stores_lock = threading.Lock()
+_notifying = threading.local()   # 상태 변경 콜백을 부르는 동안 그 변경이 쓰인 파일 버전
+
+
+def subscribe(callback) -> None:
+    """callback(path, rrns | None) — 예약이 바뀔 때마다 호출"""
+    _listeners.append(callback)
+
+
+def on_status_change(callback) -> None:
+    """callback(path, row, old_status, new_status) — 행의 상태가 실제로 바뀐 경우에만 호출"""
+    _status_listeners.append(callback)
+
+
+def on_rewrite(callback) -> None:
+    """callback(path, version, status_counts) — 이 프로세스가 파일 전체를 다시 쓸 때마다 호출"""
+    _rewrite_listeners.append(callback)
+
+
+def status_version():
+    """상태 변경 콜백 안에서: 그 변경이 쓰인 파일 버전 (inode, 크기) — 잠금을 놓은 뒤라 저장소를 다시 읽으면 이미 다를 수 있음"""
+    return getattr(_notifying, "version", None)
+
+
+def _count(counts: dict, row: dict) -> None:
+    department = (row.get("department") or "").strip() or "-"
+    status = (row.get("payment_status") or "Pending").strip() or "Pending"
+    by_status = counts.setdefault(department, {})
+    by_status[status] = by_status.get(status, 0) + 1
+
+
+def _notify(path: str, rrns) -> None:
+    for callback in list(_listeners):
+        try:
+            callback(path, rrns)
+        except Exception as e:
+            print(f"reservation_store listener failed: {e}")
+
+
+def _notify_status(path: str, row: dict, old: str, new: str) -> None:
+    for callback in list(_status_listeners):
+        try:
+            callback(path, row, old, new)
+        except Exception as e:
+            print(f"reservation_store listener failed: {e}")
+
+
+def _notify_rewrite(path: str, version, counts: dict) -> None:
+    for callback in list(_rewrite_listeners):
+        try:
+            callback(path, version, counts)
+        except Exception as e:
+            print(f"reservation_store listener failed: {e}")
+
+
+def _parse_line(line: bytes) -> list[str]:
+    text = line.decode("utf-8")
+    if '"' in text:
+        return next(csv.reader([text]))
+    return text.split(",")
+
+
+class _View:
+    """한 시점의 파일 매핑과 인덱스 (교체만 하고 수정하지 않음)"""
+    __slots__ = ("mm", "index", "signature", "fieldnames", "padded")
+
+    def __init__(self, mm=None, index=None, signature=None, fieldnames=None, padded=True):
+        self.mm = mm
+        self.index = index or {}
+        self.signature = signature
+        self.fieldnames = fieldnames or list(FIELDNAMES)
+        self.padded = padded
+
+    def offsets(self, rrn: str) -> list[int]:
+        found = self.index.get(rrn)
+        if found is None:
+            return []
+        return [found] if isinstance(found, int) else found
+
+    def line_end(self, offset: int) -> int:
+        end = self.mm.find(b"\n", offset)
+        if end == -1:
+            end = len(self.mm)
+        if end > offset and self.mm[end - 1:end] == b"\r":
+            end -= 1
+        return end
+
+    def read(self, offset: int) -> dict:
+        row = dict(zip(self.fieldnames, _parse_line(self.mm[offset:self.line_end(offset)])))
+        row["payment_status"] = (row.get("payment_status") or "Pending").strip() or "Pending"
+        return row
+
+
+class ReservationStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._view = _View()
+        self._loaded = False
+        self._generation = 0
+        directory, name = os.path.split(path)
+        self._lock_path = os.path.join(directory, f".{name}.lock")
+        self._lock_file = None
+        self._lock_depth = 0
+        self._reload_pending = False   # locked() 안에서 다시 적재함 — 잠금을 놓은 뒤 통지
+
+    # ── 인덱스 구성 ───────────────────────────────────────────
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size
+
+    def _build_view(self) -> _View:
+        signature = self._stat_signature()
+        if signature is None or signature[1] == 0:
+            return _View(signature=signature)
+
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        start = len(codecs.BOM_UTF8) if mm[:3] == codecs.BOM_UTF8 else 0
+        mm.seek(start)
+        fieldnames = _parse_line(mm.readline().rstrip(b"\r\n"))
+        rrn_i = fieldnames.index("rrn")
+        status_last = fieldnames[-1] == "payment_status"
+        padded = status_last
+
+        index = {}
+        readline, tell = mm.readline, mm.tell
+        while True:
+            offset = tell()
+            line = readline()
+            if not line:
+                break
+            line = line.rstrip(b"\r\n")
+            if not line:
+                continue
+            fields = line.split(b",") if b'"' not in line else [
+                f.encode("utf-8") for f in _parse_line(line)]
+            if len(fields) <= rrn_i:
+                continue
+            rrn = fields[rrn_i].decode("utf-8").strip()
+            if not rrn or (rrn == "rrn" and fields[0] == b"name"):
+                continue
+            if padded and len(fields[-1]) != STATUS_WIDTH:
+                padded = False
+
+            found = index.get(rrn)
+            if found is None:
+                index[rrn] = offset
+            elif isinstance(found, int):
+                index[rrn] = [found, offset]
+            else:
+                found.append(offset)
+
+        return _View(mm, index, signature, fieldnames, padded)
+
+    def _current(self) -> _View:
+        """파일이 바뀌었으면 인덱스를 다시 만들고 현재 view 반환"""
+        signature = self._stat_signature()
+        if not self._loaded or signature != self._view.signature:
+            reloaded = False
+            with self._lock:
+                if not self._loaded or self._stat_signature() != self._view.signature:
+                    self._view = self._build_view()
+                    self._loaded = True
+                    self._generation += 1
+                    # locked() 안이면(잠금을 잡은 스레드는 이 스레드뿐) 거기서 나갈 때 통지
+                    reloaded = self._lock_depth == 0
+                    self._reload_pending = not reloaded
+            # 콜백은 잠금을 놓은 뒤 — 자기 잠금을 잡은 채 저장소를 읽는 구독자(검색 인덱스)와 교착되지 않도록
+            if reloaded:
+                _notify(self.path, None)
+        return self._view
+
+    @contextmanager
+    def locked(self):
+        """
+        파일을 바꾸는 작업을 프로세스 간에 직렬화하고 현재 view 를 돌려줌.
+        같은 스레드에서 다시 들어와도 된다 (apply_delta 안의 재작성, roll 안의 apply_delta 등).
+        """
+        reloaded = False
+        try:
+            with self._lock:
+                if self._lock_depth == 0 and fcntl is not None:
+                    self._lock_file = open(self._lock_path, "a")
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield self._current()
+                finally:
+                    self._lock_depth -= 1
+                    if self._lock_depth == 0:
+                        if self._lock_file is not None:
+                            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                            self._lock_file.close()
+                            self._lock_file = None
+                        reloaded, self._reload_pending = self._reload_pending, False
+        finally:
+            if reloaded:
+                _notify(self.path, None)
+
+    def _open_current(self):
+        """
+        현재 view 와 같은 파일(inode·크기)을 r+b 로 열어 (view, 파일) 반환.
+        잠금을 쓰지 않는 쪽(수작업 편집 등)이 그 사이 파일을 바꿨으면 다시 적재해 맞춘다.
+        """
+        for _ in range(3):
+            view = self._current()
+            f = open(self.path, "r+b")
+            st = os.fstat(f.fileno())
+            if (st.st_ino, st.st_size) == view.signature:
+                return view, f
+            f.close()
+            self._loaded = False
+        raise RuntimeError(f"{self.path} changed while opening for write")
+
+    @property
+    def generation(self) -> int:
+        """인덱스 세대 번호 — 파일이 바뀌었으면 먼저 다시 적재"""
+        self._current()
+        return self._generation
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    # ── 조회 ──────────────────────────────────────────────────
+    def rows_for(self, rrn: str) -> list[dict]:
+        """주민번호의 예약 행 목록 (파일 순서)"""
+        view = self._current()
+        return [view.read(offset) for offset in view.offsets(rrn)]
+
+    def get(self, rrn: str) -> dict | None:
+        view = self._current()
+        offsets = view.offsets(rrn)
+        return view.read(offsets[0]) if offsets else None
+
+    def find(self, rrn: str, time: str) -> dict | None:
+        """(rrn, time) 키로 한 행 조회"""
+        for row in self.rows_for(rrn):
+            if row.get("time", "").strip() == time:
+                return row
+        return None
+
+    def lookup(self, name: str, rrn: str) -> dict | None:
+        """(이름, 주민번호) 가 모두 일치하는 첫 예약"""
+        for row in self.rows_for(rrn):
+            if row["name"].strip() == name:
+                return row
+        return None
+
+    def payment_status(self, rrn: str) -> str | None:
+        """예약 파일이 없으면 FileNotFoundError"""
+        if not self.exists():
+            raise FileNotFoundError(self.path)
+        row = self.get(rrn)
+        return row.get("payment_status") if row else None
+
+    def iter_rows(self):
+        """파일 순서대로 모든 행(dict)을 스트리밍"""
+        view = self._current()
+        offsets = []
+        for found in view.index.values():
+            offsets.extend([found] if isinstance(found, int) else found)
+        for offset in sorted(offsets):
+            yield view.read(offset)
+
+    def __len__(self) -> int:
+        view = self._current()
+        return sum(1 if isinstance(v, int) else len(v) for v in view.index.values())
+
+    def status_counts(self) -> tuple:
+        """(파일 버전, 진료과 → {상태: 예약 수}) — 잠금 안에서 전체를 훑으므로 드물게만 (O(행 수))"""
+        counts: dict[str, dict] = {}
+        with self.locked() as view:
+            for row in self.iter_rows():
+                _count(counts, row)
+            return view.signature, counts
+
+    # ── 변경 ──────────────────────────────────────────────────
+    def _rewrite(self, upserts: dict | None = None, deletes=(), merge=None) -> set[str]:
+        """
+        파일 전체를 고정 폭 상태 열로 다시 쓴 뒤 원자적으로 교체하고 인덱스를 새로 만든다.
+        upserts 는 (rrn, time) → 행, deletes 는 (rrn, time) 목록.
+        merge(현재 행, 새 행) 가 있으면 이미 있는 키는 그 결과로 바꾼다.
+        영향을 받은 주민번호 집합을 반환한다. (locked() 안에서 호출)
+        """
+        view = self._view
+        upserts = dict(upserts or {})
+        deletes = set(deletes)
+        touched = set()
+        fieldnames = [f for f in view.fieldnames if f != "payment_status"] + ["payment_status"]
+
+        def rows():
+            for row in self.iter_rows():
+                key = (row["rrn"].strip(), row.get("time", "").strip())
+                if key in deletes:
+                    touched.add(key[0])
+                    continue
+                if key in upserts:
+                    new_row = upserts.pop(key)
+                    row = merge(row, new_row) if merge else new_row
+                    touched.add(key[0])
+                yield row
+            for key, row in upserts.items():
+                touched.add(key[0])
+                yield row
+
+        self._write_file(fieldnames, rows())
+        return touched
+
+    def _write_file(self, fieldnames: list[str], rows) -> None:
+        """
+        rows 를 고정 폭 상태 열로 임시 파일에 쓰고 원자적으로 교체한 뒤 인덱스를 새로 만든다.
+        (locked() 안에서 호출)
+        """
+        view = self._view
+        directory = os.path.dirname(self.path) or "."
+        counts: dict[str, dict] = {}
+        fd, tmp_path = tempfile.mkstemp(prefix=".reservations-", suffix=".csv", dir=directory)
+        try:
+            with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+                writer.writeheader()
+                for row in rows:
+                    row = dict(row)
+                    _count(counts, row)
+                    row["payment_status"] = (row.get("payment_status") or "Pending").strip().ljust(STATUS_WIDTH)
+                    writer.writerow(row)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.name == "nt" and view.mm is not None:
+                view.mm.close()   # Windows 는 매핑된 파일을 교체할 수 없음
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._view = self._build_view()
+        self._generation += 1
+        # 잠금 안에서 알림 — 이 버전에 대한 상태 변경(과 그 통지)은 모두 이 기준값 뒤에 온다
+        _notify_rewrite(self.path, self._view.signature, counts)
+
+    def update_status(self, rrn: str, status: str) -> bool:
+        """
+        주민번호의 모든 예약 행 payment_status 를 제자리에서 변경 (+ fsync).
+        해당 예약이 없으면 False.
+        """
+        if status not in STATUSES:
+            raise ValueError(f"unknown status: {status}")
+        with self.locked() as view:
+            if not view.offsets(rrn):
+                return False
+            if not view.padded:
+                self._rewrite()
+
+            encoded = status.ljust(STATUS_WIDTH).encode("ascii")
+            changes = []
+            view, f = self._open_current()
+            with f:
+                for offset in view.offsets(rrn):
+                    field_at = view.line_end(offset) - STATUS_WIDTH
+                    current = view.mm[field_at:field_at + STATUS_WIDTH]
+                    if current != encoded:
+                        changes.append((view.read(offset), current.decode("ascii").strip()))
+                        f.seek(field_at)
+                        f.write(encoded)
+                if changes:
+                    f.flush()
+                    os.fsync(f.fileno())
+            version = view.signature
+        # 콜백은 잠금을 놓은 뒤 호출 (콜백에서 저장소를 다시 읽을 수 있도록)
+        _notifying.version = version
+        try:
+            for row, old in changes:
+                _notify_status(self.path, row, old, status)
+        finally:
+            _notifying.version = None
+        if changes:
+            _notify(self.path, {rrn})
+        return True
+
+    def apply_delta(self, upserts: dict[tuple, dict], deletes=(), merge=None) -> set[str]:
+        """
+        새로 생기거나 바뀐 행(upserts), 삭제할 키(deletes)를 반영한다.
+        merge(현재 행, 새 행) → 쓸 행 : 이미 있는 키에 대해 잠금 안에서 호출
+        (upserts 를 만든 뒤 다른 프로세스가 바꾼 상태를 살릴 때).
+        영향을 받은 주민번호 집합을 반환한다.
+        다시 쓰는 동안에도 조회는 이전 매핑으로 계속 처리된다.
+        """
+        if not upserts and not deletes:
+            return set()
+        with self.locked():
+            touched = self._rewrite(upserts, deletes, merge)
+        if touched:
+            _notify(self.path, touched)
+        return touched
+
+
+    def replace_all(self, rows) -> None:
+        """
+        파일 내용을 rows 로 통째로 바꾼다 (파일이 없으면 새로 만듦).
+        상태 변경 콜백은 호출하지 않고 subscribe() 콜백에 None(전체 재적재)을 통지한다.
+        """
+        with self.locked():
+            self._write_file(FIELDNAMES, rows)
+        _notify(self.path, None)
+
+
+def get_store(path: str) -> ReservationStore:
+    """경로별로 하나의 저장소 인스턴스를 공유"""
+    path = os.path.abspath(path)
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(path, ReservationStore(path))
+    return store
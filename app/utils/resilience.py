@@ -0,0 +1,225 @@
+"""
+외부 API(Gemini) 호출 보호 계층
+
+  • 전체 마감시간(deadline) — 재시도를 포함한 총 소요시간 상한
+  • 일시적 오류만 재시도 — capped exponential backoff + full jitter
+  • 회로 차단기(circuit breaker) — 연속 실패 시 일정 시간 호출 자체를 막고
+    즉시 CircuitOpenError 를 발생시켜 호출 측이 로컬 대체 응답을 쓰도록 함
+
+업스트림 장애가 요청 스레드를 붙잡아 접수·수납 화면까지 멈추게 하는 일을 막는다.
+ASGI 모드에서는 같은 정책을 asyncio 버전(call_with_resilience_async)으로 적용한다.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+from app.utils import metrics
+
+LLM_RETRIES_TOTAL = "kiosk_llm_retries_total"
+CIRCUIT_TRANSITIONS_TOTAL = "kiosk_circuit_transitions_total"
+metrics.register(LLM_RETRIES_TOTAL, "counter", "Retried upstream calls by breaker name and error type.")
+metrics.register(CIRCUIT_TRANSITIONS_TOTAL, "counter", "Circuit breaker state changes by breaker name and new state.")
+
+
+class CircuitOpenError(RuntimeError):
+    """회로 차단기가 열려 있어 호출하지 않았음을 나타냄"""
+    pass
+
+
+class DeadlineExceededError(TimeoutError):
+    """재시도를 포함한 전체 마감시간 초과"""
+    pass
+
+
+def _transient_errors() -> tuple:
+    """재시도해도 안전한(멱등) 일시적 오류 유형"""
+    errors = [TimeoutError, ConnectionError]
+    try:
+        from google.api_core import exceptions as gexc
+        errors += [
+            gexc.DeadlineExceeded,
+            gexc.ServiceUnavailable,
+            gexc.InternalServerError,
+            gexc.TooManyRequests,
+            gexc.ResourceExhausted,
+        ]
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+TRANSIENT_ERRORS = _transient_errors()
+
+
+class CircuitBreaker:
+    """
+    closed → (연속 failure_threshold 회 실패) → open
+    open   → (reset_timeout 초 경과) → half_open : 시험 호출 1건 허용
+    half_open 에서 성공하면 closed, 실패하면 다시 open
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            metrics.inc(CIRCUIT_TRANSITIONS_TOTAL, breaker=self.name, state=state)
+
+    def allow(self) -> bool:
+        """지금 호출을 시도해도 되는지"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """차단 해제까지 남은 시간(초)"""
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            self._set_state(self.CLOSED)
+
+    def release(self) -> None:
+        """가용성과 무관한 오류(잘못된 요청 등) — 상태는 그대로 두고 시험 호출만 해제"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """full jitter: [0, min(cap, base * 2^attempt)] 범위의 임의 대기시간"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def call_with_resilience(fn, *, breaker: CircuitBreaker, deadline: float,
+                         max_retries: int = 2, base_delay: float = 0.25,
+                         max_delay: float = 2.0, retry_on: tuple = TRANSIENT_ERRORS):
+    """
+    fn(timeout) 를 호출한다. timeout 은 이번 시도에 남은 시간(초).
+
+    • breaker 가 열려 있으면 즉시 CircuitOpenError
+    • retry_on 에 해당하는 오류는 남은 시간 안에서 최대 max_retries 회 재시도
+    • 그 밖의 오류(요청 자체의 문제)는 재시도 없이 그대로 전달하며
+      업스트림 가용성 실패로 세지 않는다
+    """
+    if not breaker.allow():
+        raise CircuitOpenError(f"circuit '{breaker.name}' is open")
+
+    expires = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            breaker.record_failure()
+            raise DeadlineExceededError(f"deadline of {deadline:.1f}s exceeded")
+        try:
+            result = fn(remaining)
+        except retry_on as e:
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if attempt >= max_retries or time.monotonic() + delay >= expires:
+                breaker.record_failure()
+                raise
+            metrics.inc(LLM_RETRIES_TOTAL, breaker=breaker.name, error=type(e).__name__)
+            attempt += 1
+            time.sleep(delay)
+            continue
+        except Exception:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def call_with_resilience_async(fn, *, breaker: CircuitBreaker, deadline: float,
+                                     max_retries: int = 2, base_delay: float = 0.25,
+                                     max_delay: float = 2.0, retry_on: tuple = TRANSIENT_ERRORS):
+    """
+    call_with_resilience() 의 asyncio 버전. fn(timeout) 은 awaitable 을 반환한다.
+    각 시도는 asyncio.wait_for 로도 끊으므로 대기 중에 스레드를 붙잡지 않는다.
+    """
+    if not breaker.allow():
+        raise CircuitOpenError(f"circuit '{breaker.name}' is open")
+
+    expires = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            breaker.record_failure()
+            raise DeadlineExceededError(f"deadline of {deadline:.1f}s exceeded")
+        try:
+            result = await asyncio.wait_for(fn(remaining), remaining)
+        except retry_on as e:
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if attempt >= max_retries or time.monotonic() + delay >= expires:
+                breaker.record_failure()
+                raise
+            metrics.inc(LLM_RETRIES_TOTAL, breaker=breaker.name, error=type(e).__name__)
+            attempt += 1
+            await asyncio.sleep(delay)
+            continue
+        except Exception:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+# ── Gemini 호출용 기본 설정 ─────────────────────────────────────
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", "12"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+
+gemini_breaker = CircuitBreaker(
+    "gemini",
+    failure_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30")),
+)
+
+
+def generate_content(model, contents):
+    """
+    model.generate_content() 를 마감시간·재시도·회로 차단기로 감싸 호출.
+    각 시도의 timeout 은 SDK 의 request_options 로 전달되어 소켓 수준에서 끊긴다.
+    """
+    return call_with_resilience(
+        lambda timeout: model.generate_content(contents, request_options={"timeout": timeout}),
+        breaker=gemini_breaker,
+        deadline=GEMINI_DEADLINE_SECONDS,
+        max_retries=GEMINI_MAX_RETRIES,
+    )
+
+
+async def generate_content_async(model, contents):
+    """generate_content() 의 asyncio 버전 (model.generate_content_async 사용)"""
+    return await call_with_resilience_async(
+        lambda timeout: model.generate_content_async(contents, request_options={"timeout": timeout}),
+        breaker=gemini_breaker,
+        deadline=GEMINI_DEADLINE_SECONDS,
+        max_retries=GEMINI_MAX_RETRIES,
+    )
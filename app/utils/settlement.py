@@ -0,0 +1,209 @@
+"""
+일일 정산 (마감 후 일괄 처리)
+
+  python -m app.utils.settlement --date 2025-06-19 -o settlement.json
+  python -m app.utils.settlement --all --patients patients.csv
+
+예약(reservations.csv + data/archive 의 날짜별 보관 파일), 발급된 처방 항목(prescription_items-날짜.csv), 진료비 목록
+(treatment_fees.csv)을 열(column) 단위 NumPy 배열로 읽은 뒤
+정렬 + searchsorted 로 조인하고 bincount 로 그룹 합계를 구한다.
+환자별 · 진료과별 · 의사별 합계를 행 단위 Python 반복 없이 계산한다.
+
+  • 정산 대상 : 해당 날짜의 수납 완료(Paid) 방문 (주민번호 + 방문일이 같은 예약은 1건)
+  • 항목 금액 : 진료비 목록의 금액 (목록에 없는 항목은 발급 당시 기록된 금액)
+  • 검증      : 수납되지 않은 방문의 항목, 목록에 없는 항목, 기록 금액이 목록과 다른 항목 수
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+from app.utils import reservation_archive
+from app.utils.prescription_plans import ITEM_FIELDS, ITEMS_CSV, TREATMENT_FEES_CSV, ledger_paths
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+RESERVATIONS_CSV = os.path.join(BASE_DIR, "data", "reservations.csv")
+
+
+def read_columns(path: str, fields: list[str], encoding: str = "utf-8-sig") -> dict[str, np.ndarray]:
+    """
+    CSV(.gz 면 gzip 압축 CSV)의 지정한 열만 읽어 열 이름 → 문자열 배열로 반환.
+    파일이 없으면 길이 0 배열. 반복된 헤더 행은 건너뛴다.
+    """
+    if not os.path.exists(path):
+        return {field: np.array([], dtype=str) for field in fields}
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding=encoding) as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        index = {field: header.index(field) for field in fields}
+        width = max(index.values()) + 1
+        first = header[0]
+        rows = [row for row in reader if len(row) >= width and row[0] != first]
+    return {field: np.char.strip(np.array([row[i] for row in rows], dtype=str))
+            for field, i in index.items()}
+
+
+def _reservation_columns(path: str, day: str | None, archive_dir: str | None) -> dict[str, np.ndarray]:
+    """예약 파일 + 보관된 날짜 파일(day 가 있으면 그 날짜만)의 열을 이어 붙임"""
+    fields = ["name", "rrn", "time", "department", "doctor", "payment_status"]
+    paths = [path]
+    if archive_dir:
+        days = [day] if day else reservation_archive.archived_days(archive_dir)
+        paths += [p for p in (reservation_archive.archive_path(d, archive_dir) for d in days) if os.path.exists(p)]
+    parts = [read_columns(p, fields, encoding="utf-8") for p in paths]
+    return {field: np.concatenate([part[field] for part in parts]) for field in fields}
+
+
+def _item_columns(path: str, day: str | None) -> dict[str, np.ndarray]:
+    """방문일별 처방 항목 원장(day 가 있으면 그 날짜 파일만) + 단일 원장의 열을 이어 붙임"""
+    parts = [read_columns(p, ITEM_FIELDS, encoding="utf-8") for p in ledger_paths(path, day)]
+    if not parts:
+        return {field: np.array([], dtype=str) for field in ITEM_FIELDS}
+    return {field: np.concatenate([part[field] for part in parts]) for field in ITEM_FIELDS}
+
+
+def _join_key(*parts: np.ndarray) -> np.ndarray:
+    key = parts[0]
+    for part in parts[1:]:
+        key = np.char.add(np.char.add(key, "|"), part)
+    return key
+
+
+def _lookup(sorted_keys: np.ndarray, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """keys 각각의 sorted_keys 내 위치와 일치 여부"""
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=np.intp), np.zeros(len(keys), dtype=bool)
+    pos = np.searchsorted(sorted_keys, keys)
+    pos = np.minimum(pos, len(sorted_keys) - 1)
+    return pos, sorted_keys[pos] == keys
+
+
+def _group(labels: np.ndarray, **values: np.ndarray) -> list[dict]:
+    """labels 별 합계 (values 의 각 배열을 bincount 로 합산)"""
+    names, inverse = np.unique(labels, return_inverse=True)
+    sums = {k: np.bincount(inverse, weights=v, minlength=len(names)) for k, v in values.items()}
+    return [
+        {"name": str(name), **{k: round(float(s[i]), 2) for k, s in sums.items()}}
+        for i, name in enumerate(names)
+    ]
+
+
+def settle(day: str | None = None, reservations_path: str = RESERVATIONS_CSV,
+           items_path: str = ITEMS_CSV, fees_path: str = TREATMENT_FEES_CSV,
+           archive_dir: str | None = reservation_archive.ARCHIVE_DIR) -> tuple[dict, dict]:
+    """
+    (요약 보고서, 환자별 열 배열) 반환. day 가 None 이면 모든 날짜.
+    archive_dir 의 보관 파일도 함께 읽는다 (None 이면 예약 파일만).
+    """
+    started = time.perf_counter()
+    resv = _reservation_columns(reservations_path, day, archive_dir)
+    items = _item_columns(items_path, day)
+    fees = read_columns(fees_path, ["Department", "Prescription", "Fee"])
+    loaded = time.perf_counter()
+
+    # ── 방문: 수납 완료 예약, (주민번호, 방문일) 기준 중복 제거 ──────
+    resv_date = resv["time"].astype("U10")
+    mask = resv["payment_status"] == "Paid"
+    if day:
+        mask &= resv_date == day
+    visit_keys, first = np.unique(_join_key(resv["rrn"][mask], resv_date[mask]), return_index=True)
+    visit_rrn = resv["rrn"][mask][first]
+    visit_date = resv_date[mask][first]
+    visit_name = resv["name"][mask][first]
+    visit_dept = resv["department"][mask][first]
+    visit_doctor = resv["doctor"][mask][first]
+
+    # ── 처방 항목 → 방문 / 진료비 목록 조인 ───────────────────────
+    if day:
+        day_mask = items["visit_date"] == day
+        items = {k: v[day_mask] for k, v in items.items()}
+    item_visit, billed = _lookup(visit_keys, _join_key(items["rrn"], items["visit_date"]))
+
+    catalog_keys = _join_key(fees["Department"], fees["Prescription"])
+    order = np.argsort(catalog_keys)
+    catalog_keys = catalog_keys[order]
+    catalog_fee = fees["Fee"][order].astype(float) if len(order) else np.zeros(0)
+    item_catalog, listed = _lookup(catalog_keys, _join_key(items["department"], items["prescription"]))
+
+    recorded_fee = np.where(items["fee"] == "", "0", items["fee"]).astype(float)
+    listed_fee = catalog_fee[item_catalog] if len(catalog_fee) else np.zeros(len(recorded_fee))
+    price = np.where(listed, listed_fee, recorded_fee)
+    mismatched = listed & (np.abs(recorded_fee - listed_fee) > 0.005)
+
+    # ── 그룹 합계 ────────────────────────────────────────────────
+    n_visits = len(visit_keys)
+    visit_total = np.bincount(item_visit[billed], weights=price[billed], minlength=n_visits)
+    visit_items = np.bincount(item_visit[billed], minlength=n_visits).astype(float)
+    ones = np.ones(n_visits)
+
+    report = {
+        "date": day or "all",
+        "visits": int(n_visits),
+        "items": int(billed.sum()),
+        "total": round(float(visit_total.sum()), 2),
+        "by_department": _group(visit_dept, visits=ones, items=visit_items, total=visit_total),
+        "by_doctor": _group(visit_doctor, visits=ones, items=visit_items, total=visit_total),
+        "checks": {
+            "visits_without_items": int((visit_items == 0).sum()),
+            "items_without_paid_visit": int((~billed).sum()),
+            "items_not_in_catalog": int((~listed).sum()),
+            "fee_mismatches": int(mismatched.sum()),
+        },
+        "seconds": {
+            "load": round(loaded - started, 3),
+            "compute": round(time.perf_counter() - loaded, 3),
+        },
+    }
+    patients = {
+        "rrn": visit_rrn, "name": visit_name, "visit_date": visit_date,
+        "department": visit_dept, "doctor": visit_doctor,
+        "items": visit_items.astype(int), "total": visit_total.round(2),
+    }
+    return report, patients
+
+
+def write_patients(path: str, patients: dict) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(patients))
+        writer.writerows(zip(*(column.tolist() for column in patients.values())))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="End-of-day settlement report")
+    when = parser.add_mutually_exclusive_group()
+    when.add_argument("--date", help="visit date YYYY-MM-DD (default: today)")
+    when.add_argument("--all", action="store_true", help="settle every date in the files")
+    parser.add_argument("--reservations", default=RESERVATIONS_CSV)
+    parser.add_argument("--archive-dir", default=reservation_archive.ARCHIVE_DIR,
+                        help="date-partitioned archives to include ('' to skip)")
+    parser.add_argument("--items", default=ITEMS_CSV,
+                        help="item ledger; its per-day files (name-YYYY-MM-DD.csv) are read too")
+    parser.add_argument("--fees", default=TREATMENT_FEES_CSV)
+    parser.add_argument("-o", "--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--patients", help="write per-patient totals to this CSV")
+    args = parser.parse_args(argv)
+
+    day = None if args.all else (args.date or date.today().isoformat())
+    report, patients = settle(day, args.reservations, args.items, args.fees, args.archive_dir or None)
+    if args.patients:
+        write_patients(args.patients, patients)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+동일 요청 병합(single-flight)
+
+같은 키로 동시에 들어온 호출 중 첫 번째(leader)만 실제로 fn() 을 실행하고,
+나머지(follower)는 그 결과(또는 예외)를 그대로 나눠 받는다.
+호출이 끝나면 키는 즉시 제거되므로 결과를 캐시하지는 않는다.
+AsyncSingleFlight 는 같은 동작을 한 이벤트 루프 안의 코루틴끼리 수행한다.
+"""
+import asyncio
+import threading
+
+from app.utils import metrics
+
+COALESCED_TOTAL = "kiosk_singleflight_coalesced_total"
+metrics.register(COALESCED_TOTAL, "counter", "Calls that shared an in-flight upstream call instead of making their own.")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn):
+        """key 가 같은 진행 중 호출이 있으면 그 결과를 기다려 반환, 없으면 fn() 실행"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.inc(COALESCED_TOTAL, group=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """SingleFlight 의 asyncio 버전 (한 이벤트 루프 안에서만 사용)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn):
+        """fn() 은 awaitable 을 반환한다"""
+        future = self._calls.get(key)
+        if future is not None:
+            metrics.inc(COALESCED_TOTAL, group=self.name)
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()   # follower 가 없어도 "never retrieved" 경고가 나지 않도록
+            raise
+        finally:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
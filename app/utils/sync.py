@@ -0,0 +1,144 @@
+"""
+키오스크 레플리카 동기화 — 중앙 서버 쪽 (app.routes.sync 에서 사용)
+
+  • 변경 기록 : 예약이 바뀔 때마다 바뀐 주민번호를 변경 기록 파일(data/reservation_changes.log)에
+    한 줄씩 추가. 전체 재적재(파일 교체 등)는 "*" 한 줄.
+    O_APPEND 로 쓰므로 여러 worker 프로세스가 같은 파일에 안전하게 기록한다.
+  • 커서   : "<기록 파일 inode>:<바이트 오프셋>" — 키오스크는 마지막으로 받은 커서를 보내고
+    그 이후 바뀐 주민번호의 오늘 예약만 받는다. 기록 파일이 바뀌었거나(inode) 사이에 "*" 가 있으면
+    오늘 예약 전체(snapshot)를 보낸다.
+  • 상태 업로드 : 키오스크에서 바뀐 상태(Registered / Paid)를 반영.
+    충돌 규칙 — 상태는 Pending → Registered → Paid 로만 진행한다.
+      · 키오스크 값이 서버 값보다 앞선 단계 → 서버에 반영 (applied)
+      · 같은 단계                          → 이미 반영됨 (applied)
+      · 뒤로 돌아가는 값                    → 서버 값 유지, 키오스크에 서버 값을 돌려줌 (conflict)
+"""
+import os
+import threading
+from datetime import date
+
+from app.utils import reservation_search, reservation_store
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+CHANGE_LOG_PATH = os.getenv("SYNC_CHANGE_LOG", os.path.join(BASE_DIR, "data", "reservation_changes.log"))
+
+RESET = "*"
+STATUS_RANK = {status: rank for rank, status in enumerate(reservation_store.STATUSES)}
+
+
+class ChangeLog:
+    def __init__(self, path: str = CHANGE_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, rrns) -> None:
+        """바뀐 주민번호들(None 이면 전체 재적재) 기록"""
+        lines = RESET + "\n" if rrns is None else "".join(f"{rrn}\n" for rrn in sorted(rrns))
+        if not lines:
+            return
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, lines.encode("utf-8"))
+            finally:
+                os.close(fd)
+
+    def read_since(self, cursor: str | None) -> tuple[str, set[str] | None]:
+        """
+        (새 커서, 바뀐 주민번호 집합) 반환. 전체 동기화가 필요하면 집합 대신 None.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.append(None)
+            st = os.stat(self.path)
+        epoch, _, offset = (cursor or "").partition(":")
+        if epoch != str(st.st_ino) or not offset.isdigit() or int(offset) > st.st_size:
+            return f"{st.st_ino}:{st.st_size}", None
+
+        with open(self.path, "rb") as f:
+            f.seek(int(offset))
+            data = f.read(st.st_size - int(offset))
+        complete = data[:data.rfind(b"\n") + 1]   # 쓰는 중인 마지막 줄은 다음 번에
+        new_cursor = f"{st.st_ino}:{int(offset) + len(complete)}"
+        rrns = set()
+        for line in complete.decode("utf-8").splitlines():
+            if line == RESET:
+                return new_cursor, None
+            if line:
+                rrns.add(line)
+        return new_cursor, rrns
+
+
+def _today_rows(rows, day: str) -> list[dict]:
+    return [row for row in rows if row.get("time", "").startswith(day)]
+
+
+def changes(store: reservation_store.ReservationStore, log: ChangeLog,
+            cursor: str | None, day: str | None = None) -> dict:
+    """
+    키오스크에 보낼 변경분.
+      full=True  : rows 는 오늘 예약 전체 목록
+      full=False : rows 는 주민번호 → 그 사람의 오늘 예약 목록 (빈 목록이면 로컬에서 삭제)
+    """
+    day = day or date.today().isoformat()
+    store.generation   # 파일이 교체되었으면 먼저 다시 적재 (→ 변경 기록에 "*")
+    new_cursor, rrns = log.read_since(cursor)
+    if rrns is None:
+        return {"cursor": new_cursor, "day": day, "full": True,
+                "rows": _today_rows(store.iter_rows(), day)}
+    return {"cursor": new_cursor, "day": day, "full": False,
+            "rows": {rrn: _today_rows(store.rows_for(rrn), day) for rrn in sorted(rrns)}}
+
+
+def apply_status_changes(store: reservation_store.ReservationStore, items: list[dict]) -> dict:
+    """
+    키오스크가 올린 상태 변경 반영.
+    반환: {"applied": [id...], "conflicts": [{"id", "rrn", "status"(서버 값)}], "unknown": [id...]}
+    """
+    result = {"applied": [], "conflicts": [], "unknown": []}
+    for item in items:
+        change_id, rrn, status = item.get("id"), (item.get("rrn") or "").strip(), item.get("status")
+        if status not in STATUS_RANK or not rrn:
+            result["unknown"].append(change_id)
+            continue
+        row = store.get(rrn)
+        if row is None:
+            result["unknown"].append(change_id)
+            continue
+        current = row.get("payment_status", "Pending")
+        if STATUS_RANK[status] > STATUS_RANK.get(current, 0):
+            store.update_status(rrn, status)
+            result["applied"].append(change_id)
+        elif status == current:
+            result["applied"].append(change_id)
+        else:
+            result["conflicts"].append({"id": change_id, "rrn": rrn, "status": current})
+    return result
+
+
+change_log = ChangeLog()
+_started = False
+_start_lock = threading.Lock()
+
+
+def init_app(app, reservations_path: str | None = None) -> None:
+    """
+    중앙 서버 모드: 예약 변경을 변경 기록에 남기도록 등록 (프로세스당 한 번).
+    reservations_path 를 주지 않으면 접수 화면이 쓰는 예약 파일을 따른다.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+
+    def _record(path, rrns):
+        from app.routes import reception
+        target = reservations_path or reception.RESV_CSV
+        if os.path.abspath(path) == os.path.abspath(target):
+            change_log.append(rrns)
+
+    reservation_store.subscribe(_record)
+    # 다른 worker 가 바꾼 예약을 검색 인덱스가 이 기록으로 따라잡음
+    reservation_search.follow(change_log)
@@ -0,0 +1,184 @@
+"""
+시작 시 warm-up (create_app 에서 호출)
+
+배포·worker 재시작 직후 첫 방문자가 떠안던 초기 비용을 미리 치른다.
+아래 단계는 별도 스레드에서 병렬로 실행된다.
+
+  • fee_catalog   : 진료비 목록(treatment_fees.csv) 적재
+  • reservations  : 예약 파일 mmap 인덱스 생성
+  • search_index  : 예약 검색용 보조 인덱스(이름·생년월일·진료과·의사·상태·시각) 생성
+  • plans         : 오늘의 처방 계획 원장 적재
+  • templates     : 모든 Jinja 템플릿 컴파일
+  • pdf           : 처방전·진료확인서 PDF 를 한 장씩 만들어 버림 (TTF 글꼴 적재 포함)
+  • llm_client    : Gemini 클라이언트 설정 + 모델 준비 (GEMINI_API_KEY 가 없으면 건너뜀)
+
+챗봇의 정규식은 모듈 로드 시 컴파일된다.
+GET /healthz/ready 는 모든 단계가 끝나고 필수 단계가 하나도 실패하지 않아야 200 을 반환하므로,
+로드밸런서는 준비된 worker 에만 요청을 보낼 수 있다.
+선택 단계(WARMUP_OPTIONAL)의 실패는 보고만 하고 준비 상태에는 영향을 주지 않는다.
+
+  WARMUP=0          → warm-up 을 건너뛰고 바로 ready
+  WARMUP_BLOCKING=1 → create_app 이 warm-up 완료까지 기다림 (백그라운드 스레드 없음)
+  WARMUP_SKIP=a,b   → 이름을 준 단계는 건너뜀 (예: 프리포크 master 에서 llm_client)
+  WARMUP_OPTIONAL=a → 실패해도 ready 로 보는 단계 (기본 llm_client — 외부 서비스라 챗봇만 영향)
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils import background
+
+ENABLED = os.getenv("WARMUP", "1") != "0"
+BLOCKING = os.getenv("WARMUP_BLOCKING", "0") == "1"
+SKIP = {name.strip() for name in os.getenv("WARMUP_SKIP", "").split(",") if name.strip()}
+OPTIONAL = {name.strip() for name in os.getenv("WARMUP_OPTIONAL", "llm_client").split(",") if name.strip()}
+
+SAMPLE_NAME = "홍길동"
+SAMPLE_RRN = "000000-0000000"
+
+
+class Warmup:
+    def __init__(self, optional=frozenset()):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.optional = set(optional)      # 실패해도 준비 상태를 막지 않는 단계
+        self.started_at: float | None = None
+        self.seconds: float | None = None
+        self.steps: dict[str, dict] = {}   # 단계 → {"seconds", "error"(실패 시), "skipped"(건너뜀)}
+
+    @property
+    def ready(self) -> bool:
+        """warm-up 이 끝났는지 (실패한 단계가 있어도 True — healthy 를 볼 것)"""
+        return self._done.is_set()
+
+    @property
+    def failed(self) -> list[str]:
+        """실패한 필수 단계"""
+        with self._lock:
+            return sorted(name for name, result in self.steps.items()
+                          if "error" in result and name not in self.optional)
+
+    @property
+    def healthy(self) -> bool:
+        """끝났고 필수 단계가 모두 성공 → 요청을 받아도 됨"""
+        return self.ready and not self.failed
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run_step(self, name: str, fn, app) -> None:
+        started = time.perf_counter()
+        result = {}
+        try:
+            if fn(app) is False:
+                result["skipped"] = True
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        with self._lock:
+            self.steps[name] = result
+
+    def run(self, app, steps: dict) -> None:
+        """모든 단계를 병렬 실행하고 끝나면 ready 로 표시 (실패한 단계는 steps 에 기록)"""
+        self.started_at = time.perf_counter()
+        try:
+            if steps:
+                with ThreadPoolExecutor(len(steps), thread_name_prefix="warmup") as pool:
+                    for name, fn in steps.items():
+                        pool.submit(self._run_step, name, fn, app)
+        finally:
+            self.seconds = round(time.perf_counter() - self.started_at, 3)
+            self._done.set()
+
+    def skip(self) -> None:
+        self.seconds = 0.0
+        self._done.set()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            steps = {name: dict(result, **({"optional": True} if name in self.optional else {}))
+                     for name, result in self.steps.items()}
+        if self.ready:
+            failed = self.failed
+            if failed:
+                return {"status": "failed", "seconds": self.seconds, "failed": failed, "steps": steps}
+            return {"status": "ready", "seconds": self.seconds, "steps": steps}
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {"status": "warming", "seconds": round(elapsed, 3), "steps": steps}
+
+
+# ── 단계 ─────────────────────────────────────────────────────
+def _fee_catalog(app):
+    from app.routes import payment
+    from app.utils import prescription_plans
+    prescription_plans.get_catalog(payment.TREATMENT_FEES_CSV).departments()
+
+
+def _reservations(app):
+    from app.routes import reception
+    from app.utils import reservation_store
+    reservation_store.get_store(reception.RESV_CSV).generation
+
+
+def _search_index(app):
+    from app.routes import reception
+    from app.utils import reservation_search
+    len(reservation_search.get_index(reception.RESV_CSV))
+
+
+def _plans(app):
+    from app.routes import payment
+    from app.utils import prescription_plans
+    prescription_plans.get_plan_store(payment.PRESCRIPTION_ITEMS_CSV).get("", "")
+
+
+def _templates(app):
+    env = app.jinja_env
+    for name in env.list_templates(filter_func=lambda n: n.endswith(".html")):
+        env.get_template(name)
+
+
+def _pdf(app):
+    # 두 문서가 같은 글꼴을 쓰므로 한 단계에서 차례로 만든다
+    from app.routes import payment
+    from app.utils import pdf_generator, prescription_plans
+    catalog = prescription_plans.get_catalog(payment.TREATMENT_FEES_CSV)
+    department = min(catalog.departments(), default="내과")
+    plan = prescription_plans.draw_plan(department, catalog.items(department))
+    pdf_generator.generate_prescription_pdf(
+        SAMPLE_NAME, SAMPLE_RRN, department, plan["prescriptions"], plan["total_fee"])
+    pdf_generator.generate_medical_confirmation_pdf(SAMPLE_NAME, SAMPLE_RRN, department)
+
+
+def _llm_client(app):
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return False
+    from app.routes import chatbot
+    chatbot.prepare_model(api_key)
+
+
+STEPS = {
+    "fee_catalog": _fee_catalog,
+    "reservations": _reservations,
+    "search_index": _search_index,
+    "plans": _plans,
+    "templates": _templates,
+    "pdf": _pdf,
+    "llm_client": _llm_client,
+}
+
+
+def init_app(app, enabled: bool = ENABLED, blocking: bool = BLOCKING, skip=SKIP,
+             optional=OPTIONAL) -> Warmup:
+    """app.extensions["warmup"] 에 상태를 두고 warm-up 시작"""
+    warmup = app.extensions["warmup"] = Warmup(optional)
+    steps = {name: (lambda app: False) if name in skip else fn for name, fn in STEPS.items()}
+    if not enabled:
+        warmup.skip()
+    elif blocking:
+        warmup.run(app, steps)
+    else:
+        background.start(warmup.run, (app, steps), name="warmup")
+    return warmup
@@ -0,0 +1,5 @@
+from app import create_app
+from app.utils.asgi_bridge import KioskASGI
+
+# ASGI 서버용 진입점 — 예) uvicorn asgi:application --port 5001
+application = KioskASGI(create_app())
@@ -0,0 +1,222 @@
+"""
+키오스크 주요 경로 마이크로벤치마크
+
+  python benchmarks/bench_hotpaths.py                       # 100 / 10k / 1M 행
+  python benchmarks/bench_hotpaths.py --sizes 100,10000 -o bench.json
+
+실제 data/ 는 건드리지 않는다. 각 크기마다 임시 디렉터리에
+app.utils.datagen 으로 예약 파일을 만들고, 모듈의 CSV 경로 상수를 임시 파일로 바꾼 뒤 측정한다.
+앱도 경로를 임시 디렉터리로 바꾼 뒤 만들고, 집계 스냅샷·결제 기록·변경 기록은
+앱 모듈을 import 하기 전에 환경 변수로 임시 디렉터리를 가리키게 한다.
+결과는 JSON 으로 출력(또는 저장)하여 실행 간 비교에 사용한다.
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+# 집계 스냅샷·결제 기록·변경 기록은 import 시점에 경로가 정해지므로 먼저 지정
+#   (loadtest 처럼 이 모듈을 import 해서 쓰는 쪽은 스스로 지정)
+if __name__ == "__main__":
+    _STATE_DIR = tempfile.mkdtemp(prefix="kiosk-bench-state-")
+    atexit.register(shutil.rmtree, _STATE_DIR, ignore_errors=True)
+    os.environ.setdefault("AGGREGATES_SNAPSHOT_PATH", os.path.join(_STATE_DIR, "aggregates.json"))
+    os.environ.setdefault("PAYMENT_DIR", os.path.join(_STATE_DIR, "payments"))
+    os.environ.setdefault("SYNC_CHANGE_LOG", os.path.join(_STATE_DIR, "reservation_changes.log"))
+
+from app import create_app
+import app.routes.certificate as certificate_mod
+import app.routes.chatbot as chatbot_mod
+import app.routes.payment as payment_mod
+import app.routes.reception as reception_mod
+from app.utils import pdf_generator
+from app.utils.datagen import write_reservations
+from app.utils.pdf_generator import (
+    generate_medical_confirmation_pdf,
+    generate_prescription_pdf,
+)
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "data"))
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+
+
+# ── 측정 도구 ──────────────────────────────────────────────────
+def _timeit(fn, min_runs: int = 3, max_runs: int = 200, budget: float = 2.0) -> dict:
+    """
+    fn 을 반복 실행해 실행 시간(ms) 통계를 반환.
+    최소 min_runs 회, 최대 max_runs 회 또는 budget 초까지 실행한다.
+    """
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_runs:
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+        if len(samples) >= min_runs and time.perf_counter() - started > budget:
+            break
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def _patch_paths(resv_csv: str, fees_csv: str) -> None:
+    reception_mod.RESV_CSV = resv_csv
+    chatbot_mod.RESERVATIONS_CSV_PATH = resv_csv
+    chatbot_mod.TREATMENT_FEES_CSV_PATH = fees_csv
+    payment_mod.RESERVATIONS_CSV = resv_csv
+    payment_mod.TREATMENT_FEES_CSV = fees_csv
+    certificate_mod.RESERVATIONS_CSV = resv_csv
+    certificate_mod.TREATMENT_FEES_CSV = fees_csv
+    items_csv = os.path.join(os.path.dirname(resv_csv), "prescription_items.csv")
+    chatbot_mod.PRESCRIPTION_ITEMS_CSV_PATH = items_csv
+    payment_mod.PRESCRIPTION_ITEMS_CSV = items_csv
+    certificate_mod.PRESCRIPTION_ITEMS_CSV = items_csv
+
+
+# ── 벤치마크 본체 ──────────────────────────────────────────────
+def bench_size(app, n_rows: int, workdir: str) -> dict:
+    resv_csv = os.path.join(workdir, "reservations.csv")
+    fees_csv = os.path.join(workdir, "treatment_fees.csv")
+    shutil.copyfile(os.path.join(DATA_DIR, "treatment_fees.csv"), fees_csv)
+
+    t0 = time.perf_counter()
+    target = write_reservations(resv_csv, n_rows, seed=n_rows)
+    setup_ms = (time.perf_counter() - t0) * 1000
+    _patch_paths(resv_csv, fees_csv)
+
+    name, rrn, department = target["name"], target["rrn"], target["department"]
+    slow = n_rows >= 1_000_000
+    runs = dict(min_runs=1 if slow else 3, budget=5.0 if slow else 2.0)
+    results = {}
+
+    results["lookup_reservation"] = _timeit(
+        lambda: reception_mod.lookup_reservation(name, rrn), **runs)
+
+    statuses = iter(["Registered", "Pending"] * 1000)
+    results["update_reservation_status"] = _timeit(
+        lambda: chatbot_mod.update_reservation_status(rrn, next(statuses)), **runs)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["department"] = department
+    results["load_prescriptions"] = _timeit(
+        lambda: client.get("/payment/load_prescriptions"), **runs)
+
+    items = [{"name": "비타민D 처방", "fee": 18833}, {"name": "철분제 처방", "fee": 11621}]
+    results["generate_prescription_pdf"] = _timeit(
+        lambda: generate_prescription_pdf(name, rrn, department, items, 30454), **runs)
+    results["generate_medical_confirmation_pdf"] = _timeit(
+        lambda: generate_medical_confirmation_pdf(name, rrn, department), **runs)
+
+    def _with_session(fn, *args, **session_data):
+        def run():
+            with app.test_request_context("/api/chatbot", method="POST"):
+                from flask import session
+                session.update(session_data)
+                fn(*args)
+        return run
+
+    patient = dict(reception_complete=True, payment_complete=False,
+                   patient_name=name, patient_rrn=rrn, department=department)
+    results["chatbot.process_rrn_reception"] = _timeit(_with_session(
+        chatbot_mod.process_rrn_reception,
+        "접수", f"[RRN_RECEPTION_INTENT] 이름: {name}, 주민번호: {rrn}"), **runs)
+    results["chatbot.process_rrn_payment"] = _timeit(_with_session(
+        chatbot_mod.process_rrn_payment,
+        "수납", f"[RRN_PAYMENT_INTENT] 이름: {name}, 주민번호: {rrn}", **patient), **runs)
+    results["chatbot.process_user_confirmed_payment"] = _timeit(_with_session(
+        chatbot_mod.process_user_confirmed_payment,
+        "네", "[USER_CONFIRMED_PAYMENT_INTENT] 수납이 완료되었습니다.", **patient), **runs)
+    results["chatbot.process_kiosk_status_check"] = _timeit(_with_session(
+        chatbot_mod.process_kiosk_status_check,
+        "다음은 뭐에요?", "[CHECK_KIOSK_STATUS_INTENT]", **patient), **runs)
+
+    return {
+        "rows": n_rows,
+        "file_bytes": os.path.getsize(resv_csv),
+        "setup_ms": round(setup_ms, 1),
+        "results": results,
+    }
+
+
+def bench_pdf() -> dict:
+    """
+    증명서 PDF 크기·생성 시간 — 출력 최적화 모드(압축) 켜짐/꺼짐 비교.
+    임베드된 글꼴은 어느 쪽이든 사용된 글리프만 담은 부분집합이다.
+    """
+    items = [{"name": "비타민D 처방", "fee": 18833}, {"name": "철분제 처방", "fee": 11621}]
+    docs = {
+        "prescription": lambda: generate_prescription_pdf("홍길동", "900101-1234567", "내과", items, 30454),
+        "medical_confirmation": lambda: generate_medical_confirmation_pdf("홍길동", "900101-1234567", "내과"),
+    }
+    original = pdf_generator.PDF_OPTIMIZE
+    results = {"font_file_bytes": os.path.getsize(pdf_generator.KOREAN_FONT_PATH)}
+    try:
+        for doc, render in docs.items():
+            results[doc] = {}
+            for mode, optimize in (("optimized", True), ("uncompressed", False)):
+                pdf_generator.PDF_OPTIMIZE = optimize
+                results[doc][mode] = {"bytes": len(render()), **_timeit(render, budget=1.0)}
+    finally:
+        pdf_generator.PDF_OPTIMIZE = original
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Kiosk hot-path microbenchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated reservation row counts")
+    parser.add_argument("-o", "--output", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="kiosk-bench-") as workdir:
+        # warm-up 이 실제 data/ 대신 임시 파일을 읽도록 경로부터 바꾼 뒤 앱 생성
+        resv_csv = os.path.join(workdir, "reservations.csv")
+        fees_csv = os.path.join(workdir, "treatment_fees.csv")
+        shutil.copyfile(os.path.join(DATA_DIR, "treatment_fees.csv"), fees_csv)
+        write_reservations(resv_csv, 0)
+        _patch_paths(resv_csv, fees_csv)
+        app = create_app()
+        for n_rows in sizes:
+            print(f"[bench] {n_rows:,} rows ...", file=sys.stderr)
+            report["sizes"].append(bench_size(app, n_rows, workdir))
+    print("[bench] pdf sizes ...", file=sys.stderr)
+    report["pdf"] = bench_pdf()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+부하 테스트용 Gemini 대역 (네트워크·API 키 없이 /api/chatbot 전체 경로 실행)
+
+  • 질문 내용에 따라 실제 의도 태그([RRN_RECEPTION_INTENT], [RRN_PAYMENT_INTENT],
+    [USER_CONFIRMED_PAYMENT_INTENT], 증명서·상태 확인 태그)가 든 답변을 돌려준다
+  • 응답 지연은 분포로 지정 (const / uniform / lognormal), 일부 호출은 일시 오류로 실패시킬 수 있음
+  • generate_content / generate_content_async 모두 지원 → WSGI·ASGI 모드 어디서나 사용
+  • request_options 의 timeout 보다 지연이 길면 그만큼 기다린 뒤 TimeoutError
+
+같은 프로세스에서:
+  from benchmarks import fake_gemini
+  fake_gemini.install("lognormal:0.8,0.5", error_rate=0.01)
+
+별도 서버로 (환경 변수 FAKE_GEMINI_LATENCY, FAKE_GEMINI_ERROR_RATE):
+  gunicorn -w 4 -b :5001 "benchmarks.fake_gemini:create_app()"
+  uvicorn --factory benchmarks.fake_gemini:create_asgi --port 5001
+"""
+import asyncio
+import math
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+DEFAULT_LATENCY = "lognormal:0.8,0.5"
+
+_RRN_RE = re.compile(r"\d{6}-\d{7}")
+_NAME_RE = re.compile(r"[가-힣]{2,4}")
+_STATE_FIELD_RE = re.compile(r"(\S+)=(\S+)")
+
+
+class Latency:
+    """
+    지연 분포 (초)
+      const:0.5          항상 0.5
+      uniform:0.2,1.5    0.2 ~ 1.5 균등
+      lognormal:0.8,0.5  중앙값 0.8, 로그 표준편차 0.5
+    """
+
+    def __init__(self, spec: str = DEFAULT_LATENCY, seed: int | None = None):
+        kind, _, args = spec.partition(":")
+        self.spec = spec
+        self.kind = kind.strip()
+        self.args = [float(a) for a in args.split(",") if a.strip()]
+        expected = {"const": 1, "uniform": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.args) != expected[self.kind]:
+            raise ValueError(f"invalid latency spec: {spec!r}")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "const":
+                return self.args[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.args)
+            median, sigma = self.args
+            return self._rng.lognormvariate(math.log(median), sigma)
+
+
+def _question(contents) -> tuple[str, dict]:
+    """build_prompt() 결과에서 마지막 사용자 질문과 [상태] 블록의 항목을 꺼냄"""
+    last = contents[-1] if contents else ""
+    if isinstance(last, dict):
+        last = next((p for p in reversed(last.get("parts", [])) if isinstance(p, str)), "")
+    if not isinstance(last, str):
+        return "", {}
+    header, _, question = last.rpartition("사용자 질문:\n")
+    state = dict(_STATE_FIELD_RE.findall(header))
+    return question.strip(), state
+
+
+def scripted_reply(question: str, state: dict | None = None) -> str:
+    """
+    질문 키워드 → 실제 라우트가 처리하는 의도 태그가 든 답변.
+    수납 의도에는 실제 모델처럼 세션 상태의 이름·주민번호를 넣는다.
+    """
+    state = state or {}
+    if "처방전" in question:
+        return "[PRESCRIPTION_CERTIFICATE_INTENT] 처방전을 발급해 드리겠습니다."
+    if "진료확인서" in question:
+        return "[MEDICAL_CONFIRMATION_CERTIFICATE_INTENT] 진료확인서를 발급해 드리겠습니다."
+    if question in ("네", "예") or "결제해" in question:
+        return "[USER_CONFIRMED_PAYMENT_INTENT] 수납이 완료되었습니다."
+    if "수납" in question or "결제" in question:
+        if state.get("이름") and state.get("주민번호"):
+            return f"[RRN_PAYMENT_INTENT] 이름: {state['이름']}, 주민번호: {state['주민번호']} 님의 수납 정보를 확인하겠습니다."
+        return "[RRN_PAYMENT_INTENT] 수납 정보를 확인하겠습니다."
+    rrn = _RRN_RE.search(question)
+    if "접수" in question and rrn:
+        name = _NAME_RE.search(question)
+        name_text = name.group(0) if name else ""
+        return f"[RRN_RECEPTION_INTENT] 이름: {name_text}, 주민번호: {rrn.group(0)} 로 예약을 확인하겠습니다."
+    if "다음" in question or "순서" in question:
+        return "[CHECK_KIOSK_STATUS_INTENT]"
+    return "안녕하세요, 보건소 안내원 늘봄이입니다. 무엇을 도와드릴까요?"
+
+
+def _response(text: str, prompt_chars: int):
+    import google.generativeai as genai
+    part = SimpleNamespace(text=text)
+    candidate = SimpleNamespace(
+        content=SimpleNamespace(parts=[part]),
+        finish_reason=genai.protos.Candidate.FinishReason.STOP,
+    )
+    return SimpleNamespace(
+        text=text,
+        candidates=[candidate],
+        prompt_feedback=None,
+        usage_metadata=SimpleNamespace(prompt_token_count=max(1, prompt_chars // 2)),
+    )
+
+
+def _transient_error():
+    try:
+        from google.api_core import exceptions as gexc
+        return gexc.ServiceUnavailable("fake gemini: injected failure")
+    except ImportError:
+        return ConnectionError("fake gemini: injected failure")
+
+
+class FakeModel:
+    """GenerativeModel 과 같은 generate_content(_async) 인터페이스"""
+
+    def __init__(self, latency: Latency, error_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _plan(self, contents, request_options):
+        self.calls += 1
+        delay = self.latency.sample()
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and delay > timeout:
+            return timeout, TimeoutError("fake gemini: request timed out")
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return delay, _transient_error()
+        question, state = _question(contents)
+        prompt_chars = sum(len(p) for p in contents if isinstance(p, str))
+        return delay, _response(scripted_reply(question, state), prompt_chars)
+
+    def generate_content(self, contents, request_options=None, **kwargs):
+        delay, result = self._plan(contents, request_options)
+        time.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def generate_content_async(self, contents, request_options=None, **kwargs):
+        delay, result = self._plan(contents, request_options)
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def install(latency: str = DEFAULT_LATENCY, error_rate: float = 0.0, seed: int | None = None) -> FakeModel:
+    """prompt_builder 가 실제 모델 대신 FakeModel 을 돌려주도록 교체"""
+    from app.utils import prompt_builder
+    model = FakeModel(Latency(latency, seed), error_rate, seed)
+    os.environ.setdefault("GEMINI_API_KEY", "fake-gemini")
+    prompt_builder.configure = lambda api_key: None
+    prompt_builder._create_model = lambda model_name, system_instruction: model
+    prompt_builder.reset_models()
+    return model
+
+
+def _install_from_env() -> FakeModel:
+    return install(os.getenv("FAKE_GEMINI_LATENCY", DEFAULT_LATENCY),
+                   float(os.getenv("FAKE_GEMINI_ERROR_RATE", "0")))
+
+
+def create_app():
+    """WSGI 서버용 팩토리 — 가짜 모델을 설치한 뒤 앱 생성"""
+    from app import create_app as _create_app
+    _install_from_env()
+    return _create_app()
+
+
+def create_asgi():
+    """ASGI 서버용 팩토리"""
+    from app.utils.asgi_bridge import KioskASGI
+    return KioskASGI(create_app())
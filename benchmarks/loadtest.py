@@ -0,0 +1,319 @@
+"""
+키오스크 방문 흐름 부하 테스트
+
+  python benchmarks/loadtest.py --visitors 200 --concurrency 50
+  python benchmarks/loadtest.py --llm-latency uniform:0.3,2.0 --llm-error-rate 0.02 -o load.json
+  python benchmarks/loadtest.py --url http://127.0.0.1:5001 --reservations /srv/kiosk/data/reservations.csv
+
+가상 방문객마다 자기 세션(쿠키)을 가지고 아래 순서로 요청을 보낸다.
+
+  home → reception_page → reception(예약 확인) → chat_status
+  → prescriptions → payment → payment_status(1초마다 결제 상태 조회, 끝날 때까지는 payment_wait) → payment_done
+    (또는 --chat-pay 비율만큼 chat_pay_query → chat_pay_confirm → payment_status)
+  → chat_certificate → pdf_prescription → pdf_confirmation
+
+--url 이 없으면 임시 디렉터리에 예약 파일을 만들고, 가짜 Gemini(benchmarks/fake_gemini.py)를
+설치한 앱을 같은 프로세스의 스레드 서버로 띄운다.
+--url 로 외부 서버를 측정할 때는 그 서버도 가짜 모델로 띄우고
+(gunicorn "benchmarks.fake_gemini:create_app()"), 같은 예약 파일을 --reservations 로 넘긴다.
+방문객이 모두 한 주소에서 오므로 대상 서버는 키오스크별 속도 제한을 끄고 띄운다
+(ADMISSION_CHAT_RATE=0 ADMISSION_PDF_RATE=0 — 내장 서버는 자동으로 끔).
+
+단계별 처리량과 p50/p95/p99 지연(ms)을 JSON 으로 출력한다.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookiejar import CookieJar
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "data"))
+
+
+# ── 결과 수집 ──────────────────────────────────────────────────
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, dict[str, int]] = {}
+
+    def add(self, step: str, ms: float, error: str | None = None) -> None:
+        with self._lock:
+            self.samples.setdefault(step, []).append(ms)
+            if error:
+                counts = self.errors.setdefault(step, {})
+                counts[error] = counts.get(error, 0) + 1
+
+    def summary(self, seconds: float) -> dict:
+        steps = {}
+        for step, samples in self.samples.items():
+            samples = sorted(samples)
+            errors = self.errors.get(step, {})
+            steps[step] = {
+                "count": len(samples),
+                "errors": sum(errors.values()),
+                "per_second": round(len(samples) / seconds, 2) if seconds else 0.0,
+                "p50_ms": _percentile(samples, 50),
+                "p95_ms": _percentile(samples, 95),
+                "p99_ms": _percentile(samples, 99),
+                "max_ms": round(samples[-1], 1),
+            }
+            if errors:
+                steps[step]["error_kinds"] = errors
+        return steps
+
+
+def _percentile(sorted_samples: list[float], pct: float) -> float:
+    """nearest-rank 백분위수"""
+    rank = max(1, -(-len(sorted_samples) * pct // 100))
+    return round(sorted_samples[int(rank) - 1], 1)
+
+
+# ── 가상 방문객 ───────────────────────────────────────────────
+_PAY_ID_RE = re.compile(r'(?:data-pay-id="|결제 ID: )([0-9A-F]{16})')
+
+
+def _json(body: bytes) -> dict:
+    try:
+        return json.loads(body or b"{}")
+    except ValueError:
+        return {}
+
+
+class Visitor:
+    def __init__(self, base_url: str, recorder: Recorder, think: float, rng: random.Random):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.think = think
+        self.rng = rng
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def request(self, step: str, path: str, form: dict | None = None, payload: dict | None = None,
+                expect=None):
+        """
+        요청 1건을 보내고 시간을 기록. expect(body) 가 False 를 반환하면 오류로 센다.
+        리다이렉트는 따라가며, 마지막 응답까지의 시간을 잰다.
+        """
+        data, headers = None, {}
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode("utf-8")
+        elif payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+
+        error, body = None, b""
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=60) as resp:
+                body = resp.read()
+        except urllib.error.HTTPError as e:
+            error = f"http_{e.code}"
+        except OSError as e:
+            error = type(e).__name__
+        ms = (time.perf_counter() - started) * 1000
+        if error is None and expect is not None and not expect(body):
+            error = "unexpected_response"
+        self.recorder.add(step, ms, error)
+        if self.think:
+            time.sleep(self.rng.uniform(0, self.think))
+        return body
+
+    def wait_payment(self, pay_id: str, timeout: float = 60.0) -> str | None:
+        """결제 화면처럼 1초마다 상태를 조회해 끝난 상태를 반환 (captured 가 아니면 payment_wait 오류)"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        state = None
+        while time.monotonic() < deadline:
+            status = _json(self.request("payment_status", f"/payment/status/{pay_id}"))
+            state = status.get("state")
+            if status.get("settled"):
+                break
+            time.sleep(1.0)
+        self.recorder.add("payment_wait", (time.perf_counter() - started) * 1000,
+                          None if state == "captured" else f"payment_{state}")
+        return state
+
+    def chat(self, step: str, message: str, expect_in: str | None = None) -> dict:
+        """챗봇 요청. expect_in 이 있으면 응답 JSON(유니코드 이스케이프 해제)에 포함되어야 성공"""
+        def expect(body):
+            return expect_in in json.dumps(_json(body), ensure_ascii=False)
+
+        body = self.request(step, "/api/chatbot", payload={"message": message},
+                            expect=expect if expect_in else None)
+        return _json(body)
+
+    def run(self, name: str, rrn: str, chat_pay: bool) -> None:
+        self.request("home", "/")
+        self.request("reception_page", "/reception")
+        self.request("reception", "/reception", form={"action": "manual", "name": name, "rrn": rrn},
+                     expect=lambda b: name.encode("utf-8") in b)
+        self.chat("chat_status", "다음 순서가 뭐예요?", expect_in="수납")
+        self.request("prescriptions", "/payment/load_prescriptions",
+                     expect=lambda b: b'"prescriptions"' in b)
+        if chat_pay:
+            self.chat("chat_pay_query", "수납하고 싶어요", expect_in="결제를 진행하시겠습니까")
+            # 챗봇은 결제를 맡기고 바로 응답 — 채팅 화면처럼 상태를 조회해 결과 확인
+            reply = self.chat("chat_pay_confirm", "네", expect_in="payment_status_url")
+            if reply.get("payment_id"):
+                self.wait_payment(reply["payment_id"])
+        else:
+            # 결제 화면처럼 : 승인·매입이 끝날 때까지 상태를 조회한 뒤 완료 화면
+            body = self.request("payment", "/payment/", form={"patient_id": rrn, "method": "card"})
+            match = _PAY_ID_RE.search(body.decode("utf-8", "replace"))
+            if match:
+                self.wait_payment(match.group(1))
+                self.request("payment_done", f"/payment/done?pay_id={match.group(1)}")
+        self.chat("chat_certificate", "처방전 발급해 주세요", expect_in="pdf_download_url")
+        self.request("pdf_prescription", "/certificate/prescription/", expect=lambda b: b.startswith(b"%PDF"))
+        self.request("pdf_confirmation", "/certificate/medical_confirmation/", expect=lambda b: b.startswith(b"%PDF"))
+
+
+# ── 대상 서버 ─────────────────────────────────────────────────
+def read_identities(path: str, limit: int) -> list[tuple[str, str]]:
+    """예약 파일에서 (이름, 주민번호) 를 최대 limit 명 읽음 (같은 주민번호는 한 번)"""
+    identities, seen = [], set()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            rrn = (row.get("rrn") or "").strip()
+            if not rrn or rrn == "rrn" or rrn in seen:
+                continue
+            seen.add(rrn)
+            identities.append((row["name"].strip(), rrn))
+            if len(identities) >= limit:
+                break
+    return identities
+
+
+def start_local_server(workdir: str, rows: int, latency: str, error_rate: float, seed: int):
+    """임시 데이터 + 가짜 Gemini 로 앱을 띄우고 (base_url, 예약 파일, 서버, 모델) 반환"""
+    # 집계 스냅샷·결제 기록·변경 기록도 임시 디렉터리에 (앱 모듈을 import 하기 전에 지정)
+    os.environ.setdefault("AGGREGATES_SNAPSHOT_PATH", os.path.join(workdir, "aggregates.json"))
+    os.environ.setdefault("PAYMENT_DIR", os.path.join(workdir, "payments"))
+    os.environ.setdefault("SYNC_CHANGE_LOG", os.path.join(workdir, "reservation_changes.log"))
+    # 방문객이 모두 같은 주소(127.0.0.1)에서 오므로 키오스크별 속도 제한은 끄고 동시 실행 상한만 둔다
+    os.environ.setdefault("ADMISSION_CHAT_RATE", "0")
+    os.environ.setdefault("ADMISSION_PDF_RATE", "0")
+    from werkzeug.serving import make_server
+
+    from app.utils.datagen import write_reservations
+    from benchmarks import fake_gemini
+    from benchmarks.bench_hotpaths import _patch_paths
+
+    resv_csv = os.path.join(workdir, "reservations.csv")
+    fees_csv = os.path.join(workdir, "treatment_fees.csv")
+    shutil.copyfile(os.path.join(DATA_DIR, "treatment_fees.csv"), fees_csv)
+    write_reservations(resv_csv, rows, seed=seed)
+
+    model = fake_gemini.install(latency, error_rate, seed)
+    from app import create_app
+    _patch_paths(resv_csv, fees_csv)
+    app = create_app()
+    app.extensions["warmup"].wait()
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadtest-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", resv_csv, server, model
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Kiosk end-to-end load test")
+    parser.add_argument("--url", help="target server (default: start one in-process with a fake Gemini)")
+    parser.add_argument("--reservations", help="reservations CSV the visitors' identities come from")
+    parser.add_argument("--visitors", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--chat-pay", type=float, default=0.5,
+                        help="fraction of visitors that pay through the chatbot")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="max random pause between a visitor's steps (seconds)")
+    parser.add_argument("--rows", type=int, default=10_000, help="reservation rows for the local server")
+    parser.add_argument("--llm-latency", default=None,
+                        help="fake Gemini latency: const:S | uniform:A,B | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    from benchmarks.fake_gemini import DEFAULT_LATENCY
+    latency = args.llm_latency or DEFAULT_LATENCY
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="kiosk-load-") as workdir:
+        server = model = None
+        if args.url:
+            base_url = args.url
+            resv_csv = args.reservations or os.path.join(DATA_DIR, "reservations.csv")
+        else:
+            print("[load] starting local server ...", file=sys.stderr)
+            base_url, resv_csv, server, model = start_local_server(
+                workdir, args.rows, latency, args.llm_error_rate, args.seed)
+
+        identities = read_identities(resv_csv, args.visitors)
+        if not identities:
+            print(f"no reservations found in {resv_csv}", file=sys.stderr)
+            return 1
+        plans = [(*identities[i % len(identities)], rng.random() < args.chat_pay, rng.randrange(2**32))
+                 for i in range(args.visitors)]
+
+        recorder = Recorder()
+
+        def visit(plan):
+            name, rrn, chat_pay, seed = plan
+            Visitor(base_url, recorder, args.think, random.Random(seed)).run(name, rrn, chat_pay)
+
+        print(f"[load] {args.visitors} visitors, concurrency {args.concurrency} -> {base_url}", file=sys.stderr)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency, thread_name_prefix="visitor") as pool:
+            list(pool.map(visit, plans))
+        seconds = time.perf_counter() - started
+        if server is not None:
+            server.shutdown()
+
+    steps = recorder.summary(seconds)
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "target": args.url or "in-process",
+        "visitors": args.visitors,
+        "concurrency": args.concurrency,
+        "chat_pay": args.chat_pay,
+        "think": args.think,
+        "llm_latency": None if args.url else latency,
+        "llm_error_rate": None if args.url else args.llm_error_rate,
+        "llm_calls": model.calls if model else None,
+        "seconds": round(seconds, 2),
+        "visitors_per_second": round(args.visitors / seconds, 2),
+        "requests_per_second": round(sum(s["count"] for s in steps.values()) / seconds, 2),
+        "errors": sum(s["errors"] for s in steps.values()),
+        "steps": steps,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+운영용 실행기 — gunicorn 프리포크 서버에 키오스크 앱을 올린다 (Linux / macOS)
+
+  python serve.py                         # 환경 변수 설정대로 (기본 worker 1개)
+  python serve.py --workers 4 --threads 8 --bind 0.0.0.0:5001
+
+  • master 가 create_app() 을 미리 불러(warm-up 포함: 진료비 목록, 예약 인덱스, 검색 인덱스,
+    처방 계획, 템플릿, PDF 글꼴) 둔 뒤 worker 를 fork → 읽기 전용 데이터는 copy-on-write 로 공유.
+    fork 직전에 gc.freeze() 로 미리 만든 객체를 GC 대상에서 빼서 GC 가 페이지를 건드리지 않게 한다.
+  • 백그라운드 스레드(집계 스냅샷 등)와 Gemini 클라이언트는 fork 뒤 각 worker 에서 시작·생성
+  • worker 는 요청 SERVE_MAX_REQUESTS(+ 최대 SERVE_MAX_REQUESTS_JITTER)건마다 교체 (메모리 누수 대비)
+  • 무중단 재시작
+      kill -HUP  <master pid>   worker 를 차례로 새로 띄우고 이전 worker 는 처리 중인 요청을 마치고 종료
+                                (미리 불러 둔 앱을 다시 fork 하므로 코드·데이터 파일 변경은 반영되지 않음)
+      kill -USR2 <master pid>   새 코드로 새 master 를 띄움 → 새 master 가 준비되면
+      kill -QUIT <이전 master>  이전 master 와 worker 를 요청을 마친 뒤 종료
+
+worker 를 여러 개 띄울 때 (기본은 1개)
+  파일로 공유되어 worker 사이에 맞는 것 : 예약 저장소(파일 잠금), 처방 계획 원장, 운영 집계 스냅샷,
+  검색 인덱스(다른 worker 의 변경을 따라잡음), 결제 기록, 동기화 변경 기록, 프로파일러 설정
+  worker 마다 따로인 것 (요청이 어느 worker 로 가느냐에 따라 달라짐)
+    - /metrics 지표        : 응답한 worker 의 값만 — 수집기가 worker 별로 긁거나 합산해야 함
+    - 챗봇 대화 기억       : 다음 메시지가 다른 worker 로 가면 앞 대화를 모름
+    - 입장 제어 토큰 버킷·동시 실행 상한 : worker 마다 따로 → 실제 상한은 설정값 × worker 수
+    - 증명서 미리 만들기   : 수납을 처리한 worker 로 증명서 요청이 가야 적중
+  CPU 를 더 쓰려면 worker 를 늘리기 전에 SERVE_THREADS 를 먼저 늘리는 편이 이 차이가 없다.
+
+설정 (명령행 옵션이 환경 변수보다 우선)
+  SERVE_BIND                  0.0.0.0:5001
+  SERVE_WORKERS               1
+  SERVE_THREADS               4      worker 당 요청 처리 스레드
+  SERVE_MAX_REQUESTS          2000   0 이면 교체하지 않음
+  SERVE_MAX_REQUESTS_JITTER   200
+  SERVE_TIMEOUT               60     응답 없는 worker 를 다시 띄우기까지 (초)
+  SERVE_GRACEFUL_TIMEOUT      30     재시작·종료 때 처리 중인 요청을 기다리는 시간 (초)
+  SERVE_KEEPALIVE             5
+  SERVE_ACCESS_LOG            -      "-" 는 표준 출력, 비우면 끔
+"""
+import argparse
+import gc
+import os
+import sys
+
+DEFAULTS = {
+    "bind": os.getenv("SERVE_BIND", "0.0.0.0:5001"),
+    "workers": int(os.getenv("SERVE_WORKERS", "1")),   # 여러 개일 때의 차이는 위 설명 참고
+    "threads": int(os.getenv("SERVE_THREADS", "4")),
+    "max_requests": int(os.getenv("SERVE_MAX_REQUESTS", "2000")),
+    "max_requests_jitter": int(os.getenv("SERVE_MAX_REQUESTS_JITTER", "200")),
+    "timeout": int(os.getenv("SERVE_TIMEOUT", "60")),
+    "graceful_timeout": int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30")),
+    "keepalive": int(os.getenv("SERVE_KEEPALIVE", "5")),
+    "accesslog": os.getenv("SERVE_ACCESS_LOG", "-") or None,
+}
+
+
+def load_app():
+    """
+    master 에서 앱을 미리 불러 옴.
+    warm-up 은 끝까지 기다리고(WARMUP_BLOCKING), gRPC 채널은 fork 를 넘기지 못하므로
+    Gemini 클라이언트 준비(llm_client)는 master 에서 건너뛴다.
+    """
+    os.environ.setdefault("WARMUP_BLOCKING", "1")
+    skip = {s for s in os.getenv("WARMUP_SKIP", "").split(",") if s}
+    os.environ["WARMUP_SKIP"] = ",".join(sorted(skip | {"llm_client"}))
+
+    from app.utils import background
+    background.defer()
+    from app import create_app
+    app = create_app()
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def post_fork(server, worker) -> None:
+    """fork 직후 worker 안에서: 미뤄 둔 백그라운드 스레드 시작, Gemini 모델은 처음 쓸 때 새로 생성"""
+    from app.utils import background, prompt_builder
+    background.start_deferred()
+    prompt_builder.reset_models()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the kiosk with preforked gunicorn workers")
+    parser.add_argument("--bind", default=DEFAULTS["bind"])
+    parser.add_argument("--workers", type=int, default=DEFAULTS["workers"])
+    parser.add_argument("--threads", type=int, default=DEFAULTS["threads"])
+    parser.add_argument("--max-requests", type=int, default=DEFAULTS["max_requests"])
+    parser.add_argument("--max-requests-jitter", type=int, default=DEFAULTS["max_requests_jitter"])
+    parser.add_argument("--timeout", type=int, default=DEFAULTS["timeout"])
+    parser.add_argument("--graceful-timeout", type=int, default=DEFAULTS["graceful_timeout"])
+    args = parser.parse_args(argv)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn is required (pip install gunicorn). "
+              "On Windows use 'python run.py' or 'uvicorn asgi:application'.", file=sys.stderr)
+        return 1
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": DEFAULTS["keepalive"],
+        "accesslog": DEFAULTS["accesslog"],
+        "preload_app": True,
+        "post_fork": post_fork,
+        "proc_name": "kiosk",
+    }
+
+    class KioskServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    KioskServer().run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+"""
+테스트 공통 설정
+
+  • 저장소 루트를 import 경로에 추가 (python -m pytest 를 어디서 실행해도 app 패키지를 찾도록)
+  • 집계 스냅샷·결제 기록·변경 기록은 import 시점에 경로가 정해지므로
+    앱 모듈을 import 하기 전에 임시 디렉터리로 지정 — 실제 data/ 는 건드리지 않는다
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_STATE_DIR = tempfile.mkdtemp(prefix="kiosk-test-state-")
+atexit.register(shutil.rmtree, _STATE_DIR, ignore_errors=True)
+os.environ.setdefault("AGGREGATES_SNAPSHOT_PATH", os.path.join(_STATE_DIR, "aggregates.json"))
+os.environ.setdefault("PAYMENT_DIR", os.path.join(_STATE_DIR, "payments"))
+os.environ.setdefault("SYNC_CHANGE_LOG", os.path.join(_STATE_DIR, "reservation_changes.log"))
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from app.utils import admission
+from app.utils.admission import RouteGate, TokenBucket
+from app.utils.asgi_bridge import LLM_RESULT
+
+
+def _app(chat=(1.0, 2, 0), pdf=(0, 1, 1), view=None):
+    app = Flask(__name__)
+    admission.init_app(app, enabled=True, limits={"chat": chat, "pdf": pdf})
+
+    @app.post("/api/chatbot")
+    def chat_view():
+        return jsonify({"reply": "ok"})
+
+    @app.get("/certificate/prescription/")
+    def pdf_view():
+        if view:
+            view()
+        return "pdf"
+
+    @app.get("/reception")
+    def reception():
+        return "reception"
+
+    return app
+
+
+def _chat(client, addr="10.0.0.1", **kwargs):
+    return client.post("/api/chatbot", json={"message": "안녕"},
+                       environ_base={"REMOTE_ADDR": addr}, **kwargs)
+
+
+def test_token_bucket_refills_at_the_rate():
+    bucket = TokenBucket(burst=2, now=0.0)
+    assert bucket.take(rate=0.5, burst=2, now=0.0) == 0
+    assert bucket.take(rate=0.5, burst=2, now=0.0) == 0
+    assert bucket.take(rate=0.5, burst=2, now=0.0) == pytest.approx(2.0)
+    assert bucket.take(rate=0.5, burst=2, now=2.0) == 0   # 2초에 1개
+    assert bucket.take(rate=0.5, burst=2, now=100.0) == 0   # burst 이상 쌓이지 않음
+    assert bucket.take(rate=0.5, burst=2, now=100.0) == 0
+    assert bucket.take(rate=0.5, burst=2, now=100.0) > 0
+
+
+def test_rate_limit_is_per_client_address():
+    client = _app(chat=(0.001, 2, 0)).test_client()
+    assert [_chat(client).status_code for _ in range(2)] == [200, 200]
+
+    limited = _chat(client)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert limited.get_json()["reply"] == admission.RATE_LIMITED_REPLY
+
+    assert _chat(client, addr="10.0.0.2").status_code == 200   # 다른 키오스크는 영향 없음
+
+
+def test_client_headers_do_not_open_a_new_bucket():
+    client = _app(chat=(0.001, 1, 0)).test_client()
+    assert _chat(client, headers={"X-Kiosk-Id": "a"}).status_code == 200
+    assert _chat(client, headers={"X-Kiosk-Id": "b"}).status_code == 429
+
+
+def test_resumed_chat_request_is_not_counted_again():
+    client = _app(chat=(0.001, 1, 0)).test_client()
+    assert _chat(client).status_code == 200
+    resumed = client.post("/api/chatbot", json={"message": "안녕"},
+                          environ_base={"REMOTE_ADDR": "10.0.0.1", LLM_RESULT: object()})
+    assert resumed.status_code == 200
+
+
+def test_unlimited_routes_pass():
+    client = _app(chat=(0.001, 1, 0)).test_client()
+    assert all(client.get("/reception").status_code == 200 for _ in range(5))
+
+
+def test_concurrency_cap_queues_then_sheds():
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_render():
+        entered.set()
+        release.wait(5)
+
+    app = _app(pdf=(0, 1, 1), view=slow_render)
+    gate = app.extensions["admission"]["pdf"]
+    gate.queue_timeout = 0.05
+    statuses = []
+    holder = threading.Thread(target=lambda: statuses.append(
+        app.test_client().get("/certificate/prescription/").status_code))
+    holder.start()
+    assert entered.wait(5)
+
+    shed = app.test_client().get("/certificate/prescription/")
+    assert shed.status_code == 503 and "Retry-After" in shed.headers
+    assert shed.get_json() == {"error": "busy"}
+
+    gate.max_queue = 0
+    assert gate.acquire() == "queue_full"
+
+    release.set()
+    holder.join(5)
+    assert statuses == [200]
+    assert gate.status()["active"] == 0
+    assert app.test_client().get("/certificate/prescription/").status_code == 200
+
+
+def test_waiting_request_gets_the_released_slot():
+    gate = RouteGate("pdf", rate=0, burst=1, concurrency=1, queue_timeout=5)
+    assert gate.acquire() is None
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(gate.acquire()))
+    waiter.start()
+    for _ in range(500):
+        if gate.status()["waiting"] == 1:
+            break
+        time.sleep(0.01)
+    gate.release()
+    waiter.join(5)
+    assert results == [None]
+    status = gate.status()
+    assert (status["active"], status["waiting"]) == (1, 0)
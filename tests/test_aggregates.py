@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+
+from app.utils import reservation_store
+from app.utils.aggregates import Aggregates
+
+
+def _row(rrn, department, status="Pending", time="2026-10-19 09:00"):
+    return {"name": "홍길동", "rrn": rrn, "time": time, "department": department,
+            "location": "본관 2층", "doctor": "김의사", "payment_status": status}
+
+
+@pytest.fixture
+def setup(tmp_path):
+    path = str(tmp_path / "reservations.csv")
+    store = reservation_store.get_store(path)
+    agg = Aggregates(path)
+    agg.attach()
+    agg.snapshot_path = str(tmp_path / "aggregates.json")
+    store.replace_all([_row(f"9001{i:02d}-1234567", "내과" if i % 2 else "치과") for i in range(10)])
+    agg.flush()
+    return store, agg
+
+
+def _snapshot(agg):
+    with open(agg.snapshot_path, encoding="utf-8") as f:
+        return json.load(f)["reservations"]["by_department"]
+
+
+def _nonzero(counts):
+    return {dept: {s: n for s, n in by.items() if n} for dept, by in counts.items()}
+
+
+def _in_child(work):
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            work()
+            code = 0
+        finally:
+            os._exit(code)
+    return pid
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork 가 없는 플랫폼")
+def test_status_changes_from_workers_merge_through_snapshot(setup):
+    store, agg = setup
+    assert _snapshot(agg) == {"내과": {"Pending": 5}, "치과": {"Pending": 5}}
+
+    def first():
+        store.update_status("900101-1234567", "Registered")
+        store.update_status("900101-1234567", "Paid")
+        store.update_status("900102-1234567", "Paid")
+        agg.flush()
+
+    def second():
+        store.update_status("900103-1234567", "Registered")
+        # 전체 재작성 — 그 전에 다른 worker 가 바꾼 상태는 새 기준값에 들어간다
+        store.apply_delta({("900199-1234567", "2026-10-19 10:00"):
+                           _row("900199-1234567", "정형외과", time="2026-10-19 10:00")})
+        store.update_status("900199-1234567", "Registered")
+        agg.flush()
+
+    pids = [_in_child(first), _in_child(second)]
+    store.update_status("900104-1234567", "Paid")   # 부모 몫은 아직 flush 하지 않음
+    for pid in pids:
+        assert os.waitpid(pid, 0)[1] == 0
+    agg.flush()
+
+    _, actual = store.status_counts()
+    assert _nonzero(_snapshot(agg)) == actual
+    assert _nonzero(agg.as_dict()["reservations"]["by_department"]) == actual
+    assert agg.as_dict()["reservations"]["total"]["Paid"] == 3
+
+
+def test_reading_aggregates_does_not_scan_reservations(setup, monkeypatch):
+    store, agg = setup
+
+    def scan():
+        raise AssertionError("예약 파일을 훑으면 안 됨")
+
+    monkeypatch.setattr(store, "iter_rows", scan)
+    store.update_status("900100-1234567", "Paid")
+
+    assert agg.as_dict()["reservations"]["by_department"]["치과"] == {"Pending": 4, "Paid": 1}
+    agg.flush()
+    assert _snapshot(agg)["치과"] == {"Pending": 4, "Paid": 1}
@@ -0,0 +1,175 @@
+import threading
+import time
+
+import pytest
+
+from app.utils import payment_gateway, resilience
+from app.utils.payment_gateway import (
+    AUTHORIZED, CAPTURED, DECLINED, FAILED, PENDING,
+    PaymentGateway, PaymentStore, SimulatorProvider, payment_id, settled,
+)
+
+
+class CountingProvider(SimulatorProvider):
+    """제공자 호출 횟수를 세는 모의 단말"""
+
+    def __init__(self, **kwargs):
+        super().__init__(seed=1, **kwargs)
+        self.authorized, self.captured = [], []
+
+    async def authorize(self, amount, method, idempotency_key, timeout):
+        self.authorized.append(idempotency_key)
+        return await super().authorize(amount, method, idempotency_key, timeout)
+
+    async def capture(self, authorization_id, amount, idempotency_key, timeout):
+        self.captured.append(idempotency_key)
+        return await super().capture(authorization_id, amount, idempotency_key, timeout)
+
+
+@pytest.fixture(autouse=True)
+def breaker(monkeypatch):
+    # 실패 경로 테스트가 모듈 전역 회로 차단기를 열어 다른 테스트에 영향을 주지 않도록
+    monkeypatch.setattr(payment_gateway, "payment_breaker", resilience.CircuitBreaker("test-payment"))
+
+
+def _gateway(tmp_path, on_captured=None, **provider_options):
+    gateway = PaymentGateway(CountingProvider(**provider_options), PaymentStore(str(tmp_path / "payments")),
+                             timeout=2.0, max_retries=1, stale_seconds=60)
+    gateway.on_captured = on_captured
+    return gateway
+
+
+def _wait_settled(gateway, pay_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = gateway.get(pay_id)
+        if record is not None and settled(record):
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"payment {pay_id} did not settle: {gateway.get(pay_id)}")
+
+
+def test_capture_runs_follow_up_before_settling(tmp_path):
+    seen = []
+    gateway = _gateway(tmp_path, on_captured=lambda record, context: seen.append((record["state"], context)))
+
+    record = gateway.start(30454, "card", "key-1", department="내과", context={"patient_rrn": "900101-1234567"})
+    assert record["state"] == PENDING and record["id"] == payment_id("key-1")
+
+    done = _wait_settled(gateway, record["id"])
+    assert done["state"] == CAPTURED and done["followed_up"] is True
+    assert seen == [(CAPTURED, {"patient_rrn": "900101-1234567"})]
+    # 환자 정보는 결제 기록 파일에 남기지 않음
+    assert "900101-1234567" not in (tmp_path / "payments" / f"{record['id']}.json").read_text(encoding="utf-8")
+
+
+def test_not_settled_until_follow_up_finishes(tmp_path):
+    release = threading.Event()
+    gateway = _gateway(tmp_path, on_captured=lambda record, context: release.wait(5))
+
+    pay_id = gateway.start(1000, "card", "key-slow")["id"]
+    deadline = time.monotonic() + 5
+    while gateway.get(pay_id)["state"] != CAPTURED and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert gateway.get(pay_id)["state"] == CAPTURED
+    assert settled(gateway.get(pay_id)) is False
+    assert payment_gateway.public_view(gateway.get(pay_id))["settled"] is False
+
+    release.set()
+    assert _wait_settled(gateway, pay_id)["followed_up"] is True
+
+
+def test_same_key_is_charged_once(tmp_path):
+    captured = []
+    gateway = _gateway(tmp_path, on_captured=lambda record, context: captured.append(record["id"]))
+
+    first = gateway.start(1000, "card", "double-tap")
+    second = gateway.start(1000, "card", "double-tap")
+    assert second["id"] == first["id"]
+    _wait_settled(gateway, first["id"])
+
+    # 다른 worker 의 게이트웨이(같은 결제 기록 디렉터리)로 다시 제출해도 같은 결제
+    other = _gateway(tmp_path)
+    assert other.start(1000, "card", "double-tap")["state"] == CAPTURED
+    assert gateway.provider.authorized == ["double-tap:authorize"]
+    assert other.provider.authorized == []
+    assert captured == [first["id"]]
+
+
+def test_declined_payment_skips_follow_up(tmp_path):
+    calls = []
+    gateway = _gateway(tmp_path, on_captured=lambda record, context: calls.append(record), decline_rate=1.0)
+
+    done = _wait_settled(gateway, gateway.start(1000, "card", "declined")["id"])
+    assert done["state"] == DECLINED and "declined" in done["error"]
+    assert gateway.provider.captured == [] and calls == []
+
+
+def test_provider_errors_fail_after_retries(tmp_path):
+    gateway = _gateway(tmp_path, on_captured=lambda record, context: None, error_rate=1.0)
+
+    done = _wait_settled(gateway, gateway.start(1000, "card", "broken")["id"])
+    assert done["state"] == FAILED and "ProviderError" in done["error"]
+    assert gateway.provider.authorized == ["broken:authorize"] * 2   # 첫 시도 + 재시도 1회
+
+
+def test_follow_up_error_still_settles(tmp_path):
+    def broken(record, context):
+        raise OSError("disk full")
+
+    gateway = _gateway(tmp_path, on_captured=broken)
+    done = _wait_settled(gateway, gateway.start(1000, "card", "follow-up")["id"])
+    assert done["state"] == CAPTURED and done["followed_up"] is True
+    assert done["follow_up_error"] == "OSError: disk full"
+
+
+def _orphan(gateway, key, state, **fields):
+    """다른(이미 사라진) worker 가 남긴 결제 기록"""
+    now = time.time() - 3600
+    record = {"id": payment_id(key), "state": state, "amount": 1000, "method": "card", "department": "",
+              "provider": "simulator", "owner": "gone:1", "created": now, "updated": now, **fields}
+    gateway.store.create(record)
+    return record["id"]
+
+
+def test_resubmitting_an_orphaned_payment_resumes_it(tmp_path):
+    gateway = _gateway(tmp_path, on_captured=lambda record, context: None)
+    pay_id = _orphan(gateway, "resume", AUTHORIZED, authorization_id="sim-auth-earlier")
+
+    assert gateway.start(1000, "card", "resume")["owner"] == payment_gateway._owner()
+    done = _wait_settled(gateway, pay_id)
+    assert done["state"] == CAPTURED
+    assert gateway.provider.authorized == []   # 승인은 이미 끝났으므로 매입만
+    assert gateway.provider.captured == ["resume:capture"]
+
+
+def test_recover_fails_abandoned_payments_only(tmp_path):
+    gateway = _gateway(tmp_path)
+    pending = _orphan(gateway, "abandoned-pending", PENDING)
+    authorized = _orphan(gateway, "abandoned-authorized", AUTHORIZED, authorization_id="sim-auth-1")
+    captured = _orphan(gateway, "finished", CAPTURED, followed_up=True)
+    live = gateway.start(1000, "card", "live")["id"]
+    _wait_settled(gateway, live)
+
+    assert gateway.recover() == 2
+    assert gateway.get(pending)["state"] == FAILED
+    assert gateway.get(authorized)["state"] == FAILED
+    assert gateway.get(captured)["state"] == CAPTURED
+    assert gateway.get(live)["state"] == CAPTURED
+    assert gateway.recover() == 0
+
+
+def test_recover_finishes_captured_payments_left_without_follow_up(tmp_path):
+    seen = []
+    gateway = _gateway(tmp_path, on_captured=lambda record, context: seen.append(context))
+    context = {"patient_rrn": "900101-1234567", "patient_name": "홍길동"}
+    pay_id = _orphan(gateway, "charged", CAPTURED, authorization_id="sim-auth-1", capture_id="sim-cap-1",
+                     followed_up=False, follow_up=context)
+    assert settled(gateway.get(pay_id)) is False
+
+    assert gateway.recover() == 1
+    done = gateway.get(pay_id)
+    assert seen == [context]
+    assert settled(done) and done["follow_up"] is None
+    assert gateway.recover() == 0
+    assert gateway.provider.captured == []   # 다시 청구하지 않음
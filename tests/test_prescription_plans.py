@@ -0,0 +1,114 @@
+import csv
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from app.utils.prescription_plans import ITEM_FIELDS, FeeCatalog, PlanStore, ledger_path, ledger_paths, plan_for
+
+RRN = "900101-1234567"
+
+
+@pytest.fixture
+def fees_path(tmp_path):
+    path = tmp_path / "treatment_fees.csv"
+    path.write_text("\ufeffDepartment,Prescription,Fee\n"
+                    "내과,비타민D 처방,18833\n"
+                    "내과,철분제 처방,11621\n"
+                    "내과,소화제 처방,5400\n"
+                    "내과,진통제 처방,3200.5\n"
+                    "외과,드레싱,12000\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def items_path(tmp_path):
+    return str(tmp_path / "prescription_items.csv")
+
+
+def _ledger(path, day=None):
+    with open(ledger_path(day or date.today().isoformat(), path), newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ITEM_FIELDS
+    return rows[1:]
+
+
+def test_plan_is_created_once_and_reused(fees_path, items_path):
+    catalog, store = FeeCatalog(fees_path), PlanStore(items_path)
+
+    plan = store.get_or_create(RRN, "내과", catalog)
+    again = store.get_or_create(RRN, " 내과 ", catalog)
+
+    assert again == plan
+    assert 2 <= len(plan["prescriptions"]) <= 3
+    assert plan["total_fee"] == sum(item["fee"] for item in plan["prescriptions"])
+    rows = _ledger(items_path)
+    assert [(r[0], r[2], r[3]) for r in rows] == [(RRN, "내과", item["name"]) for item in plan["prescriptions"]]
+
+
+def test_plan_is_shared_with_another_worker(fees_path, items_path):
+    first = PlanStore(items_path).get_or_create(RRN, "내과", FeeCatalog(fees_path))
+
+    # 같은 원장을 읽는 다른 worker
+    other = PlanStore(items_path)
+    assert other.get(RRN, "내과") == first
+    assert other.get_or_create(RRN, "내과", FeeCatalog(fees_path)) == first
+    assert len(_ledger(items_path)) == len(first["prescriptions"])
+
+
+def test_concurrent_workers_record_one_plan(fees_path, items_path):
+    stores = [PlanStore(items_path) for _ in range(8)]
+    plans = []
+    start = threading.Barrier(len(stores))
+
+    def create(store):
+        start.wait()
+        plans.append(store.get_or_create(RRN, "외과", FeeCatalog(fees_path)))
+
+    threads = [threading.Thread(target=create, args=(store,)) for store in stores]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert len(plans) == 8 and all(plan == plans[0] for plan in plans)
+    assert len(_ledger(items_path)) == 1
+
+
+def test_unknown_department_is_not_recorded(fees_path, items_path):
+    plan = PlanStore(items_path).get_or_create(RRN, "안과", FeeCatalog(fees_path))
+    assert plan == {"department": "안과", "prescriptions": [], "total_fee": 0}
+    with pytest.raises(FileNotFoundError):
+        _ledger(items_path)
+
+
+def test_plan_without_rrn_is_not_recorded(fees_path, items_path):
+    plan = plan_for(None, "내과", fees_path, items_path)
+    assert plan["prescriptions"]
+    with pytest.raises(FileNotFoundError):
+        _ledger(items_path)
+
+
+def test_catalog_matches_department_loosely_and_reloads(fees_path):
+    catalog = FeeCatalog(fees_path)
+    assert [item["fee"] for item in catalog.items(" 내과")] == [18833, 11621, 5400, 3200.5]
+
+    with open(fees_path, "a", encoding="utf-8") as f:
+        f.write("안과,안약,7000\n")
+    assert catalog.items("안과") == [{"name": "안약", "fee": 7000}]
+    assert catalog.departments() == {"내과", "외과", "안과"}
+
+
+def test_only_todays_ledger_file_is_read(fees_path, items_path):
+    today, yesterday = date.today().isoformat(), (date.today() - timedelta(days=1)).isoformat()
+    with open(ledger_path(yesterday, items_path), "w", encoding="utf-8") as f:
+        f.write(",".join(ITEM_FIELDS) + "\n" + f"{RRN},{yesterday},내과,철분제 처방,11621\n"
+                f"{RRN},{today},외과,드레싱,12000\n")   # 다른 날짜 파일은 열지도 않음
+
+    store = PlanStore(items_path)
+    assert store.get(RRN, "외과") is None
+    plan = store.get_or_create(RRN, "내과", FeeCatalog(fees_path))
+
+    assert len(_ledger(items_path)) == len(plan["prescriptions"])
+    assert len(_ledger(items_path, yesterday)) == 2
+    assert ledger_paths(items_path) == [ledger_path(yesterday, items_path), ledger_path(today, items_path)]
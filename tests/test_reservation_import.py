@@ -0,0 +1,105 @@
+import csv
+
+import pytest
+
+from app.utils import reservation_import, reservation_store
+from app.utils.reservation_import import import_feed
+from app.utils.reservation_store import FIELDNAMES
+
+HEADER = ",".join(FIELDNAMES)
+
+
+def _line(name, rrn, time, status="Pending", department="내과"):
+    return f"{name},{rrn},{time},{department},본관 2층,김의사,{status}"
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = tmp_path / "reservations.csv"
+    store = reservation_store.get_store(str(path))
+    store.replace_all([
+        dict(zip(FIELDNAMES, _line("홍길동", "900101-1234567", "2026-10-19 09:00").split(","))),
+        dict(zip(FIELDNAMES, _line("김영희", "900202-2345678", "2026-10-19 09:30").split(","))),
+    ])
+    return str(path)
+
+
+def _feed(tmp_path, *lines):
+    path = tmp_path / "feed.csv"
+    path.write_text("\n".join([HEADER, *lines]) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_only_changed_rows_are_applied(tmp_path, store_path):
+    feed = _feed(tmp_path,
+                 _line("홍길동", "900101-1234567", "2026-10-19 09:00"),                      # 그대로
+                 _line("김영희", "900202-2345678", "2026-10-19 09:30", department="외과"),   # 바뀜
+                 _line("이철수", "900303-1456789", "2026-10-19 10:00"))                     # 새 예약
+
+    result = import_feed(feed, store_path)
+
+    assert (result.read, result.unchanged, result.updated, result.inserted, result.rejected) == (3, 1, 1, 1, 0)
+    store = reservation_store.get_store(store_path)
+    assert store.get("900202-2345678")["department"] == "외과"
+    assert store.get("900303-1456789")["name"] == "이철수"
+    assert len(store) == 3
+
+
+def test_invalid_rows_go_to_the_reject_file(tmp_path, store_path):
+    reject_path = tmp_path / "rejects.csv"
+    feed = _feed(tmp_path,
+                 _line("형식오류", "9001011234567", "2026-10-19 09:00"),
+                 _line("생일오류", "901301-1234567", "2026-10-19 09:00"),
+                 _line("진료과오류", "900404-2567890", "2026-10-19 09:00", department="없는과"),
+                 _line("시간오류", "900505-1678901", "2026-10-19"),
+                 _line("상태오류", "900606-2789012", "2026-10-19 09:00", status="Refunded"),
+                 _line("중복", "900707-1890123", "2026-10-19 09:00"),
+                 _line("중복", "900707-1890123", "2026-10-19 09:00"))
+
+    result = import_feed(feed, store_path, reject_path=str(reject_path))
+
+    assert (result.inserted, result.rejected) == (1, 6)
+    with open(reject_path, newline="", encoding="utf-8") as f:
+        reasons = [row["reason"] for row in csv.DictReader(f)]
+    assert reasons == ["bad_rrn_format", "bad_rrn_birthdate", "unknown_department",
+                       "bad_time", "bad_status", "duplicate_in_feed"]
+    assert len(reservation_store.get_store(store_path)) == 3
+
+
+def test_kiosk_status_is_not_reset_by_the_feed(tmp_path, store_path):
+    store = reservation_store.get_store(store_path)
+    store.update_status("900101-1234567", "Paid")
+
+    result = import_feed(_feed(tmp_path, _line("홍길동", "900101-1234567", "2026-10-19 09:00", status="Pending")),
+                         store_path)
+
+    assert result.unchanged == 1
+    assert store.payment_status("900101-1234567") == "Paid"
+
+
+def test_replace_deletes_missing_rows_and_dry_run_writes_nothing(tmp_path, store_path):
+    feed = _feed(tmp_path, _line("홍길동", "900101-1234567", "2026-10-19 09:00"))
+    store = reservation_store.get_store(store_path)
+
+    dry = import_feed(feed, store_path, replace=True, dry_run=True)
+    assert dry.deleted == 1 and len(store) == 2
+
+    result = import_feed(feed, store_path, replace=True)
+    assert result.deleted == 1
+    assert store.get("900202-2345678") is None
+    assert len(store) == 1
+
+
+def test_departments_do_not_depend_on_the_current_store(tmp_path, monkeypatch):
+    empty = str(tmp_path / "empty.csv")
+    reject_path = tmp_path / "rejects.csv"
+    result = import_feed(reservation_import.RESV_CSV, empty, reject_path=str(reject_path), dry_run=True)
+    with open(reject_path, newline="", encoding="utf-8") as f:
+        assert "unknown_department" not in {row["reason"] for row in csv.DictReader(f)}
+    assert result.inserted == result.read - result.rejected
+
+    # 새 진료과는 설정으로 추가
+    feed = _feed(tmp_path, _line("신규과", "900505-1678901", "2026-10-19 09:00", department="안과"))
+    assert import_feed(feed, empty, dry_run=True).rejected == 1
+    monkeypatch.setattr(reservation_import, "IMPORT_DEPARTMENTS", "안과")
+    assert import_feed(feed, empty, dry_run=True).inserted == 1
@@ -0,0 +1,131 @@
+import os
+import threading
+
+import pytest
+
+from app.utils import reservation_store
+from app.utils.reservation_store import STATUS_WIDTH, ReservationStore
+
+
+def _row(rrn, time="2026-10-19 09:00", status="Pending", name="홍길동"):
+    return {"name": name, "rrn": rrn, "time": time, "department": "내과",
+            "location": "본관 2층", "doctor": "김의사", "payment_status": status}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReservationStore(str(tmp_path / "reservations.csv"))
+    store.replace_all([_row("900101-1234567"), _row("900202-2345678", name="김영희"),
+                       _row("900101-1234567", time="2026-10-20 10:00")])
+    return store
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_ino, st.st_size
+
+
+def test_status_update_is_in_place(store):
+    before = _stat(store.path)
+    generation = store.generation
+
+    assert store.update_status("900101-1234567", "Paid") is True
+
+    # 같은 파일·같은 크기 → 다른 행과 인덱스는 그대로
+    assert _stat(store.path) == before
+    assert store.generation == generation
+    assert [r["payment_status"] for r in store.rows_for("900101-1234567")] == ["Paid", "Paid"]
+    assert store.payment_status("900202-2345678") == "Pending"
+
+
+def test_unknown_rrn_and_status(store):
+    assert store.update_status("000000-0000000", "Paid") is False
+    with pytest.raises(ValueError):
+        store.update_status("900101-1234567", "Refunded")
+
+
+def test_hand_edited_file_is_rewritten_once(tmp_path):
+    path = tmp_path / "reservations.csv"
+    path.write_text("name,rrn,time,department,location,doctor,payment_status\n"
+                    "홍길동,900101-1234567,2026-10-19 09:00,내과,본관 2층,김의사,Pending\n"
+                    "김영희,900202-2345678,2026-10-19 09:30,내과,본관 2층,김의사,Paid\n",
+                    encoding="utf-8")
+    store = ReservationStore(str(path))
+
+    store.update_status("900101-1234567", "Registered")
+    normalized = _stat(store.path)
+    assert all(len(line.rsplit(",", 1)[1]) == STATUS_WIDTH
+               for line in path.read_text(encoding="utf-8").splitlines()[1:])
+    assert store.payment_status("900202-2345678") == "Paid"
+
+    # 정규화된 뒤로는 제자리 변경
+    store.update_status("900202-2345678", "Pending")
+    assert _stat(store.path) == normalized
+    assert store.payment_status("900101-1234567") == "Registered"
+
+
+def test_apply_delta_upserts_deletes_and_merges(store):
+    keep_status = lambda current, new: {**new, "payment_status": current["payment_status"]}
+    store.update_status("900202-2345678", "Paid")
+
+    touched = store.apply_delta(
+        {("900202-2345678", "2026-10-19 09:00"): _row("900202-2345678", name="김영희", status="Pending"),
+         ("900303-1456789", "2026-10-19 11:00"): _row("900303-1456789", time="2026-10-19 11:00")},
+        deletes=[("900101-1234567", "2026-10-20 10:00")],
+        merge=keep_status)
+
+    assert touched == {"900101-1234567", "900202-2345678", "900303-1456789"}
+    assert store.payment_status("900202-2345678") == "Paid"   # merge 가 현재 상태를 살림
+    assert store.find("900303-1456789", "2026-10-19 11:00") is not None
+    assert [r["time"] for r in store.rows_for("900101-1234567")] == ["2026-10-19 09:00"]
+    assert len(store) == 3
+
+
+def test_other_instance_sees_updates_and_rewrites(store):
+    # 같은 파일을 여는 다른 worker 의 저장소
+    other = ReservationStore(store.path)
+    assert other.payment_status("900101-1234567") == "Pending"
+
+    store.update_status("900101-1234567", "Paid")
+    assert other.payment_status("900101-1234567") == "Paid"
+
+    store.apply_delta({("900404-2567890", "2026-10-19 12:00"):
+                       _row("900404-2567890", time="2026-10-19 12:00")})
+    assert other.get("900404-2567890") is not None
+
+    # 다른 인스턴스가 쓴 상태가 이쪽의 재작성으로 사라지지 않음
+    other.update_status("900202-2345678", "Registered")
+    store.apply_delta({("900505-1678901", "2026-10-19 13:00"):
+                       _row("900505-1678901", time="2026-10-19 13:00")})
+    assert other.payment_status("900202-2345678") == "Registered"
+    assert store.payment_status("900101-1234567") == "Paid"
+
+
+def test_reload_is_notified_after_the_store_lock_is_released(store, monkeypatch):
+    # 구독자(검색 인덱스)는 자기 잠금을 잡은 채 저장소를 읽는다 — 통지가 저장소 잠금 안이면 교착
+    other = ReservationStore(store.path)
+    other.payment_status("900101-1234567")
+    reader_got_lock = []
+
+    def read_from_another_thread():
+        got = other._lock.acquire(timeout=2)
+        reader_got_lock.append(got)
+        if got:
+            other._lock.release()
+
+    def subscriber(path, rrns):
+        reader = threading.Thread(target=read_from_another_thread)
+        reader.start()
+        reader.join()
+
+    monkeypatch.setattr(reservation_store, "_listeners", [subscriber])
+    store.apply_delta({("900404-2567890", "2026-10-19 12:00"):
+                       _row("900404-2567890", time="2026-10-19 12:00")})
+    reader_got_lock.clear()
+    assert other.get("900404-2567890") is not None   # 다시 적재 → 통지
+    with other.locked():   # locked() 안에서 다시 적재했으면 나올 때 통지
+        with open(store.path, "a", encoding="utf-8") as f:   # 잠금을 쓰지 않는 수작업 편집
+            f.write(f"이몽룡,900606-1789012,2026-10-19 14:00,내과,본관 2층,김의사,{'Pending':<{STATUS_WIDTH}}\n")
+        assert other.get("900606-1789012") is not None
+        assert reader_got_lock == [True]
+    assert reader_got_lock == [True, True]
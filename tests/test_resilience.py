@@ -0,0 +1,115 @@
+import pytest
+
+from app.utils import resilience
+from app.utils.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceededError, call_with_resilience
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    monkeypatch.setattr(resilience.time, "sleep", lambda seconds: setattr(clock, "now", clock.now + seconds))
+    return clock
+
+
+def _fail(timeout):
+    raise ConnectionError("upstream down")
+
+
+def _ok(timeout):
+    return "ok"
+
+
+def _call(breaker, fn, **kwargs):
+    return call_with_resilience(fn, breaker=breaker, deadline=5.0, max_retries=0, **kwargs)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            _call(breaker, _fail)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_opens_after_consecutive_failures_and_rejects_calls(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    _open(breaker)
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        _call(breaker, lambda timeout: calls.append(timeout))
+    assert calls == []
+    assert breaker.retry_after() == 30
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    clock.now += 30
+
+    assert breaker.allow() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is False   # 시험 호출이 끝나기 전에는 다른 호출을 막음
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert _call(breaker, _ok) == "ok"
+
+
+def test_failed_trial_reopens_immediately(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30)
+    _open(breaker)
+    clock.now += 30
+
+    with pytest.raises(ConnectionError):
+        _call(breaker, _fail)   # 시험 호출 실패 한 번으로 다시 open
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(breaker, _ok)
+
+
+def test_request_errors_do_not_count_against_the_upstream(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+
+    def bad_request(timeout):
+        raise ValueError("invalid prompt")
+
+    with pytest.raises(ValueError):
+        _call(breaker, bad_request)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_transient_errors_are_retried_within_the_deadline(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30)
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise TimeoutError("slow")
+        return "ok"
+
+    assert call_with_resilience(flaky, breaker=breaker, deadline=5.0, max_retries=2) == "ok"
+    assert len(attempts) == 3
+    assert all(later <= earlier for earlier, later in zip(attempts, attempts[1:]))   # 남은 시간만 넘김
+    assert breaker.failures == 0
+
+
+def test_deadline_stops_retries(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30)
+
+    def slow(timeout):
+        clock.now += timeout
+        raise TimeoutError("slow")
+
+    with pytest.raises((TimeoutError, DeadlineExceededError)):
+        call_with_resilience(slow, breaker=breaker, deadline=1.0, max_retries=5)
+    assert breaker.failures == 1
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils import singleflight
+from app.utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+@pytest.fixture
+def coalesced(monkeypatch):
+    """follower 가 진행 중인 호출에 붙을 때마다 늘어나는 목록"""
+    joined = []
+    monkeypatch.setattr(singleflight.metrics, "inc", lambda name, amount=1, **labels: joined.append(name))
+    return joined
+
+
+def _run_concurrently(group, key, count, fn, coalesced):
+    """count 개 스레드가 같은 key 로 호출 — leader 1개에 나머지가 모두 붙은 뒤 반환"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(group.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for _ in range(500):
+        if len(coalesced) == count - 1:
+            break
+        time.sleep(0.01)
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution(coalesced):
+    group = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results, errors = _run_concurrently(group, "같은 질문", 5, fn, coalesced)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert calls == [1] and len(coalesced) == 4
+    assert results == ["answer"] * 5 and errors == []
+    assert group.in_flight() == 0
+
+
+def test_error_is_shared_and_next_call_runs_again(coalesced):
+    group = SingleFlight("test")
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ConnectionError("upstream down")
+
+    threads, results, errors = _run_concurrently(group, "key", 3, fn, coalesced)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == [] and len(errors) == 3
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    # 결과를 캐시하지 않음
+    assert group.do("key", lambda: "fresh") == "fresh"
+
+
+def test_different_keys_run_separately():
+    group = SingleFlight("test")
+    assert group.do("a", lambda: 1) == 1
+    assert group.do("b", lambda: 2) == 2
+
+
+def test_async_calls_share_one_execution():
+    group = AsyncSingleFlight("test")
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(group.do("key", fn) for _ in range(4)))
+
+    assert asyncio.run(main()) == ["answer"] * 4
+    assert calls == [1]
+    assert group.in_flight() == 0
+
+
+def test_async_error_is_shared():
+    group = AsyncSingleFlight("test")
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(group.do("key", fn) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ConnectionError) for r in results)
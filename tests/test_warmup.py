@@ -0,0 +1,39 @@
+import pytest
+from flask import Flask
+
+from app.routes.health import health_bp
+from app.utils import warmup
+
+
+def _broken(app):
+    raise OSError("treatment_fees.csv missing")
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    def make(optional=()):
+        monkeypatch.setattr(warmup, "STEPS", {"fee_catalog": _broken, "templates": lambda app: None})
+        app = Flask(__name__)
+        app.register_blueprint(health_bp)
+        warmup.init_app(app, enabled=True, blocking=True, skip=set(), optional=set(optional))
+        return app.test_client()
+    return make
+
+
+def test_failed_required_step_keeps_worker_out_of_rotation(make_client):
+    response = make_client().get("/healthz/ready")
+
+    assert response.status_code == 503
+    body = response.get_json()
+    assert body["status"] == "failed"
+    assert body["failed"] == ["fee_catalog"]
+    assert "OSError" in body["steps"]["fee_catalog"]["error"]
+
+
+def test_failed_optional_step_is_only_reported(make_client):
+    response = make_client(optional={"fee_catalog"}).get("/healthz/ready")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "ready"
+    assert body["steps"]["fee_catalog"]["optional"] is True